@@ -0,0 +1,83 @@
+"""Micro-benchmark: single-pass phrase matcher vs. the old per-phrase findall loop.
+
+Run from backend/:  python -m benchmarks.bench_analysis
+"""
+import argparse
+import random
+import re
+import timeit
+
+from services.analysis import FILLER_WORDS, HEDGING_WORDS, count_phrase_lists
+
+# ~150 words per minute of speech
+WORDS_PER_MINUTE = 150
+
+VOCABULARY = [
+    "we", "should", "ship", "the", "release", "next", "week", "because", "the",
+    "team", "has", "finished", "testing", "and", "customers", "are", "waiting",
+    "for", "this", "feature", "our", "roadmap", "depends", "on", "it", "budget",
+    "timeline", "risk", "stakeholders", "priority", "so", "recommend", "plan",
+]
+
+
+def legacy_count_occurrences(text: str, phrases: list[str]) -> int:
+    """The implementation count_phrase_lists replaced, kept for comparison."""
+    text_lower = text.lower()
+    count = 0
+    for phrase in phrases:
+        count += len(re.findall(r'\b' + re.escape(phrase) + r'\b', text_lower))
+    return count
+
+
+def make_transcript(minutes: float, seed: int) -> str:
+    rng = random.Random(seed)
+    phrases = HEDGING_WORDS + FILLER_WORDS
+    words = []
+    for _ in range(int(minutes * WORDS_PER_MINUTE)):
+        if rng.random() < 0.12:
+            words.append(rng.choice(phrases))
+        else:
+            words.append(rng.choice(VOCABULARY))
+        if rng.random() < 0.08:
+            words[-1] += rng.choice([".", ",", "?"])
+    return " ".join(words).capitalize()
+
+
+def legacy(text: str) -> tuple[int, int]:
+    return (
+        legacy_count_occurrences(text, HEDGING_WORDS),
+        legacy_count_occurrences(text, FILLER_WORDS),
+    )
+
+
+def single_pass(text: str) -> tuple[int, int]:
+    lists = count_phrase_lists(text)
+    return lists["hedging"]["count"], lists["filler"]["count"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--minutes", type=float, default=5.0)
+    parser.add_argument("--transcripts", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    transcripts = [make_transcript(args.minutes, seed) for seed in range(args.transcripts)]
+    for text in transcripts:
+        assert legacy(text) == single_pass(text), "single-pass counts diverge from legacy"
+
+    results = {}
+    for name, fn in (("legacy", legacy), ("single_pass", single_pass)):
+        timer = timeit.Timer(lambda: [fn(t) for t in transcripts])
+        best = min(timer.repeat(repeat=args.repeat, number=1))
+        results[name] = best / len(transcripts)
+
+    words = len(transcripts[0].split())
+    print(f"{args.transcripts} transcripts, {args.minutes:g} min (~{words} words) each")
+    for name, per_transcript in results.items():
+        print(f"  {name:<12} {per_transcript * 1e6:10.1f} us/transcript")
+    print(f"  speedup      {results['legacy'] / results['single_pass']:10.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""Throughput and tail latency of the post-call pipeline, fully offline.
+
+Runs `handle_end_of_call` over a batch of synthetic end-of-call reports
+(benchmarks/corpus.py), then `handle_deep_evaluation` over the
+deep_evaluation jobs it queued, with the offline LLM backend (services/fake_llm.py), an in-memory Supabase
+(benchmarks/fakes.py) and a throwaway SQLite job queue. Reports sessions/s,
+latency percentiles per stage, LLM calls and database round trips.
+
+Run from backend/:
+    python -m benchmarks.bench_pipeline
+    python -m benchmarks.bench_pipeline --sessions 500 --concurrency 32 --llm-latency lognormal:600,0.6
+    python -m benchmarks.bench_pipeline --rate-limit-rate 0.05 --error-rate 0.02 --db-latency-ms 10
+    python -m benchmarks.bench_pipeline --evaluation-mode single
+    python -m benchmarks.bench_pipeline --tpm 200000   # rate limits enforced with 429s
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.corpus import SIZES, make_report, session_ids
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16, help="sessions processed at once per stage")
+    parser.add_argument("--size", choices=list(SIZES), default="medium", help="call length (benchmarks/corpus.py)")
+    parser.add_argument("--llm-latency", default="lognormal:400,0.5", help="FAKE_LLM_LATENCY distribution")
+    parser.add_argument("--ms-per-token", type=float, default=5.0, help="FAKE_LLM_MS_PER_TOKEN")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--rpm", type=int, default=0, help="FAKE_LLM_RPM, requests per minute before 429s (0 = unlimited)")
+    parser.add_argument("--tpm", type=int, default=0, help="FAKE_LLM_TPM, tokens per minute before 429s (0 = unlimited)")
+    parser.add_argument("--db-latency-ms", type=float, default=5.0, help="delay per database request")
+    parser.add_argument("--evaluation-mode", choices=("multi", "single"), default="multi", help="EVALUATION_MODE")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    return parser.parse_args(argv)
+
+
+def configure(args, queue_path: str):
+    """Environment for the modules under test; must run before they're imported."""
+    os.environ.update({
+        "LLM_BACKEND": "fake",
+        "LLM_CACHE_BACKEND": "none",
+        "AUDIO_METRICS_ENABLED": "false",  # synthetic calls have no recordings
+        "EVALUATION_MODE": args.evaluation_mode,
+        "JOB_QUEUE_BACKEND": "sqlite",
+        "JOB_QUEUE_SQLITE_PATH": queue_path,
+        "FAKE_LLM_LATENCY": args.llm_latency,
+        "FAKE_LLM_MS_PER_TOKEN": str(args.ms_per_token),
+        "FAKE_LLM_ERROR_RATE": str(args.error_rate),
+        "FAKE_LLM_RATE_LIMIT_RATE": str(args.rate_limit_rate),
+        "FAKE_LLM_TIMEOUT_RATE": str(args.timeout_rate),
+        "FAKE_LLM_MALFORMED_RATE": str(args.malformed_rate),
+        "FAKE_LLM_RPM": str(args.rpm),
+        "FAKE_LLM_TPM": str(args.tpm),
+        "FAKE_LLM_SEED": str(args.seed),
+    })
+    for name in ("OPENAI_API_KEY", "SUPABASE_KEY", "SUPABASE_SERVICE_KEY"):
+        os.environ.setdefault(name, "offline")
+    os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+
+
+def summarize(name: str, latencies: list[float], failed: int, wall_seconds: float) -> dict:
+    ordered = sorted(latencies)
+
+    def pct(q):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000, 1) if ordered else 0.0
+
+    return {
+        "stage": name,
+        "sessions": len(latencies),
+        "failed": failed,
+        "sessions_per_second": round(len(latencies) / wall_seconds, 2) if wall_seconds else 0.0,
+        "latency_ms": {
+            "p50": round(statistics.median(ordered) * 1000, 1) if ordered else 0.0,
+            "p95": pct(0.95),
+            "p99": pct(0.99),
+            "max": round(ordered[-1] * 1000, 1) if ordered else 0.0,
+        },
+    }
+
+
+async def run_stage(name: str, fn, items: list, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    failed = 0
+
+    async def one(item):
+        nonlocal failed
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await fn(item)
+            except Exception:
+                failed += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(item) for item in items))
+    return summarize(name, latencies, failed, time.perf_counter() - started)
+
+
+async def run(args) -> dict:
+    from benchmarks.fakes import InMemorySupabase, install
+    from routers import vapi_webhook
+    from services import jobs, llm
+    from services.topic_batcher import batcher
+
+    db = InMemorySupabase(latency_ms=args.db_latency_ms)
+    install(db)
+
+    reports = [make_report(i, args.size, "structured", args.seed) for i in range(args.sessions)]
+    for report in reports:
+        user_id, session_id = session_ids(report)
+        db.tables["sessions"].append({"id": session_id, "user_id": user_id})
+
+    end_of_call = await run_stage("end_of_call", vapi_webhook.handle_end_of_call, reports, args.concurrency)
+
+    claimed = await asyncio.to_thread(jobs.store.claim, jobs.WORKER_ID, args.sessions, 3600)
+    payloads = [job.payload for job in claimed if job.kind == "deep_evaluation"]
+    deep_evaluation = await run_stage(
+        "deep_evaluation", vapi_webhook.handle_deep_evaluation, payloads, args.concurrency,
+    )
+
+    report = {
+        "stages": [end_of_call, deep_evaluation],
+        "llm_outcomes": llm.client.stats(),
+        "llm_usage": llm.usage(),
+        "topic_batcher": batcher.stats(),
+        "db_requests": dict(db.requests),
+        "evaluations_completed": sum(1 for row in db.tables["evaluations"] if row.get("status") == "completed"),
+    }
+    await llm.aclose()
+    return report
+
+
+def print_report(args, report: dict):
+    print(
+        f"{args.sessions} {args.size} sessions, concurrency {args.concurrency}, "
+        f"LLM {args.llm_latency} + {args.ms_per_token}ms/token, DB {args.db_latency_ms}ms/request"
+    )
+    print(f"  {'stage':<16} {'sessions/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'failed':>7}")
+    for stage in report["stages"]:
+        latency = stage["latency_ms"]
+        print(
+            f"  {stage['stage']:<16} {stage['sessions_per_second']:>10.2f} {latency['p50']:>9.1f} "
+            f"{latency['p95']:>9.1f} {latency['p99']:>9.1f} {latency['max']:>9.1f} {stage['failed']:>7}"
+        )
+    print(f"  evaluations completed: {report['evaluations_completed']}")
+    print(f"  LLM outcomes: {report['llm_outcomes']}")
+    print(f"  LLM calls per label: { {label: u['calls'] for label, u in report['llm_usage'].items()} }")
+    batches = report["topic_batcher"]
+    print(f"  topic batches: {batches['batches']} (avg {batches['avg_batch_size']} topics)")
+    print(f"  DB requests: {sum(report['db_requests'].values())} ({report['db_requests']})")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory() as tmp:
+        configure(args, os.path.join(tmp, "jobs.sqlite3"))
+        report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(args, report)
+
+
+if __name__ == "__main__":
+    main()
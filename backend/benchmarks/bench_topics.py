@@ -0,0 +1,182 @@
+"""Benchmark + fuzz check: keyword-chain topic segmenter vs. the old regex loop.
+
+Fuzzing compares segmentation on random transcripts (built from fragments
+that trigger, nearly trigger and don't trigger the ask patterns), and ask
+detection on random keyword soup (overlapping and partial keywords, newlines),
+against the legacy implementation and fails on the first divergence. The
+timing also covers one pathological turn that makes the greedy ".*" patterns
+backtrack.
+
+Run from backend/:  python -m benchmarks.bench_topics
+"""
+import argparse
+import random
+import re
+import timeit
+
+from services.topic_segments import find_segments, topic_ask
+
+LEGACY_TOPIC_ASK_PATTERNS = [
+    r"what.*(?:topic|situation|scenario).*(?:practice|work on|try)",
+    r"what do you want to practice",
+    r"what.*want.*(?:practice|work on)",
+    r"go ahead",
+    r"give it.*(?:shot|try)",
+    r"same topic",
+    r"what.*next",
+    r"try something new",
+]
+
+ASSISTANT_FRAGMENTS = [
+    "What topic or situation do you want to practice today?",
+    "OK, go ahead — talk to me like you would in that real situation.",
+    "Want to retry the same topic, try something new, or are you done for today?",
+    "Alright, same topic — give it another shot.",
+    "What do you want to practice next?",
+    "Nice work on the opening.",
+    "You hedged a few times there with 'I think' and 'maybe'.",
+    "A confident leader would say: we should ship on Friday.",
+    "What stood out to me was the structure.",
+    "Let's look at the topic sentence again.",
+    "Give it some thought.",
+    "what\nnext",
+    "WHAT is the scenario you'd like to TRY?",
+    "That was a strong situation summary, and the practice shows.",
+]
+
+USER_FRAGMENTS = [
+    "giving feedback to a report", "pitching a new idea", "saying no to my boss",
+    "um I think we should maybe ship next week", "so basically the budget is fine",
+    "what do you want me to say", "go ahead and tell me", "sure", "I'm done",
+]
+
+KEYWORD_SOUP = [
+    "what", "topic", "situation", "scenario", "want", "practice", "work on", "try",
+    "next", "give it", "shot", "go ahead", "same topic", "try something new", "\n",
+    "x", "wha", "t", "opic", "it", "give", "w", "ant", "somewhat", "tryst", "nextopic",
+]
+
+PATHOLOGICAL_TURN = "what about the topic " * 100 + "and more topic scenario words " * 60
+
+FILLER_WORDS = (
+    "the team has finished testing and customers are waiting for this feature "
+    "because our roadmap depends on it and the timeline is tight"
+).split()
+
+
+def legacy_find_segments(full_transcript: list[dict]) -> list[dict]:
+    """Phase 1 of extract_topics as originally written, kept for comparison."""
+    segments = []
+    current_segment_start = None
+    current_topic_name = None
+    pending_topic_ask = False
+
+    for i, turn in enumerate(full_transcript):
+        role = turn.get("role", "")
+        content = turn.get("content", "")
+
+        if role == "assistant":
+            content_lower = content.lower()
+            for pattern in LEGACY_TOPIC_ASK_PATTERNS:
+                if re.search(pattern, content_lower):
+                    pending_topic_ask = True
+                    break
+
+        elif role == "user" and pending_topic_ask:
+            if current_segment_start is not None:
+                segments.append({
+                    "raw_name": current_topic_name,
+                    "start_idx": current_segment_start,
+                    "end_idx": i - 1,
+                })
+
+            current_topic_name = content.strip()[:100]
+            current_segment_start = i
+            pending_topic_ask = False
+
+    if current_segment_start is not None:
+        segments.append({
+            "raw_name": current_topic_name,
+            "start_idx": current_segment_start,
+            "end_idx": len(full_transcript) - 1,
+        })
+    return segments
+
+
+def make_turn(rng: random.Random, role: str, long_turns: bool) -> dict:
+    fragments = ASSISTANT_FRAGMENTS if role == "assistant" else USER_FRAGMENTS
+    parts = [rng.choice(fragments) for _ in range(rng.randint(1, 3))]
+    if long_turns and rng.random() < 0.3:
+        # Long monologue with a "what" early on: worst case for the greedy ".*"
+        parts.insert(0, "what " + " ".join(rng.choice(FILLER_WORDS) for _ in range(rng.randint(100, 400))))
+    return {"role": role, "content": " ".join(parts)}
+
+
+def make_transcript(turns: int, seed: int, long_turns: bool = True) -> list[dict]:
+    rng = random.Random(seed)
+    transcript = []
+    for i in range(turns):
+        if rng.random() < 0.05:
+            role = rng.choice(["system", "tool"])
+        else:
+            role = "assistant" if i % 2 == 0 else "user"
+        transcript.append(make_turn(rng, role, long_turns))
+    return transcript
+
+
+def legacy_topic_ask(text: str) -> bool:
+    text = text.lower()
+    return any(re.search(pattern, text) for pattern in LEGACY_TOPIC_ASK_PATTERNS)
+
+
+def fuzz(cases: int) -> int:
+    rng = random.Random(0)
+    for _ in range(cases * 20):
+        text = "".join(rng.choice(KEYWORD_SOUP) + rng.choice(["", " "]) for _ in range(rng.randint(0, 8)))
+        if bool(topic_ask(text)) != legacy_topic_ask(text):
+            raise AssertionError(f"Ask detection diverges from legacy for {text!r}")
+    for seed in range(cases):
+        rng = random.Random(seed)
+        transcript = make_transcript(rng.randint(0, 40), seed, long_turns=rng.random() < 0.2)
+        expected = legacy_find_segments(transcript)
+        actual = find_segments(transcript)
+        if actual != expected:
+            raise AssertionError(f"Segmentation diverges from legacy for seed {seed}:\n{expected}\n{actual}")
+    return cases
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--turns", type=int, default=300)
+    parser.add_argument("--transcripts", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--fuzz", type=int, default=2000, help="random transcripts to compare against legacy")
+    args = parser.parse_args()
+
+    print(f"fuzz: {fuzz(args.fuzz)} random transcripts match legacy segmentation")
+
+    transcripts = [make_transcript(args.turns, seed) for seed in range(args.transcripts)]
+    for transcript in transcripts:
+        assert find_segments(transcript) == legacy_find_segments(transcript), "segments diverge from legacy"
+
+    results = {}
+    for name, fn in (("legacy", legacy_find_segments), ("chains", find_segments)):
+        timer = timeit.Timer(lambda: [fn(t) for t in transcripts])
+        best = min(timer.repeat(repeat=args.repeat, number=1))
+        results[name] = best / len(transcripts)
+
+    print(f"{args.transcripts} transcripts, {args.turns} turns each")
+    for name, per_transcript in results.items():
+        print(f"  {name:<12} {per_transcript * 1e3:10.2f} ms/transcript")
+    print(f"  speedup      {results['legacy'] / results['chains']:10.2f}x")
+
+    pathological = {}
+    for name, fn in (("legacy", legacy_topic_ask), ("chains", topic_ask)):
+        pathological[name] = min(timeit.repeat(lambda: fn(PATHOLOGICAL_TURN), repeat=1, number=1))
+    print(f"pathological turn ({len(PATHOLOGICAL_TURN)} chars)")
+    for name, seconds in pathological.items():
+        print(f"  {name:<12} {seconds * 1e3:10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
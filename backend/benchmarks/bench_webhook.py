@@ -0,0 +1,338 @@
+"""End-to-end benchmark: VAPI webhook ingest through to a completed evaluation.
+
+Posts synthetic end-of-call reports (benchmarks/corpus.py) to
+/api/vapi/webhook through an in-process ASGI client, at a fixed arrival
+rate, with the app's lifespan running (so the job worker picks them up) over
+the offline LLM backend and an in-memory Supabase. For every size x format
+scenario it reports:
+
+- ingest latency: the webhook's response time (enqueue and acknowledge)
+- end-to-end latency: POST until the evaluation_completed event
+- sessions/s: sessions completed over the scenario's wall time
+- peak RSS of the process after the scenario
+
+Each scenario runs --repeats times, interleaved with the others, and every
+figure is the median across the runs, so one lucky or unlucky run doesn't
+move it.
+
+It also counts LLM calls and tokens per session, which don't depend on the
+machine.
+
+With --baseline it compares against a stored run and exits 1 if a figure
+regressed by more than --tolerance:
+
+- anywhere: more failed sessions, or more LLM calls or tokens per session
+- only on the host and CPU count that recorded the baseline, since wall-clock
+  figures don't carry over between machines: ingest p50, end-to-end p50/p95
+  and RSS grew, or throughput fell. The other percentiles are reported but
+  not gated (see GATED_PERCENTILES).
+
+Run from backend/:
+    python -m benchmarks.bench_webhook
+    python -m benchmarks.bench_webhook --baseline benchmarks/baseline_webhook.json
+    python -m benchmarks.bench_webhook --update-baseline benchmarks/baseline_webhook.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import FORMATS, SIZES, make_report, session_ids
+
+# Latency regressions smaller than this are noise, whatever the ratio
+LATENCY_SLACK_MS = 50.0
+# End-to-end latency moves in whole LLM round trips (a session just misses a
+# topic batch, or queues behind another call), so regressions smaller than
+# this many median fake-LLM latencies are noise too
+LLM_ROUNDS_SLACK = 2
+# Percentiles the baseline check gates on. p99 of a few dozen sessions is
+# just the slowest one. Ingest takes a few ms, so its tail is whenever the
+# job worker, sharing the event loop, happened to hold it.
+GATED_PERCENTILES = {"ingest_ms": ("p50",), "end_to_end_ms": ("p50", "p95")}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(SIZES), help="comma-separated corpus sizes")
+    parser.add_argument("--formats", default=",".join(FORMATS), help="comma-separated report formats")
+    parser.add_argument("--sessions", type=int, default=30, help="sessions per scenario run")
+    parser.add_argument("--repeats", type=int, default=3, help="runs per scenario; figures are the median")
+    parser.add_argument("--rate", type=float, default=10.0, help="webhook arrivals per second")
+    parser.add_argument("--workers", type=int, default=8, help="JOB_WORKER_CONCURRENCY")
+    parser.add_argument("--llm-latency", default="lognormal:200,0.3", help="FAKE_LLM_LATENCY distribution")
+    parser.add_argument("--ms-per-token", type=float, default=1.0, help="FAKE_LLM_MS_PER_TOKEN")
+    parser.add_argument("--db-latency-ms", type=float, default=2.0, help="delay per database request")
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds to wait for one session")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", help="baseline JSON to compare against")
+    parser.add_argument("--update-baseline", metavar="PATH", help="write this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    return parser.parse_args(argv)
+
+
+def configure(args, tmp: str):
+    """Environment for the app; must run before it's imported."""
+    os.environ.update({
+        "LLM_BACKEND": "fake",
+        "LLM_CACHE_BACKEND": "none",
+        "AUDIO_METRICS_ENABLED": "false",  # synthetic calls have no recordings
+        "JOB_QUEUE_BACKEND": "sqlite",
+        "JOB_QUEUE_SQLITE_PATH": os.path.join(tmp, "jobs.sqlite3"),
+        "JOB_WORKER_ENABLED": "true",
+        "JOB_WORKER_CONCURRENCY": str(args.workers),
+        "FAKE_LLM_LATENCY": args.llm_latency,
+        "FAKE_LLM_MS_PER_TOKEN": str(args.ms_per_token),
+        "FAKE_LLM_SEED": str(args.seed),
+    })
+    for name in ("OPENAI_API_KEY", "SUPABASE_KEY", "SUPABASE_SERVICE_KEY"):
+        os.environ.setdefault(name, "offline")
+    os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def percentiles_ms(samples: list[float]) -> dict:
+    if not samples:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+    ordered = sorted(samples)
+
+    def pct(q):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000, 1)
+
+    return {"p50": round(statistics.median(ordered) * 1000, 1), "p95": pct(0.95), "p99": pct(0.99)}
+
+
+def host() -> dict:
+    """What wall-clock figures are only comparable within."""
+    return {"name": platform.node(), "cpus": os.cpu_count()}
+
+
+def llm_totals() -> tuple[int, int]:
+    """LLM calls and tokens so far."""
+    from services import llm
+
+    usage = llm.usage().values()
+    return (
+        sum(entry["calls"] for entry in usage),
+        sum(entry["prompt_tokens"] + entry["completion_tokens"] for entry in usage),
+    )
+
+
+async def run_scenario(client, db, args, size: str, fmt: str, repeat: int) -> dict:
+    from services import events
+
+    # Fresh call ids per run, or the webhook's idempotency keys would drop them
+    first = repeat * args.sessions
+    reports = [make_report(first + i, size, fmt, args.seed) for i in range(args.sessions)]
+    ingest, end_to_end = [], []
+    failed = 0
+
+    async def one(report, delay: float):
+        nonlocal failed
+        await asyncio.sleep(delay)
+        user_id, session_id = session_ids(report)
+        db.tables["sessions"].append({"id": session_id, "user_id": user_id})
+        with events.subscribe(session_id) as queue:
+            started = time.perf_counter()
+            response = await client.post("/api/vapi/webhook", json=report)
+            ingest.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                failed += 1
+                return
+            try:
+                while True:
+                    event = await asyncio.wait_for(queue.get(), timeout=args.timeout)
+                    if event["event"] in events.TERMINAL_EVENTS:
+                        break
+            except asyncio.TimeoutError:
+                failed += 1
+                return
+            if event["event"] != events.EVALUATION_COMPLETED:
+                failed += 1
+                return
+            end_to_end.append(time.perf_counter() - started)
+
+    calls_before, tokens_before = llm_totals()
+    started = time.perf_counter()
+    await asyncio.gather(*(one(report, i / args.rate) for i, report in enumerate(reports)))
+    wall = time.perf_counter() - started
+    calls, tokens = llm_totals()
+
+    return {
+        "scenario": f"{size}/{fmt}",
+        "sessions": len(reports),
+        "failed": failed,
+        "sessions_per_second": round(len(end_to_end) / wall, 2),
+        "ingest_ms": percentiles_ms(ingest),
+        "end_to_end_ms": percentiles_ms(end_to_end),
+        "llm_calls_per_session": round((calls - calls_before) / len(reports), 2),
+        "llm_tokens_per_session": round((tokens - tokens_before) / len(reports)),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+async def run(args) -> dict:
+    import httpx
+
+    from benchmarks.fakes import InMemorySupabase, install
+    from main import app, lifespan
+    from services import llm
+
+    db = InMemorySupabase(latency_ms=args.db_latency_ms)
+    install(db)
+
+    names = [(size, fmt) for size in args.sizes.split(",") for fmt in args.formats.split(",")]
+    runs = {f"{size}/{fmt}": [] for size, fmt in names}
+    transport = httpx.ASGITransport(app=app)
+    async with lifespan(app), httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for repeat in range(args.repeats):
+            for size, fmt in names:
+                result = await run_scenario(client, db, args, size, fmt, repeat)
+                runs[result["scenario"]].append(result)
+
+    scenarios = [median_run(results) for results in runs.values()]
+    for result in scenarios:
+        print_scenario(result)
+
+    return {
+        "host": host(),
+        "settings": {
+            "sessions": args.sessions,
+            "repeats": args.repeats,
+            "rate": args.rate,
+            "workers": args.workers,
+            "llm_latency": args.llm_latency,
+            "ms_per_token": args.ms_per_token,
+            "db_latency_ms": args.db_latency_ms,
+            "seed": args.seed,
+        },
+        "scenarios": {s["scenario"]: s for s in scenarios},
+        "peak_rss_mb": peak_rss_mb(),
+        "llm_usage": llm.usage(),
+    }
+
+
+def median_run(results: list[dict]) -> dict:
+    """One scenario's runs folded into one: the median of each figure,
+    failures summed."""
+    def latencies(metric):
+        return {q: round(statistics.median(r[metric][q] for r in results), 1) for q in results[0][metric]}
+
+    return {
+        "scenario": results[0]["scenario"],
+        "sessions": sum(r["sessions"] for r in results),
+        "failed": sum(r["failed"] for r in results),
+        "sessions_per_second": round(statistics.median(r["sessions_per_second"] for r in results), 2),
+        "ingest_ms": latencies("ingest_ms"),
+        "end_to_end_ms": latencies("end_to_end_ms"),
+        "llm_calls_per_session": round(statistics.median(r["llm_calls_per_session"] for r in results), 2),
+        "llm_tokens_per_session": round(statistics.median(r["llm_tokens_per_session"] for r in results)),
+        "peak_rss_mb": max(r["peak_rss_mb"] for r in results),
+    }
+
+
+def print_scenario(result: dict):
+    ingest, e2e = result["ingest_ms"], result["end_to_end_ms"]
+    print(
+        f"  {result['scenario']:<18} {result['sessions_per_second']:>10.2f} "
+        f"{ingest['p50']:>8.1f} {ingest['p95']:>8.1f} {ingest['p99']:>8.1f} "
+        f"{e2e['p50']:>9.1f} {e2e['p95']:>9.1f} {e2e['p99']:>9.1f} "
+        f"{result['llm_calls_per_session']:>9.2f} {result['llm_tokens_per_session']:>10} "
+        f"{result['peak_rss_mb']:>8.1f} {result['failed']:>6}"
+    )
+
+
+def latency_slack_ms(llm_latency: str) -> dict:
+    """Smallest latency increase, per metric, that counts as a regression."""
+    from services.fake_llm import LatencyDistribution
+
+    distribution, rng = LatencyDistribution(llm_latency), random.Random(0)
+    llm_ms = statistics.median(distribution.sample(rng) for _ in range(1001))
+    return {"ingest_ms": LATENCY_SLACK_MS, "end_to_end_ms": max(LATENCY_SLACK_MS, LLM_ROUNDS_SLACK * llm_ms)}
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Regressions of this run against the baseline, as readable lines."""
+    regressions = []
+    slack = latency_slack_ms(report["settings"]["llm_latency"])
+    if report["settings"] != baseline.get("settings"):
+        print("  note: settings differ from the baseline's; comparison may not be meaningful")
+    same_host = report["host"] == baseline.get("host")
+    if not same_host:
+        print(
+            f"  note: baseline recorded on {baseline.get('host')}, this is {report['host']}; "
+            "latency, throughput and RSS not compared (record a baseline here with --update-baseline)"
+        )
+
+    for name, base in baseline.get("scenarios", {}).items():
+        current = report["scenarios"].get(name)
+        if current is None:
+            continue
+        if current["failed"] > base["failed"]:
+            regressions.append(f"{name}: {current['failed']} failed sessions (baseline {base['failed']})")
+        for metric in ("llm_calls_per_session", "llm_tokens_per_session"):
+            if metric in base and current[metric] > base[metric] * (1 + tolerance):
+                regressions.append(f"{name}: {metric} {current[metric]} vs {base[metric]}")
+        if not same_host:
+            continue
+        for metric, percentiles in GATED_PERCENTILES.items():
+            for q in percentiles:
+                now, then = current[metric][q], base[metric][q]
+                if now > then * (1 + tolerance) and now - then > slack[metric]:
+                    regressions.append(f"{name}: {metric} {q} {now:.1f} vs {then:.1f}")
+        if current["sessions_per_second"] < base["sessions_per_second"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: {current['sessions_per_second']:.2f} sessions/s vs {base['sessions_per_second']:.2f}"
+            )
+
+    if same_host and report["peak_rss_mb"] > baseline.get("peak_rss_mb", float("inf")) * (1 + tolerance):
+        regressions.append(f"peak RSS {report['peak_rss_mb']:.1f} MB vs {baseline['peak_rss_mb']:.1f} MB")
+    return regressions
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    print(
+        f"{args.repeats} x {args.sessions} sessions per scenario at {args.rate}/s, {args.workers} workers, "
+        f"LLM {args.llm_latency} + {args.ms_per_token}ms/token, DB {args.db_latency_ms}ms/request"
+    )
+    print(
+        f"  {'scenario':<18} {'sessions/s':>10} {'ingest':>8} {'p95':>8} {'p99':>8} "
+        f"{'e2e p50':>9} {'p95':>9} {'p99':>9} {'LLM calls':>9} {'LLM tokens':>10} {'RSS MB':>8} {'failed':>6}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        configure(args, tmp)
+        report = asyncio.run(run(args))
+    print(f"  peak RSS: {report['peak_rss_mb']:.1f} MB")
+
+    if args.update_baseline:
+        with open(args.update_baseline, "w") as f:
+            json.dump({key: report[key] for key in ("host", "settings", "scenarios", "peak_rss_mb")}, f, indent=2)
+            f.write("\n")
+        print(f"Baseline written to {args.update_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print(f"REGRESSIONS against {args.baseline} (tolerance {args.tolerance:.0%}):")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Synthetic VAPI end-of-call-report payloads for the benchmarks.
+
+Each report is a coaching call in the shape the real prompt produces (topic
+ask, practice turn, feedback, retry/new-topic loop), so topic segmentation,
+phrase counting and every LLM step see realistic input. Reports come in the
+two formats handle_end_of_call parses:
+
+- "structured": artifact.messagesOpenAIFormatted ({role, content} turns,
+  system message included) plus the flat transcript, as VAPI sends them
+- "flat": only the "AI: ... / User: ..." transcript string
+
+and three sizes (SIZES). Generation is deterministic per (index, seed).
+
+Dump a corpus as JSONL from backend/:
+    python -m benchmarks.corpus --size large --format flat --count 100 > large-flat.jsonl
+"""
+import argparse
+import json
+import random
+
+# Size name -> (conversation turns, words per practice answer)
+SIZES = {
+    "small": (12, 60),
+    "medium": (40, 120),
+    "large": (300, 80),
+}
+FORMATS = ("structured", "flat")
+
+GREETING = "Hey! I'm Alexa, your communication coach. How are you doing today?"
+ASK = "What topic or situation do you want to practice today?"
+GO_AHEAD = "OK, go ahead — talk to me like you would in that real situation. Aim for about 60 seconds."
+FEEDBACK = (
+    "Nice work leading with the ask — that was specific. You hedged with 'I think' and "
+    "'maybe' a few times, which softens your position. Micro-skill: put the recommendation "
+    "in your first sentence. A confident leader would say: we ship Friday, testing is done."
+)
+LOOP = "Want to retry the same topic, try something new, or are you done for today?"
+RETRY = "Alright, same topic — give it another shot."
+NEXT = "What do you want to practice next?"
+
+TOPICS = [
+    "giving feedback to a report", "pitching a new idea to leadership", "saying no to my boss",
+    "asking for more budget", "running a tough one-on-one", "presenting quarterly results",
+]
+ANSWER_WORDS = (
+    "um I think we should maybe ship next week because the team has finished testing "
+    "and customers are waiting so basically the budget is fine and you know the timeline "
+    "is tight but our roadmap depends on it and I recommend we commit to Friday"
+).split()
+
+
+def _conversation(rng: random.Random, turns: int, answer_words: int) -> list[dict]:
+    messages = []
+
+    def say(role, content):
+        messages.append({"role": role, "content": content})
+
+    say("assistant", GREETING)
+    say("user", "Good, thanks. Let's go straight to practice.")
+    say("assistant", ASK)
+    topic = rng.choice(TOPICS)
+    while len(messages) < turns:
+        say("user", topic)
+        say("assistant", GO_AHEAD)
+        say("user", " ".join(rng.choice(ANSWER_WORDS) for _ in range(rng.randint(answer_words // 2, answer_words))))
+        say("assistant", FEEDBACK)
+        say("assistant", LOOP)
+        if rng.random() < 0.3:
+            say("user", "Same topic, let me retry.")
+            say("assistant", RETRY)
+            say("user", " ".join(rng.choice(ANSWER_WORDS) for _ in range(answer_words // 2)))
+            say("assistant", FEEDBACK)
+            say("assistant", LOOP)
+        say("user", "Let's try something new.")
+        say("assistant", NEXT)
+        topic = rng.choice(TOPICS)
+    del messages[turns - 1:]
+    say("user", "I'm done, thanks.")
+    return messages
+
+
+def make_report(index: int, size: str = "medium", fmt: str = "structured", seed: int = 0) -> dict:
+    """The end-of-call-report webhook body for synthetic call `index`."""
+    turns, answer_words = SIZES[size]
+    rng = random.Random(f"{seed}:{size}:{index}")
+    conversation = _conversation(rng, turns, answer_words)
+    transcript = "\n".join(
+        f"{'AI' if turn['role'] == 'assistant' else 'User'}: {turn['content']}" for turn in conversation
+    )
+
+    message = {
+        "type": "end-of-call-report",
+        "call": {
+            "id": f"bench-{size}-{fmt}-{seed}-{index}",
+            "metadata": {
+                "user_id": f"bench-user-{index % 50}",
+                "session_id": f"bench-session-{size}-{fmt}-{seed}-{index}",
+            },
+        },
+        "durationSeconds": 15 * len(conversation),
+        "transcript": transcript,
+        "recordingUrl": f"https://example.com/recordings/{size}-{index}.wav",
+    }
+    if fmt == "structured":
+        system = {"role": "system", "content": "You are Alexa, an expert communication coach."}
+        message["artifact"] = {"messagesOpenAIFormatted": [system] + conversation}
+    elif fmt != "flat":
+        raise ValueError(f"Unknown report format: {fmt!r}")
+    return {"message": message}
+
+
+def session_ids(report: dict) -> tuple[str, str]:
+    """(user_id, session_id) of a report."""
+    metadata = report["message"]["call"]["metadata"]
+    return metadata["user_id"], metadata["session_id"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", choices=list(SIZES), default="medium")
+    parser.add_argument("--format", choices=FORMATS, default="structured")
+    parser.add_argument("--count", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    for index in range(args.count):
+        print(json.dumps(make_report(index, args.size, args.format, args.seed)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""In-memory stand-in for the Supabase client, for offline benchmarks.
+
+Covers the PostgREST query-builder calls the backend makes (select / eq /
+gte / order / limit / single, insert, update, upsert with on_conflict and
+ignore_duplicates, rpc into Python versions of the database functions)
+against plain dicts, with an optional per-request delay so a benchmark can
+model database round trips. Like the real client it is synchronous, so that
+delay blocks the event loop exactly where a real request would.
+
+    db = InMemorySupabase(latency_ms=5)
+    install(db)   # swap it in for services.supabase_client.supabase_admin
+"""
+import copy
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+
+
+class _Query:
+    def __init__(self, db: "InMemorySupabase", table: str):
+        self.db = db
+        self.table = table
+        self.action = "select"
+        self.payload = None
+        self.on_conflict = None
+        self.ignore_duplicates = False
+        self.filters = []
+        self.ordering = None
+        self.row_limit = None
+        self.single_row = False
+
+    # Actions
+    def select(self, columns: str = "*", **_):
+        self.action = "select"
+        return self
+
+    def insert(self, rows, **_):
+        self.action, self.payload = "insert", rows
+        return self
+
+    def update(self, values: dict, **_):
+        self.action, self.payload = "update", values
+        return self
+
+    def upsert(self, rows, on_conflict: str = "id", ignore_duplicates: bool = False, **_):
+        self.action, self.payload = "upsert", rows
+        self.on_conflict, self.ignore_duplicates = on_conflict, ignore_duplicates
+        return self
+
+    def delete(self, **_):
+        self.action = "delete"
+        return self
+
+    # Filters and modifiers
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(lambda row: row.get(column) is not None and row[column] >= value)
+        return self
+
+    def lt(self, column, value):
+        self.filters.append(lambda row: row.get(column) is not None and row[column] < value)
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def order(self, column, desc: bool = False, **_):
+        self.ordering = (column, desc)
+        return self
+
+    def limit(self, count: int, **_):
+        self.row_limit = count
+        return self
+
+    def single(self):
+        self.single_row = True
+        return self
+
+    def execute(self):
+        self.db.round_trip(f"{self.action}:{self.table}")
+        with self.db.lock:
+            data = getattr(self, f"_{self.action}")(self.db.tables[self.table])
+        data = copy.deepcopy(data)
+        if self.single_row:
+            data = data[0] if data else None
+        return SimpleNamespace(data=data, count=None)
+
+    def _matches(self, row: dict) -> bool:
+        return all(f(row) for f in self.filters)
+
+    def _select(self, rows: list[dict]) -> list[dict]:
+        found = [row for row in rows if self._matches(row)]
+        if self.ordering:
+            column, desc = self.ordering
+            found.sort(key=lambda row: row.get(column) or "", reverse=desc)
+        return found[:self.row_limit] if self.row_limit is not None else found
+
+    def _insert(self, rows: list[dict]) -> list[dict]:
+        new = [self.db.new_row(row) for row in _as_list(self.payload)]
+        rows.extend(new)
+        return new
+
+    def _update(self, rows: list[dict]) -> list[dict]:
+        updated = []
+        for row in rows:
+            if self._matches(row):
+                row.update(self.payload)
+                updated.append(row)
+        return updated
+
+    def _upsert(self, rows: list[dict]) -> list[dict]:
+        keys = self.on_conflict.split(",")
+        written = []
+        for values in _as_list(self.payload):
+            existing = next((row for row in rows if all(row.get(k) == values.get(k) for k in keys)), None)
+            if existing is None:
+                existing = self.db.new_row(values)
+                rows.append(existing)
+            elif self.ignore_duplicates:
+                continue
+            else:
+                existing.update(values)
+            written.append(existing)
+        return written
+
+    def _delete(self, rows: list[dict]) -> list[dict]:
+        deleted = [row for row in rows if self._matches(row)]
+        rows[:] = [row for row in rows if not self._matches(row)]
+        return deleted
+
+
+def _as_list(rows) -> list[dict]:
+    return rows if isinstance(rows, list) else [rows]
+
+
+class _Rpc:
+    def __init__(self, db: "InMemorySupabase", name: str, params: dict):
+        self.db, self.name, self.params = db, name, params
+
+    def execute(self):
+        self.db.round_trip(f"rpc:{self.name}")
+        fn = self.db.functions.get(self.name)
+        if fn is None:
+            raise NotImplementedError(f"InMemorySupabase has no rpc {self.name!r}; register one with .function()")
+        with self.db.lock:
+            return SimpleNamespace(data=copy.deepcopy(fn(self.db.tables, **self.params)), count=None)
+
+
+def record_practice(tables, p_user_id: str, p_day: str) -> dict:
+    """record_practice() from migration_streaks.sql."""
+    day = date.fromisoformat(p_day)
+    row = next((r for r in tables["streaks"] if r["user_id"] == p_user_id), None)
+    if row is None:
+        row = {"user_id": p_user_id, "current_streak": 0, "longest_streak": 0, "last_practice_date": None}
+        tables["streaks"].append(row)
+    last = date.fromisoformat(row["last_practice_date"]) if row["last_practice_date"] else None
+    if last is None or last < day:
+        row["current_streak"] = row["current_streak"] + 1 if last == day - timedelta(days=1) else 1
+        row["longest_streak"] = max(row["longest_streak"], row["current_streak"])
+        row["last_practice_date"] = p_day
+    return row
+
+
+# Database functions the backend calls through rpc()
+FUNCTIONS = {
+    "record_practice": record_practice,
+}
+
+
+class InMemorySupabase:
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_seconds = latency_ms / 1000
+        self.tables: dict[str, list[dict]] = defaultdict(list)
+        self.functions = dict(FUNCTIONS)
+        self.requests = Counter()
+        self.lock = threading.Lock()
+
+    def table(self, name: str) -> _Query:
+        return _Query(self, name)
+
+    def rpc(self, name: str, params: dict | None = None) -> _Rpc:
+        return _Rpc(self, name, params or {})
+
+    def function(self, name: str, fn):
+        """Register fn(tables, **params) as a database function for rpc()."""
+        self.functions[name] = fn
+
+    def round_trip(self, label: str):
+        self.requests[label] += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+    def new_row(self, values: dict) -> dict:
+        return {
+            "id": str(uuid.uuid4()),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            **values,
+        }
+
+
+def install(db: InMemorySupabase):
+    """Point every loaded module's `supabase_admin` at db. Import the
+    modules under test first; they bind the client at import time."""
+    import services.supabase_client as supabase_client
+
+    original = supabase_client.supabase_admin
+    for module in list(sys.modules.values()):
+        if getattr(module, "supabase_admin", None) is original:
+            module.supabase_admin = db
+    for store in _job_stores():
+        if getattr(store, "db", None) is original:
+            store.db = db
+
+
+def _job_stores():
+    jobs = sys.modules.get("services.jobs")
+    return [jobs.store] if jobs is not None and hasattr(jobs, "store") else []
@@ -11,6 +11,116 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 VAPI_API_KEY = os.getenv("VAPI_API_KEY")
 VAPI_PUBLIC_KEY = os.getenv("VAPI_PUBLIC_KEY")
 VAPI_SERVER_URL = os.getenv("VAPI_SERVER_URL", "http://localhost:8000")
+VAPI_WEBHOOK_SECRET = os.getenv("VAPI_WEBHOOK_SECRET")  # the assistant's server secret, sent as X-Vapi-Secret
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:5173")
 PORT = int(os.getenv("PORT", "8000"))
 VAPI_ASSISTANT_ID = os.getenv("VAPI_ASSISTANT_ID")
+
+# Shared OpenAI gateway (services/llm.py)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")  # "openai" or "fake" (offline, services/fake_llm.py)
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "5"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "10"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+
+# Rate-limit governor for every OpenAI request (services/llm_governor.py)
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))  # per request, on 429s, 5xx, timeouts and connection errors
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.5"))  # backoff before jitter doubles from here
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", "20"))
+
+# Offline LLM backend for load tests (services/fake_llm.py)
+FAKE_LLM_LATENCY = os.getenv("FAKE_LLM_LATENCY", "fixed:50")  # "fixed:MS", "uniform:LO,HI", "normal:MEAN,STD", "lognormal:MEDIAN,SIGMA"
+FAKE_LLM_MS_PER_TOKEN = float(os.getenv("FAKE_LLM_MS_PER_TOKEN", "0"))
+FAKE_LLM_ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+FAKE_LLM_RATE_LIMIT_RATE = float(os.getenv("FAKE_LLM_RATE_LIMIT_RATE", "0"))
+FAKE_LLM_TIMEOUT_RATE = float(os.getenv("FAKE_LLM_TIMEOUT_RATE", "0"))
+FAKE_LLM_MALFORMED_RATE = float(os.getenv("FAKE_LLM_MALFORMED_RATE", "0"))
+FAKE_LLM_RESPONSES = os.getenv("FAKE_LLM_RESPONSES")  # JSON file of canned replies per prompt kind
+FAKE_LLM_SEED = int(os.getenv("FAKE_LLM_SEED", "0"))
+FAKE_LLM_RPM = int(os.getenv("FAKE_LLM_RPM", "0"))  # requests per minute before 429s; 0 = unlimited, no rate-limit headers
+FAKE_LLM_TPM = int(os.getenv("FAKE_LLM_TPM", "0"))  # tokens per minute (prompt + max_tokens, as OpenAI counts them)
+
+# Durable job queue (services/jobs.py)
+JOB_QUEUE_BACKEND = os.getenv("JOB_QUEUE_BACKEND", "postgres")  # "postgres" or "sqlite"
+JOB_QUEUE_SQLITE_PATH = os.getenv("JOB_QUEUE_SQLITE_PATH", "jobs.sqlite3")
+JOB_WORKER_ENABLED = os.getenv("JOB_WORKER_ENABLED", "true").lower() == "true"
+JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", "4"))
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "5"))
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "5"))
+JOB_RETRY_MAX_SECONDS = float(os.getenv("JOB_RETRY_MAX_SECONDS", "600"))
+JOB_SHUTDOWN_GRACE_SECONDS = float(os.getenv("JOB_SHUTDOWN_GRACE_SECONDS", "30"))  # in-flight jobs get this long at shutdown
+
+# LLM response cache (services/llm_cache.py)
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "memory")  # "memory", "sqlite" or "none"
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000"))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3")
+
+# Session progress stream (GET /api/sessions/{id}/events)
+SSE_RECHECK_SECONDS = float(os.getenv("SSE_RECHECK_SECONDS", "15"))
+SSE_MAX_SECONDS = float(os.getenv("SSE_MAX_SECONDS", "300"))
+
+# Local JWT verification (services/token_verifier.py)
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")  # legacy HS256 projects
+AUTH_JWT_AUDIENCE = os.getenv("AUTH_JWT_AUDIENCE", "authenticated")
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+AUTH_JWKS_CACHE_SECONDS = int(os.getenv("AUTH_JWKS_CACHE_SECONDS", "600"))
+
+# Quick feedback: stream the completion and push fields as they finish
+FEEDBACK_STREAMING = os.getenv("FEEDBACK_STREAMING", "true").lower() == "true"
+
+# Voice metrics measured from the call recording (services/audio_metrics.py)
+AUDIO_METRICS_ENABLED = os.getenv("AUDIO_METRICS_ENABLED", "true").lower() == "true"  # needs numpy + soundfile
+AUDIO_WORKERS = int(os.getenv("AUDIO_WORKERS", "2"))  # analysis processes
+AUDIO_MAX_MB = int(os.getenv("AUDIO_MAX_MB", "100"))
+AUDIO_DOWNLOAD_TIMEOUT_SECONDS = float(os.getenv("AUDIO_DOWNLOAD_TIMEOUT_SECONDS", "30"))
+# Hosts recordings (and their redirects) may be fetched from, over HTTPS only
+AUDIO_ALLOWED_HOSTS = {h.strip().lower() for h in os.getenv("AUDIO_ALLOWED_HOSTS", "storage.vapi.ai").split(",") if h.strip()}
+AUDIO_USER_CHANNEL = int(os.getenv("AUDIO_USER_CHANNEL", "0"))  # caller's channel in stereo recordings
+
+# Voice metric scores: "local" computes them from transcript features (services/scoring.py,
+# needs numpy) and the LLM only writes the notes; "llm" has the LLM score them too
+VOICE_METRICS_SCORING = os.getenv("VOICE_METRICS_SCORING", "local")
+
+# Evaluation tiers: fast / standard / deep (services/tiers.py)
+EVALUATION_TIER_DEFAULT = os.getenv("EVALUATION_TIER_DEFAULT", "auto")  # "auto" (by call size) or a tier name
+TIER_FAST_MAX_WORDS = int(os.getenv("TIER_FAST_MAX_WORDS", "80"))  # fewer caller words: fast
+TIER_DEEP_MIN_WORDS = int(os.getenv("TIER_DEEP_MIN_WORDS", "400"))  # this many caller words: deep
+TIER_DEEP_MIN_TOPICS = int(os.getenv("TIER_DEEP_MIN_TOPICS", "2"))  # or this many topics: deep
+TIER_SLA_FAST_SECONDS = float(os.getenv("TIER_SLA_FAST_SECONDS", "10"))
+TIER_SLA_STANDARD_SECONDS = float(os.getenv("TIER_SLA_STANDARD_SECONDS", "45"))
+TIER_SLA_DEEP_SECONDS = float(os.getenv("TIER_SLA_DEEP_SECONDS", "90"))
+TIER_LOAD_HIGH_WAITING = int(os.getenv("TIER_LOAD_HIGH_WAITING", str(LLM_MAX_CONCURRENCY)))  # LLM requests queued: cap at standard
+TIER_LOAD_OVERLOAD_WAITING = int(os.getenv("TIER_LOAD_OVERLOAD_WAITING", str(4 * LLM_MAX_CONCURRENCY)))  # cap at fast
+TIER_RATE_LIMIT_WINDOW_SECONDS = float(os.getenv("TIER_RATE_LIMIT_WINDOW_SECONDS", "60"))  # a 429 within it: cap at standard
+
+# Deep evaluation (services/evaluation.py)
+EVALUATION_PARTIAL_WRITES = os.getenv("EVALUATION_PARTIAL_WRITES", "true").lower() == "true"  # store each step's columns as it finishes
+# "multi": a call per step; "single": one structured-output call for standard and deep tiers
+EVALUATION_MODE = os.getenv("EVALUATION_MODE", "multi")
+
+# Cross-session topic analysis batching (services/topic_batcher.py)
+TOPIC_BATCH_WINDOW_MS = float(os.getenv("TOPIC_BATCH_WINDOW_MS", "150"))
+TOPIC_BATCH_MAX_INPUT_TOKENS = int(os.getenv("TOPIC_BATCH_MAX_INPUT_TOKENS", "12000"))
+TOPIC_BATCH_MAX_TOPICS = int(os.getenv("TOPIC_BATCH_MAX_TOPICS", "12"))
+TOPIC_OUTPUT_TOKENS_PER_TOPIC = int(os.getenv("TOPIC_OUTPUT_TOKENS_PER_TOPIC", "450"))
+
+# Transcript token budgets per LLM call (services/transcript_budget.py)
+FEEDBACK_TRANSCRIPT_MAX_TOKENS = int(os.getenv("FEEDBACK_TRANSCRIPT_MAX_TOKENS", "3000"))
+VOICE_METRICS_MAX_TOKENS = int(os.getenv("VOICE_METRICS_MAX_TOKENS", "1500"))
+TOPIC_SESSION_MAX_TOKENS = int(os.getenv("TOPIC_SESSION_MAX_TOKENS", "2400"))
+TOPIC_SEGMENT_MAX_TOKENS = int(os.getenv("TOPIC_SEGMENT_MAX_TOKENS", "800"))
+TOPIC_PREVIEW_MAX_TOKENS = int(os.getenv("TOPIC_PREVIEW_MAX_TOKENS", "600"))
+TOPIC_PREVIEW_SEGMENT_TOKENS = int(os.getenv("TOPIC_PREVIEW_SEGMENT_TOKENS", "100"))
+
+# In-call transcript analysis from VAPI conversation updates (services/live_call.py)
+LIVE_ANALYSIS_ENABLED = os.getenv("LIVE_ANALYSIS_ENABLED", "true").lower() == "true"
+LIVE_CALL_TTL_SECONDS = float(os.getenv("LIVE_CALL_TTL_SECONDS", "1800"))
+LIVE_CALL_MAX_CALLS = int(os.getenv("LIVE_CALL_MAX_CALLS", "1000"))
+
+# Metrics and tracing, served at GET /metrics (services/metrics.py)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+OTEL_ENABLED = os.getenv("OTEL_ENABLED", "false").lower() == "true"  # needs opentelemetry-api + an SDK/exporter
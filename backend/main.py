@@ -1,10 +1,29 @@
-from fastapi import FastAPI
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
-from config import FRONTEND_URL
+from config import FRONTEND_URL, JOB_WORKER_ENABLED
 from routers import auth, sessions, vapi_webhook, dashboard
+from services import audio_metrics, jobs, llm, metrics, tokens
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the tiktoken encoding before any request counts tokens on the event loop
+    await asyncio.to_thread(tokens.warm_up)
+    if JOB_WORKER_ENABLED:
+        jobs.start_worker()
+    yield
+    await jobs.stop_worker()
+    await llm.aclose()
+    audio_metrics.shutdown()
 
-app = FastAPI(title="Communication Coach API", version="1.0.0")
+
+app = FastAPI(title="Communication Coach API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -14,6 +33,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Endpoint name, not the raw path, to keep label cardinality bounded
+        route = request.scope.get("route")
+        metrics.HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            handler=getattr(route, "name", "unmatched"),
+            status=status,
+        )
+
+
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(sessions.router, prefix="/api/sessions", tags=["sessions"])
 app.include_router(vapi_webhook.router, prefix="/api/vapi", tags=["vapi"])
@@ -23,3 +62,8 @@ app.include_router(dashboard.router, prefix="/api/dashboard", tags=["dashboard"]
 @app.get("/api/health")
 async def health_check():
     return {"status": "ok"}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
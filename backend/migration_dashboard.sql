@@ -0,0 +1,176 @@
+-- Dashboard Stats Migration
+-- Run in Supabase SQL Editor
+
+-- Per-user aggregates maintained incrementally by triggers, so the dashboard
+-- never scans sessions or feedback history.
+CREATE TABLE IF NOT EXISTS user_stats (
+  user_id UUID PRIMARY KEY REFERENCES profiles(id) ON DELETE CASCADE,
+  total_sessions INTEGER NOT NULL DEFAULT 0,
+  strength_counts JSONB NOT NULL DEFAULT '{}'::jsonb,
+  current_micro_skill TEXT,
+  last_feedback_at TIMESTAMPTZ,
+  updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+ALTER TABLE user_stats ENABLE ROW LEVEL SECURITY;
+
+DO $$ BEGIN
+  CREATE POLICY "Users can view own stats" ON user_stats
+    FOR SELECT USING (auth.uid() = user_id);
+EXCEPTION WHEN duplicate_object THEN NULL;
+END $$;
+
+CREATE INDEX IF NOT EXISTS idx_sessions_user_created ON sessions(user_id, created_at DESC);
+
+-- sessions: keep total_sessions in step with inserts/deletes
+CREATE OR REPLACE FUNCTION user_stats_count_sessions()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    INSERT INTO user_stats (user_id, total_sessions) VALUES (NEW.user_id, 1)
+    ON CONFLICT (user_id) DO UPDATE
+      SET total_sessions = user_stats.total_sessions + 1, updated_at = NOW();
+    RETURN NEW;
+  END IF;
+
+  UPDATE user_stats
+    SET total_sessions = GREATEST(total_sessions - 1, 0), updated_at = NOW()
+    WHERE user_id = OLD.user_id;
+  RETURN OLD;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS sessions_user_stats ON sessions;
+CREATE TRIGGER sessions_user_stats
+  AFTER INSERT OR DELETE ON sessions
+  FOR EACH ROW EXECUTE FUNCTION user_stats_count_sessions();
+
+-- feedback: fold strengths into the running counts and track the latest
+-- micro-skill. Counts move by the difference between OLD and NEW strengths,
+-- so a retried upsert with the same strengths changes nothing, a row whose
+-- strengths arrive in a later update still counts, and a deleted row is
+-- taken back out. Only the strengths that changed are touched.
+CREATE OR REPLACE FUNCTION user_stats_fold_feedback()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+  v_user_id UUID := CASE WHEN TG_OP = 'DELETE' THEN OLD.user_id ELSE NEW.user_id END;
+  v_strength TEXT;
+  v_change INTEGER;
+BEGIN
+  INSERT INTO user_stats (user_id) VALUES (v_user_id)
+  ON CONFLICT (user_id) DO NOTHING;
+
+  FOR v_strength, v_change IN
+    SELECT strength, SUM(change)::INTEGER
+    FROM (
+      SELECT strength, 1 AS change
+      FROM unnest(CASE WHEN TG_OP = 'DELETE' THEN '{}'::TEXT[] ELSE COALESCE(NEW.strengths, '{}'::TEXT[]) END) AS strength
+      UNION ALL
+      SELECT strength, -1
+      FROM unnest(CASE WHEN TG_OP = 'INSERT' THEN '{}'::TEXT[] ELSE COALESCE(OLD.strengths, '{}'::TEXT[]) END) AS strength
+    ) changes
+    GROUP BY strength
+    HAVING SUM(change) <> 0
+  LOOP
+    UPDATE user_stats
+      SET strength_counts = CASE
+            WHEN COALESCE((strength_counts ->> v_strength)::INTEGER, 0) + v_change > 0
+              THEN jsonb_set(
+                strength_counts, ARRAY[v_strength],
+                to_jsonb(COALESCE((strength_counts ->> v_strength)::INTEGER, 0) + v_change)
+              )
+            ELSE strength_counts - v_strength
+          END,
+          updated_at = NOW()
+      WHERE user_id = v_user_id;
+  END LOOP;
+
+  IF TG_OP = 'DELETE' THEN
+    RETURN OLD;
+  END IF;
+
+  IF NEW.micro_skill IS NOT NULL THEN
+    UPDATE user_stats
+      SET current_micro_skill = NEW.micro_skill,
+          last_feedback_at = NEW.created_at,
+          updated_at = NOW()
+      WHERE user_id = NEW.user_id
+        AND (last_feedback_at IS NULL OR last_feedback_at <= NEW.created_at);
+  END IF;
+
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS feedback_user_stats ON feedback;
+CREATE TRIGGER feedback_user_stats
+  AFTER INSERT OR UPDATE OF strengths, micro_skill OR DELETE ON feedback
+  FOR EACH ROW EXECUTE FUNCTION user_stats_fold_feedback();
+
+-- Everything GET /api/dashboard renders, in one round-trip. Recent sessions
+-- carry only the columns the list shows — never the transcripts.
+CREATE OR REPLACE FUNCTION get_dashboard(p_user_id UUID)
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT jsonb_build_object(
+    'total_sessions', COALESCE(us.total_sessions, 0),
+    'current_streak', COALESCE(st.current_streak, 0),
+    'longest_streak', COALESCE(st.longest_streak, 0),
+    'last_practice_date', st.last_practice_date,
+    'top_strengths', COALESCE((
+      SELECT jsonb_agg(key ORDER BY value::INTEGER DESC, key)
+      FROM (
+        SELECT key, value FROM jsonb_each_text(us.strength_counts)
+        ORDER BY value::INTEGER DESC, key
+        LIMIT 3
+      ) top
+    ), '[]'::jsonb),
+    'current_micro_skill', us.current_micro_skill,
+    'recent_sessions', COALESCE((
+      SELECT jsonb_agg(recent ORDER BY recent.created_at DESC)
+      FROM (
+        SELECT id, session_type, scenario, duration_seconds, created_at
+        FROM sessions
+        WHERE user_id = p_user_id
+        ORDER BY created_at DESC
+        LIMIT 10
+      ) recent
+    ), '[]'::jsonb)
+  )
+  FROM (SELECT p_user_id AS user_id) u
+  LEFT JOIN user_stats us ON us.user_id = u.user_id
+  LEFT JOIN streaks st ON st.user_id = u.user_id;
+$$;
+
+-- Backfill from existing history
+INSERT INTO user_stats (user_id, total_sessions, strength_counts, current_micro_skill, last_feedback_at)
+SELECT
+  p.id,
+  (SELECT COUNT(*) FROM sessions s WHERE s.user_id = p.id),
+  COALESCE((
+    SELECT jsonb_object_agg(strength, n)
+    FROM (
+      SELECT strength, COUNT(*) AS n
+      FROM feedback f, unnest(f.strengths) AS strength
+      WHERE f.user_id = p.id
+      GROUP BY strength
+    ) counts
+  ), '{}'::jsonb),
+  (SELECT micro_skill FROM feedback f WHERE f.user_id = p.id AND micro_skill IS NOT NULL
+   ORDER BY created_at DESC LIMIT 1),
+  (SELECT MAX(created_at) FROM feedback f WHERE f.user_id = p.id AND micro_skill IS NOT NULL)
+FROM profiles p
+ON CONFLICT (user_id) DO UPDATE SET
+  total_sessions = EXCLUDED.total_sessions,
+  strength_counts = EXCLUDED.strength_counts,
+  current_micro_skill = EXCLUDED.current_micro_skill,
+  last_feedback_at = EXCLUDED.last_feedback_at,
+  updated_at = NOW();
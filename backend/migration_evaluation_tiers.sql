@@ -0,0 +1,7 @@
+-- Evaluation Tiers Migration
+-- Run in Supabase SQL Editor
+
+-- Tier each evaluation ran at (services/tiers.py): fast, standard or deep.
+-- NULL for evaluations written before tiers existed (all ran as deep).
+ALTER TABLE evaluations ADD COLUMN IF NOT EXISTS tier TEXT
+  CHECK (tier IN ('fast', 'standard', 'deep'));
@@ -0,0 +1,63 @@
+-- Durable Job Queue Migration
+-- Run in Supabase SQL Editor
+
+-- Jobs processed by the backend worker (services/jobs.py)
+CREATE TABLE IF NOT EXISTS jobs (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  kind TEXT NOT NULL,
+  idempotency_key TEXT NOT NULL UNIQUE,
+  payload JSONB NOT NULL,
+  status TEXT NOT NULL DEFAULT 'queued'
+    CHECK (status IN ('queued', 'running', 'succeeded', 'dead')),
+  attempts INTEGER NOT NULL DEFAULT 0,
+  max_attempts INTEGER NOT NULL DEFAULT 5,
+  run_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  locked_by TEXT,
+  locked_until TIMESTAMPTZ,
+  last_error TEXT,
+  created_at TIMESTAMPTZ DEFAULT NOW(),
+  updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs(run_at)
+  WHERE status IN ('queued', 'running');
+
+-- Service role only: no policies
+ALTER TABLE jobs ENABLE ROW LEVEL SECURITY;
+
+-- Atomically lease up to p_limit ready jobs. Jobs whose lease expired
+-- (worker crashed mid-job) are handed out again — delivery is at-least-once.
+CREATE OR REPLACE FUNCTION claim_jobs(p_worker TEXT, p_limit INTEGER, p_lease_seconds INTEGER)
+RETURNS SETOF jobs
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  RETURN QUERY
+  UPDATE jobs
+  SET status = 'running',
+      attempts = jobs.attempts + 1,
+      locked_by = p_worker,
+      locked_until = NOW() + make_interval(secs => p_lease_seconds),
+      updated_at = NOW()
+  WHERE jobs.id IN (
+    SELECT j.id FROM jobs j
+    WHERE (j.status = 'queued' AND j.run_at <= NOW())
+       OR (j.status = 'running' AND j.locked_until < NOW())
+    ORDER BY j.run_at
+    LIMIT p_limit
+    FOR UPDATE SKIP LOCKED
+  )
+  RETURNING jobs.*;
+END;
+$$;
+
+-- Job handlers may run more than once, so feedback and evaluations are
+-- upserted per session. Keep only the newest row per session (ties on
+-- created_at broken by id) before adding the unique indexes.
+DELETE FROM feedback a USING feedback b
+  WHERE a.session_id = b.session_id AND (a.created_at, a.id) < (b.created_at, b.id);
+DELETE FROM evaluations a USING evaluations b
+  WHERE a.session_id = b.session_id AND (a.created_at, a.id) < (b.created_at, b.id);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_feedback_session_id_unique ON feedback(session_id);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_evaluations_session_id_unique ON evaluations(session_id);
@@ -0,0 +1,6 @@
+-- Session Pagination Migration
+-- Run in Supabase SQL Editor
+
+-- Backs keyset pagination of GET /api/sessions (ORDER BY created_at DESC, id DESC)
+CREATE INDEX IF NOT EXISTS idx_sessions_user_created_id
+  ON sessions(user_id, created_at DESC, id DESC);
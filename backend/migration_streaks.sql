@@ -0,0 +1,91 @@
+-- Streak Maintenance Migration
+-- Run in Supabase SQL Editor
+
+-- Record a practice day in one atomic upsert. ON CONFLICT locks the user's
+-- row, so two calls ending at the same time are applied one after the other
+-- instead of both reading the old streak. A day at or before the last
+-- practice day (a retried or late job) leaves the streak as it is.
+CREATE OR REPLACE FUNCTION record_practice(p_user_id UUID, p_day DATE)
+RETURNS streaks
+LANGUAGE sql
+AS $$
+  INSERT INTO streaks AS s (user_id, current_streak, longest_streak, last_practice_date, updated_at)
+  VALUES (p_user_id, 1, 1, p_day, NOW())
+  ON CONFLICT (user_id) DO UPDATE SET
+    current_streak = CASE
+      WHEN s.last_practice_date >= p_day THEN s.current_streak
+      WHEN s.last_practice_date = p_day - 1 THEN COALESCE(s.current_streak, 0) + 1
+      ELSE 1
+    END,
+    longest_streak = GREATEST(
+      COALESCE(s.longest_streak, 0),
+      CASE
+        WHEN s.last_practice_date >= p_day THEN COALESCE(s.current_streak, 0)
+        WHEN s.last_practice_date = p_day - 1 THEN COALESCE(s.current_streak, 0) + 1
+        ELSE 1
+      END
+    ),
+    last_practice_date = GREATEST(s.last_practice_date, p_day),
+    updated_at = NOW()
+  RETURNING *;
+$$;
+
+-- Rebuild streaks from session history in one set-based pass: practice days
+-- are the days with a processed call (transcript written by the end-of-call
+-- job), consecutive days form runs (day minus its rank is constant within a
+-- run), the latest run is the current streak and the longest run the record.
+-- Users without processed calls are reset to zero. Pass a user id to repair
+-- one user. Returns the number of streak rows written.
+CREATE OR REPLACE FUNCTION recompute_streaks(p_user_id UUID DEFAULT NULL)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  written INTEGER;
+  cleared INTEGER;
+BEGIN
+  WITH days AS (
+    SELECT DISTINCT user_id, created_at::DATE AS day
+    FROM sessions
+    WHERE transcript IS NOT NULL
+      AND (p_user_id IS NULL OR user_id = p_user_id)
+  ),
+  runs AS (
+    SELECT user_id, MAX(day) AS last_day, COUNT(*)::INTEGER AS length
+    FROM (
+      SELECT user_id, day, day - (ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY day))::INTEGER AS run
+      FROM days
+    ) ranked
+    GROUP BY user_id, run
+  ),
+  per_user AS (
+    SELECT
+      user_id,
+      (ARRAY_AGG(length ORDER BY last_day DESC))[1] AS current_streak,
+      MAX(length) AS longest_streak,
+      MAX(last_day) AS last_practice_date
+    FROM runs
+    GROUP BY user_id
+  )
+  INSERT INTO streaks (user_id, current_streak, longest_streak, last_practice_date, updated_at)
+  SELECT user_id, current_streak, longest_streak, last_practice_date, NOW()
+  FROM per_user
+  ON CONFLICT (user_id) DO UPDATE SET
+    current_streak = EXCLUDED.current_streak,
+    longest_streak = EXCLUDED.longest_streak,
+    last_practice_date = EXCLUDED.last_practice_date,
+    updated_at = NOW();
+  GET DIAGNOSTICS written = ROW_COUNT;
+
+  UPDATE streaks st
+    SET current_streak = 0, longest_streak = 0, last_practice_date = NULL, updated_at = NOW()
+    WHERE (p_user_id IS NULL OR st.user_id = p_user_id)
+      AND NOT EXISTS (
+        SELECT 1 FROM sessions s WHERE s.user_id = st.user_id AND s.transcript IS NOT NULL
+      )
+      AND (st.current_streak <> 0 OR st.longest_streak <> 0 OR st.last_practice_date IS NOT NULL);
+  GET DIAGNOSTICS cleared = ROW_COUNT;
+
+  RETURN written + cleared;
+END;
+$$;
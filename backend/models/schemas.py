@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, EmailStr
+from typing import Literal, Optional
 from datetime import datetime, date
 
 
@@ -75,3 +75,65 @@ class DashboardResponse(BaseModel):
 # VAPI
 class StartCallRequest(BaseModel):
     session_type: str = "practice"
+    evaluation_tier: Optional[Literal["fast", "standard", "deep"]] = None  # default: chosen per call
+
+
+# Structured outputs for the single-call evaluation (services/evaluation.py).
+# Sent to the model as JSON schemas in strict mode: every field is required
+# and no other keys are allowed.
+class StrictModel(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+
+class MetricNotes(StrictModel):
+    positives: list[str]
+    to_improve: list[str]
+
+
+class ScoredMetric(MetricNotes):
+    score: int  # 0-100
+
+
+class VoiceMetricNotes(StrictModel):
+    grammar: MetricNotes
+    fluency: MetricNotes
+    filler_words: MetricNotes
+    clarity: MetricNotes
+
+
+class VoiceMetricScores(StrictModel):
+    grammar: ScoredMetric
+    fluency: ScoredMetric
+    filler_words: ScoredMetric
+    clarity: ScoredMetric
+
+
+class TopicScores(StrictModel):
+    structure: int
+    opening_impact: int
+    key_message_clarity: int
+    persuasiveness: int
+    confidence: int
+    audience_awareness: int
+
+
+class TopicEvaluation(StrictModel):
+    segment: int  # index of the transcript segment
+    name: str
+    valid: bool  # False for small talk rather than a practice attempt
+    scores: TopicScores
+    went_well: list[str]
+    to_improve: list[str]
+    missed_points: list[str]
+    rewrite: str
+
+
+class SessionEvaluation(StrictModel):
+    topics: list[TopicEvaluation]
+    voice_metrics: VoiceMetricScores
+
+
+class SessionEvaluationNotes(StrictModel):
+    """SessionEvaluation for locally scored voice metrics (services/scoring.py)."""
+    topics: list[TopicEvaluation]
+    voice_metrics: VoiceMetricNotes
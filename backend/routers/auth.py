@@ -1,5 +1,7 @@
+import asyncio
 from fastapi import APIRouter, HTTPException, Depends, Request
 from models.schemas import SignupRequest, LoginRequest, GoogleAuthRequest, UserProfile
+from services import token_verifier
 from services.supabase_client import supabase, supabase_admin
 
 router = APIRouter()
@@ -12,11 +14,14 @@ def get_token(request: Request) -> str:
     return auth.split("Bearer ")[1]
 
 
-async def get_current_user(request: Request) -> dict:
+async def get_current_user(request: Request) -> token_verifier.AuthUser:
     token = get_token(request)
+    # Hot path: token already verified and not yet expired
+    user = token_verifier.lookup(token)
+    if user:
+        return user
     try:
-        user_response = supabase.auth.get_user(token)
-        return user_response.user
+        return await asyncio.to_thread(token_verifier.verify, token)
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
@@ -1,51 +1,225 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import json
+import re
+import time
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from postgrest.exceptions import APIError
 from models.schemas import SessionCreate, StartCallRequest
 from routers.auth import get_current_user
+from services import events
+from services.pagination import after_cursor, page
 from services.supabase_client import supabase_admin
 from routers.vapi_webhook import COACHING_SYSTEM_PROMPT, COACHING_FIRST_MESSAGE
-from config import VAPI_SERVER_URL,VAPI_ASSISTANT_ID
+from config import VAPI_SERVER_URL,VAPI_ASSISTANT_ID, SSE_RECHECK_SECONDS, SSE_MAX_SECONDS, LIVE_ANALYSIS_ENABLED
 
 router = APIRouter()
 
+# Columns list views render — never the full_transcript/transcript blobs
+SESSION_SUMMARY_COLUMNS = "id, session_type, scenario, duration_seconds, created_at"
+SESSION_DETAIL_COLUMNS = SESSION_SUMMARY_COLUMNS + ", user_id, audio_url"
+
+# Webhook messages requested from VAPI when in-call analysis is on
+LIVE_SERVER_MESSAGES = [
+    "conversation-update",
+    'transcript[transcriptType="final"]',
+    "end-of-call-report",
+    "function-call",
+]
+
 
 @router.get("")
-async def list_sessions(user=Depends(get_current_user)):
+async def list_sessions(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = None,
+    user=Depends(get_current_user),
+):
+    query = supabase_admin.table("sessions") \
+        .select(SESSION_SUMMARY_COLUMNS) \
+        .eq("user_id", user.id)
+    try:
+        query = after_cursor(query, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    result = query.limit(limit + 1).execute()
+    sessions, next_cursor = page(result.data, limit)
+    return {"sessions": sessions, "next_cursor": next_cursor}
+
+
+# ?fields= sections and the table each one is embedded from
+DETAIL_SECTIONS = {"session": "sessions", "feedback": "feedback", "evaluation": "evaluations"}
+_COLUMN_NAME = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+
+def parse_fields(fields: str | None) -> dict[str, list[str] | None]:
+    """`evaluation.status,feedback` -> {"evaluation": ["status"], "feedback": None}.
+
+    None means every column of that section. Raises ValueError on unknown
+    sections or malformed column names.
+    """
+    if not fields:
+        return {section: None for section in DETAIL_SECTIONS}
+
+    sections: dict[str, list[str] | None] = {}
+    for field in fields.split(","):
+        section, _, column = field.strip().partition(".")
+        if section not in DETAIL_SECTIONS:
+            raise ValueError(f"Unknown field: {field.strip()}")
+        if not column:
+            sections[section] = None
+        elif not _COLUMN_NAME.match(column):
+            raise ValueError(f"Invalid field: {field.strip()}")
+        elif section not in sections or sections[section] is not None:
+            sections.setdefault(section, []).append(column)
+    return sections
+
+
+def _one(embedded):
+    """Embedded one-to-one rows come back as an object, or a list without the unique index."""
+    if isinstance(embedded, list):
+        return embedded[0] if embedded else None
+    return embedded
+
+
+def fetch_session_detail(session_id: str, user_id: str, sections: dict) -> dict | None:
+    """Session, feedback and evaluation in one round-trip via PostgREST
+    resource embedding. Returns None if the user has no such session."""
+    session_columns = sections.get("session", [])
+    if "session" in sections and session_columns is None:
+        select = [SESSION_DETAIL_COLUMNS]
+    else:
+        select = [", ".join(session_columns or ["id"])]
+    for section in ("feedback", "evaluation"):
+        if section in sections:
+            columns = sections[section]
+            select.append(f"{DETAIL_SECTIONS[section]}({', '.join(columns) if columns else '*'})")
+
     result = supabase_admin.table("sessions") \
-        .select("*") \
-        .eq("user_id", user.id) \
-        .order("created_at", desc=True) \
-        .limit(20) \
+        .select(", ".join(select)) \
+        .eq("id", session_id) \
+        .eq("user_id", user_id) \
         .execute()
-    return {"sessions": result.data}
+
+    if not result.data:
+        return None
+
+    row = result.data[0]
+    detail = {}
+    if "feedback" in sections:
+        detail["feedback"] = _one(row.pop("feedback", None))
+    if "evaluation" in sections:
+        detail["evaluation"] = _one(row.pop("evaluations", None))
+    if "session" in sections:
+        detail["session"] = row
+    return detail
 
 
 @router.get("/{session_id}")
-async def get_session(session_id: str, user=Depends(get_current_user)):
+async def get_session(
+    session_id: str,
+    fields: str | None = Query(None, description="e.g. `evaluation.status` or `session,feedback`"),
+    user=Depends(get_current_user),
+):
+    try:
+        sections = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        detail = await asyncio.to_thread(fetch_session_detail, session_id, user.id, sections)
+    except APIError as e:
+        raise HTTPException(status_code=400, detail=e.message)
+
+    if detail is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    return detail
+
+
+@router.get("/{session_id}/transcript")
+async def get_session_transcript(session_id: str, user=Depends(get_current_user)):
+    """Transcripts are large, so they are only loaded on demand."""
     session = supabase_admin.table("sessions") \
-        .select("*") \
+        .select("id, transcript, full_transcript") \
         .eq("id", session_id) \
         .eq("user_id", user.id) \
-        .single() \
         .execute()
 
     if not session.data:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    feedback = supabase_admin.table("feedback") \
-        .select("*") \
-        .eq("session_id", session_id) \
-        .execute()
+    return session.data[0]
 
-    evaluation = supabase_admin.table("evaluations") \
-        .select("*") \
-        .eq("session_id", session_id) \
-        .execute()
 
-    return {
-        "session": session.data,
-        "feedback": feedback.data[0] if feedback.data else None,
-        "evaluation": evaluation.data[0] if evaluation.data else None,
-    }
+def _progress_events(detail: dict) -> list[dict]:
+    """Current feedback/evaluation state of a session, as events."""
+    progress = []
+    # Feedback rows are written once complete; micro_skill is always set then
+    if detail["feedback"] and detail["feedback"].get("micro_skill"):
+        progress.append({"event": events.FEEDBACK_READY, "data": detail["feedback"]})
+    if detail["evaluation"]:
+        evaluation = detail["evaluation"]
+        name = {
+            "completed": events.EVALUATION_COMPLETED,
+            "failed": events.EVALUATION_FAILED,
+        }.get(evaluation["status"], events.EVALUATION_PROCESSING)
+        # Some steps' columns already stored
+        if name == events.EVALUATION_PROCESSING and (evaluation.get("topics") or evaluation.get("voice_metrics")):
+            name = events.EVALUATION_PARTIAL
+        progress.append({"event": name, "data": evaluation})
+    return progress
+
+
+def _load_progress(session_id: str, user_id: str) -> list[dict] | None:
+    detail = fetch_session_detail(session_id, user_id, {"feedback": None, "evaluation": None})
+    return _progress_events(detail) if detail is not None else None
+
+
+def _format_sse(event: dict) -> str:
+    return f"event: {event['event']}\ndata: {json.dumps(event['data'], default=str)}\n\n"
+
+
+async def _session_event_stream(session_id: str, user_id: str, request: Request, pending: list[dict]):
+    # Last payload sent per event name, so re-reads don't repeat unchanged state
+    sent = {}
+    deadline = time.monotonic() + SSE_MAX_SECONDS
+    with events.subscribe(session_id) as queue:
+        while True:
+            for event in pending:
+                if sent.get(event["event"]) == event["data"]:
+                    continue
+                sent[event["event"]] = event["data"]
+                yield _format_sse(event)
+                if event["event"] in events.TERMINAL_EVENTS:
+                    return
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or await request.is_disconnected():
+                return
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=min(SSE_RECHECK_SECONDS, remaining))
+                pending = [event]
+            except asyncio.TimeoutError:
+                # Jobs may run in another process — fall back to a slow re-read
+                yield ": keep-alive\n\n"
+                pending = await asyncio.to_thread(_load_progress, session_id, user_id) or []
+
+
+@router.get("/{session_id}/events")
+async def session_events(session_id: str, request: Request, user=Depends(get_current_user)):
+    """Server-Sent Events stream of feedback/evaluation progress for a session."""
+    # One fused read both checks ownership and catches up on anything that
+    # happened before the client connected
+    pending = await asyncio.to_thread(_load_progress, session_id, user.id)
+    if pending is None:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    return StreamingResponse(
+        _session_event_stream(session_id, user.id, request, pending),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.post("/start")
@@ -59,18 +233,25 @@ async def start_session(body: StartCallRequest, user=Depends(get_current_user)):
 
     session_data = session.data[0]
 
+    assistant_overrides = {
+        "metadata": {
+            "user_id": user.id,
+            "session_id": session_data["id"],
+            "session_type": "practice",
+        }
+    }
+    if body.evaluation_tier:
+        assistant_overrides["metadata"]["evaluation_tier"] = body.evaluation_tier
+    if LIVE_ANALYSIS_ENABLED:
+        # Have VAPI send the conversation as it happens, not only at the end
+        assistant_overrides["serverMessages"] = LIVE_SERVER_MESSAGES
+
     return {
         "session_id": session_data["id"],
         "session_type": "practice",
         "vapi_config": {
             "assistantId": VAPI_ASSISTANT_ID,         # just an ID, no prompt
-            "assistantOverrides": {
-                "metadata": {
-                    "user_id": user.id,
-                    "session_id": session_data["id"],
-                    "session_type": "practice",
-                }
-            },
+            "assistantOverrides": assistant_overrides,
         },
     }
 
@@ -1,13 +1,16 @@
-import asyncio
+import hashlib
+import hmac
 import json
 import re
-from fastapi import APIRouter, Request
+import time
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request
+from services import events, jobs, live_call, llm_governor, metrics
 from services.analysis import analyze_transcript
-from services.coaching import generate_feedback
+from services.coaching import generate_feedback, generate_feedback_stream
 from services.evaluation import run_deep_evaluation
 from services.streak import update_streak
 from services.supabase_client import supabase_admin
-from config import OPENAI_API_KEY
+from config import OPENAI_API_KEY, FEEDBACK_STREAMING, LIVE_ANALYSIS_ENABLED, VAPI_WEBHOOK_SECRET
 
 router = APIRouter()
 
@@ -73,9 +76,18 @@ END CALL — THIS IS CRITICAL, FOLLOW EXACTLY:
 
 COACHING_FIRST_MESSAGE = "Hey! I'm Alexa, your communication coach. How are you doing today?"
 
+# In-call messages analyzed as they arrive (services/live_call.py)
+LIVE_MESSAGE_TYPES = ("conversation-update", "transcript")
+
 
 @router.post("/webhook")
-async def vapi_webhook(request: Request):
+async def vapi_webhook(request: Request, background_tasks: BackgroundTasks):
+    # Checked before anything is queued: the body carries the recording URL
+    # the evaluation downloads
+    if VAPI_WEBHOOK_SECRET and not hmac.compare_digest(
+        request.headers.get("x-vapi-secret", "").encode(), VAPI_WEBHOOK_SECRET.encode()
+    ):
+        raise HTTPException(status_code=401, detail="Invalid webhook secret")
     body = await request.json()
     # VAPI payload can be nested under "message" or at the top level
     message_type = body.get("message", {}).get("type", "") or body.get("type", "")
@@ -84,12 +96,23 @@ async def vapi_webhook(request: Request):
         return handle_assistant_request(body)
 
     if message_type == "end-of-call-report":
-        await handle_end_of_call(body)
+        # Acknowledge immediately; the durable job queue does the actual work
+        queued = await jobs.enqueue("end_of_call", body, idempotency_key=f"end-of-call:{get_call_id(body)}")
+        if queued and not jobs.worker_running():
+            # No long-lived worker (e.g. serverless): process right after responding
+            background_tasks.add_task(jobs.drain)
         return {"status": "ok"}
 
     if message_type == "function-call":
         return handle_function_call(body)
 
+    if message_type in LIVE_MESSAGE_TYPES and LIVE_ANALYSIS_ENABLED:
+        message = body.get("message", body)
+        call_id = message.get("call", {}).get("id")
+        if call_id:
+            live_call.ingest(call_id, message)
+        return {"status": "ok"}
+
     return {"status": "ok"}
 
 
@@ -119,8 +142,23 @@ def handle_assistant_request(body: dict) -> dict:
     return assistant_config
 
 
-async def handle_end_of_call(body: dict):
-    """Process end-of-call report: analyze transcript, generate feedback, store results."""
+def get_call_id(body: dict) -> str:
+    """VAPI call id, used as the idempotency key for duplicate deliveries."""
+    message = body.get("message", body)
+    call_id = message.get("call", {}).get("id")
+    if call_id:
+        return call_id
+    # No call id: fall back to a hash of the payload so exact redeliveries still dedupe
+    return hashlib.sha256(json.dumps(body, sort_keys=True, default=str).encode()).hexdigest()
+
+
+@jobs.handler("end_of_call")
+async def handle_end_of_call(body: dict, final_attempt: bool = True):
+    """Process end-of-call report: analyze transcript, generate feedback, store results.
+
+    Runs on the job queue and may be retried, so every write is idempotent
+    per session. Database failures raise to trigger a retry.
+    """
     # VAPI payload can be at body.message (wrapped) or body (direct)
     message = body.get("message", body)
     call = message.get("call", {})
@@ -154,15 +192,8 @@ async def handle_end_of_call(body: dict):
 
     if isinstance(structured_messages, list) and structured_messages:
         # Build full_transcript from structured messages, skip system messages
-        full_transcript = []
-        for msg in structured_messages:
-            role = msg.get("role", "")
-            content = msg.get("content", "") or msg.get("message", "")
-            if role in ("assistant", "user", "bot"):
-                normalized_role = "assistant" if role in ("assistant", "bot") else "user"
-                full_transcript.append({"role": normalized_role, "content": content})
-                if normalized_role == "user":
-                    user_turns.append(content)
+        full_transcript = live_call.normalize_messages(structured_messages)
+        user_turns = [t["content"] for t in full_transcript if t["role"] == "user"]
         user_text = " ".join(user_turns)
         print(f"[VAPI] Parsed {len(full_transcript)} structured turns, {len(user_turns)} user turns")
     elif isinstance(transcript, str) and transcript:
@@ -212,7 +243,7 @@ async def handle_end_of_call(body: dict):
         scenario = user_turns[0][:100]
 
     # Update session with transcript, full transcript, audio URL, and duration
-    try:
+    with metrics.span("supabase.sessions.update"):
         supabase_admin.table("sessions").update({
             "transcript": user_text,
             "full_transcript": full_transcript,
@@ -220,51 +251,125 @@ async def handle_end_of_call(body: dict):
             "duration_seconds": int(duration) if duration else None,
             "scenario": scenario,
         }).eq("id", session_id).execute()
-    except Exception as e:
-        print(f"[VAPI] Failed to update session {session_id}: {e}")
 
-    # Analyze transcript
-    analysis = analyze_transcript(user_text, int(duration) if duration else None)
+    # Analyze transcript, reusing what was computed while the call was live
+    with metrics.span("end_of_call.analysis"):
+        live = live_call.finalize(call["id"], full_transcript) if full_transcript and call.get("id") else None
+        analysis = analyze_transcript(
+            user_text,
+            int(duration) if duration else None,
+            phrase_counts=live["phrase_counts"] if live else None,
+        )
 
-    # Generate AI feedback
-    try:
-        feedback = await generate_feedback(user_text, analysis)
-    except Exception as e:
-        print(f"[VAPI] generate_feedback failed: {e}")
-        feedback = {
-            "strengths": ["You showed up and practiced — that's the most important thing."],
-            "micro_skill": "Try leading with your main point next time.",
-            "model_answer": None,
-        }
+    feedback_row = {
+        "session_id": session_id,
+        "user_id": user_id,
+        "hedging_count": analysis["hedging_count"],
+        "filler_count": analysis["filler_count"],
+        "recommendation_first": analysis["recommendation_first"],
+        "conciseness_score": analysis["conciseness_score"],
+    }
 
-    # Store feedback
-    try:
-        supabase_admin.table("feedback").insert({
-            "session_id": session_id,
-            "user_id": user_id,
-            "strengths": feedback.get("strengths", []),
-            "micro_skill": feedback.get("micro_skill"),
-            "model_answer": feedback.get("model_answer"),
-            "hedging_count": analysis["hedging_count"],
-            "filler_count": analysis["filler_count"],
-            "recommendation_first": analysis["recommendation_first"],
-            "conciseness_score": analysis["conciseness_score"],
-        }).execute()
-    except Exception as e:
-        print(f"[VAPI] Failed to insert feedback for session {session_id}: {e}")
+    # Generate AI feedback, ahead of any queued evaluation or backfill requests
+    with llm_governor.priority("feedback"), metrics.span("end_of_call.feedback", streaming=FEEDBACK_STREAMING):
+        if FEEDBACK_STREAMING:
+            feedback = await stream_feedback(session_id, feedback_row, user_text, analysis)
+        else:
+            try:
+                feedback = await generate_feedback(user_text, analysis)
+            except Exception as e:
+                print(f"[VAPI] generate_feedback failed: {e}")
+                metrics.fallback("feedback")
+                feedback = {}
+    for field, fallback in FALLBACK_FEEDBACK.items():
+        if not feedback.get(field):
+            metrics.fallback(f"feedback.{field}")
+            feedback[field] = fallback
+
+    # Store feedback (one row per session, safe to retry). Readers take the
+    # row as final, so it is written once, with every field.
+    stored = store_feedback({**feedback_row, **{f: feedback[f] for f in FEEDBACK_FIELDS}})
+    if stored:
+        events.publish(session_id, events.FEEDBACK_READY, stored)
 
     # Update streak
     try:
-        await update_streak(user_id)
+        with metrics.span("end_of_call.streak"):
+            await update_streak(user_id)
     except Exception as e:
         print(f"[VAPI] Failed to update streak for user {user_id}: {e}")
+        metrics.fallback("streak")
 
-    # Kick off deep evaluation in background
+    # Queue deep evaluation as its own job so it survives restarts
     if full_transcript:
-        asyncio.create_task(
-            run_deep_evaluation(session_id, user_id, full_transcript, user_text, audio_url)
-        )
-        print(f"[VAPI] Deep evaluation kicked off for session {session_id}")
+        await jobs.enqueue("deep_evaluation", {
+            "session_id": session_id,
+            "user_id": user_id,
+            "full_transcript": full_transcript,
+            "user_text": user_text,
+            "audio_url": audio_url,
+            "segments": live["segments"] if live else None,
+            "duration_seconds": int(duration) if duration else None,
+            "evaluation_tier": metadata.get("evaluation_tier"),
+            "queued_at": time.time(),
+        }, idempotency_key=f"deep-evaluation:{session_id}")
+        print(f"[VAPI] Deep evaluation queued for session {session_id}")
+
+
+FEEDBACK_FIELDS = ("strengths", "micro_skill", "model_answer")
+
+FALLBACK_FEEDBACK = {
+    "strengths": ["You showed up and practiced — that's the most important thing."],
+    "micro_skill": "Try leading with your main point next time.",
+    "model_answer": None,
+}
+
+
+def store_feedback(row: dict) -> dict | None:
+    with metrics.span("supabase.feedback.upsert"):
+        result = supabase_admin.table("feedback").upsert(row, on_conflict="session_id").execute()
+    return result.data[0] if result.data else None
+
+
+async def stream_feedback(
+    session_id: str,
+    feedback_row: dict,
+    user_text: str,
+    analysis: dict,
+) -> dict:
+    """Stream quick feedback, pushing each field as it completes.
+
+    Partial feedback is only published as events, never stored: pollers and
+    reconnecting streams read the feedback row as final. Returns the fields
+    received. A stream that fails partway keeps what already arrived.
+    """
+    feedback = {}
+    try:
+        async for field, value in generate_feedback_stream(user_text, analysis):
+            if field not in FEEDBACK_FIELDS:
+                continue
+            feedback[field] = value
+            events.publish(session_id, events.FEEDBACK_PARTIAL, {**feedback_row, **feedback})
+    except Exception as e:
+        print(f"[VAPI] Feedback stream failed after {list(feedback)}: {e}")
+        metrics.fallback("feedback_stream")
+    return feedback
+
+
+@jobs.handler("deep_evaluation")
+async def handle_deep_evaluation(payload: dict, final_attempt: bool = True):
+    await run_deep_evaluation(
+        payload["session_id"],
+        payload["user_id"],
+        payload["full_transcript"],
+        payload["user_text"],
+        payload.get("audio_url"),
+        payload.get("segments"),
+        payload.get("duration_seconds"),
+        payload.get("evaluation_tier"),
+        payload.get("queued_at"),
+        final_attempt=final_attempt,
+    )
 
 
 def handle_function_call(body: dict) -> dict:
@@ -0,0 +1,236 @@
+"""Re-run the evaluation pipeline over stored sessions.
+
+Backfills or rescores `evaluations` (deep evaluation) and/or the regex
+metrics on `feedback` (analyze_transcript) after prompts or metrics change.
+Sessions are streamed newest-first in keyset-paginated pages; each page is
+evaluated with bounded concurrency, written back with one bulk upsert per
+table, and recorded in a checkpoint file so an interrupted run resumes
+after the last finished page.
+
+Run from backend/:
+    python -m scripts.reevaluate --what evaluation --concurrency 8
+    python -m scripts.reevaluate --what analysis --since 2025-01-01 --dry-run
+    python -m scripts.reevaluate --input sessions.jsonl --fake-llm --dry-run   # offline throughput
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+SESSION_COLUMNS = "id, user_id, created_at, transcript, full_transcript, audio_url, duration_seconds"
+
+# Backfill can wait out rate limits longer than a live request
+# (LLM_MAX_RETRIES, services/llm_governor.py), unless set explicitly
+BACKFILL_MAX_RETRIES = 8
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--what", choices=["evaluation", "analysis", "both"], default="evaluation")
+    parser.add_argument("--user-id", help="only this user's sessions")
+    parser.add_argument("--since", help="only sessions created at or after this ISO date")
+    parser.add_argument("--limit", type=int, help="stop after this many sessions")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=4, help="sessions evaluated at once")
+    parser.add_argument("--checkpoint", default=".reevaluate.checkpoint.json")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    parser.add_argument("--dry-run", action="store_true", help="evaluate but write nothing")
+    parser.add_argument("--input", help="read sessions from a JSONL file instead of the database")
+    parser.add_argument("--fake-llm", action="store_true", help="use the offline LLM stub (LLM_BACKEND=fake)")
+    parser.add_argument("--tier", choices=["fast", "standard", "deep"], default="deep", help="evaluation tier")
+    return parser.parse_args(argv)
+
+
+class Checkpoint:
+    """Last finished page cursor and running totals, rewritten atomically."""
+
+    def __init__(self, path: str, what: str, restart: bool):
+        self.path = path
+        self.state = {"what": what, "cursor": None, "processed": 0, "failed": []}
+        if not restart and os.path.exists(path):
+            with open(path) as f:
+                saved = json.load(f)
+            if saved.get("what") != what:
+                sys.exit(f"Checkpoint {path} is for --what {saved.get('what')}; pass --restart to discard it")
+            self.state = saved
+            print(f"[REEVAL] Resuming after {self.state['processed']} sessions")
+
+    @property
+    def cursor(self) -> str | None:
+        return self.state["cursor"]
+
+    def save(self, cursor: str | None, processed: int, failed: list[str]):
+        self.state["cursor"] = cursor
+        self.state["processed"] += processed
+        self.state["failed"] = (self.state["failed"] + failed)[-1000:]
+        self.state["updated_at"] = datetime.now(timezone.utc).isoformat()
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f)
+        os.replace(tmp, self.path)
+
+
+def db_pages(args, cursor: str | None):
+    """Yield (rows, next_cursor) pages from the sessions table."""
+    from services.pagination import after_cursor, page
+    from services.supabase_client import supabase_admin
+
+    columns = SESSION_COLUMNS + (", feedback(id)" if args.what != "evaluation" else "")
+    remaining = args.limit
+    while remaining is None or remaining > 0:
+        size = args.page_size if remaining is None else min(args.page_size, remaining)
+        query = supabase_admin.table("sessions").select(columns).not_.is_("full_transcript", "null")
+        if args.user_id:
+            query = query.eq("user_id", args.user_id)
+        if args.since:
+            query = query.gte("created_at", args.since)
+        rows = after_cursor(query, cursor).limit(size + 1).execute().data or []
+        rows, cursor = page(rows, size)
+        if remaining is not None:
+            remaining -= len(rows)
+        if rows:
+            yield rows, cursor
+        if not cursor:
+            return
+
+
+def file_pages(args, cursor: str | None):
+    """Yield pages from a JSONL dump; the cursor is a line offset."""
+    start = int(cursor or 0)
+    with open(args.input) as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    if args.limit is not None:
+        rows = rows[:start + args.limit]
+    while start < len(rows):
+        end = start + args.page_size
+        yield rows[start:end], str(end) if end < len(rows) else None
+        start = end
+
+
+async def evaluate_row(row: dict, args) -> dict:
+    from services.analysis import analyze_transcript
+    from services.evaluation import evaluate_session
+    from services.tiers import TIERS
+
+    full_transcript = row.get("full_transcript") or []
+    user_text = row.get("transcript") or " ".join(
+        t.get("content", "") for t in full_transcript if t.get("role") == "user"
+    )
+    result = {}
+
+    if args.what in ("analysis", "both"):
+        result["analysis"] = analyze_transcript(user_text, row.get("duration_seconds"))
+
+    if args.what in ("evaluation", "both"):
+        # Rate limits are waited out by the LLM governor, which pauses every
+        # worker on a 429
+        evaluation = await evaluate_session(
+            full_transcript, user_text, row.get("audio_url"), strict=True,
+            duration_seconds=row.get("duration_seconds"), tier=TIERS[args.tier],
+        )
+        result["evaluation"] = {**evaluation, "tier": args.tier}
+    return result
+
+
+def write_results(rows: list[dict], results: dict[str, dict]):
+    """One bulk upsert per table for a page of results."""
+    from services.supabase_client import supabase_admin
+
+    now = datetime.now(timezone.utc).isoformat()
+    evaluations = [
+        {
+            "session_id": row["id"],
+            "user_id": row["user_id"],
+            "status": "completed",
+            "audio_url": row.get("audio_url"),
+            "error_message": None,
+            "updated_at": now,
+            **results[row["id"]]["evaluation"],
+        }
+        for row in rows
+        if "evaluation" in results.get(row["id"], {})
+    ]
+    # Only sessions that already have feedback; rescoring never creates rows
+    feedback = [
+        {
+            "session_id": row["id"],
+            "user_id": row["user_id"],
+            "hedging_count": analysis["hedging_count"],
+            "filler_count": analysis["filler_count"],
+            "recommendation_first": analysis["recommendation_first"],
+            "conciseness_score": analysis["conciseness_score"],
+        }
+        for row in rows
+        if row.get("feedback") and (analysis := results.get(row["id"], {}).get("analysis"))
+    ]
+    if evaluations:
+        supabase_admin.table("evaluations").upsert(evaluations, on_conflict="session_id").execute()
+    if feedback:
+        supabase_admin.table("feedback").upsert(feedback, on_conflict="session_id").execute()
+    return len(evaluations), len(feedback)
+
+
+async def run(args) -> int:
+    from services import llm, llm_governor
+
+    checkpoint = Checkpoint(args.checkpoint, args.what, args.restart)
+    pages = file_pages(args, checkpoint.cursor) if args.input else db_pages(args, checkpoint.cursor)
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def evaluate(row):
+        async with semaphore:
+            try:
+                with llm_governor.priority("backfill"):
+                    return row["id"], await evaluate_row(row, args)
+            except Exception as e:
+                print(f"[REEVAL] Session {row['id']} failed: {type(e).__name__}: {e}")
+                return row["id"], None
+
+    started = time.monotonic()
+    total = failed_total = 0
+    while True:
+        fetched = await asyncio.to_thread(next, pages, None)
+        if fetched is None:
+            break
+        rows, cursor = fetched
+
+        outcomes = await asyncio.gather(*(evaluate(row) for row in rows))
+        results = {session_id: result for session_id, result in outcomes if result is not None}
+        failed = [session_id for session_id, result in outcomes if result is None]
+
+        written = (0, 0) if args.dry_run else await asyncio.to_thread(write_results, rows, results)
+        if not args.dry_run:
+            checkpoint.save(cursor, len(rows), failed)
+
+        total += len(rows)
+        failed_total += len(failed)
+        elapsed = time.monotonic() - started
+        print(
+            f"[REEVAL] {total} sessions ({failed_total} failed), "
+            f"{written[0]} evaluations / {written[1]} feedback rows written, "
+            f"{total / elapsed:.2f} sessions/s"
+        )
+        if not cursor:
+            break
+
+    elapsed = time.monotonic() - started
+    print(f"[REEVAL] Done: {total} sessions in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.2f}/s), {failed_total} failed")
+    print(f"[REEVAL] LLM usage: {json.dumps(llm.usage())}")
+    await llm.aclose()
+    return 1 if failed_total else 0
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Must be set before config is imported
+    if args.fake_llm:
+        os.environ["LLM_BACKEND"] = "fake"
+    os.environ.setdefault("LLM_MAX_RETRIES", str(BACKFILL_MAX_RETRIES))
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
 import re
+from collections import Counter
+from functools import lru_cache
 
 HEDGING_WORDS = [
     "i think", "maybe", "perhaps", "sort of", "kind of", "i guess",
@@ -13,12 +15,63 @@ FILLER_WORDS = [
 ]
 
 
+PHRASE_LISTS = {
+    "hedging": HEDGING_WORDS,
+    "filler": FILLER_WORDS,
+}
+
+
+def _build_phrase_pattern(phrases) -> re.Pattern:
+    """Compile phrases into a single alternation scanned in one pass.
+
+    The alternation sits inside a lookahead so matches don't consume text:
+    "like" inside "i feel like" is still counted, exactly as the old
+    per-phrase findall loop did. That only holds if no phrase is a whole-word
+    prefix of another (only one alternative can match at a given position).
+    """
+    unique = sorted(set(phrases), key=len, reverse=True)
+    for phrase in unique:
+        for other in unique:
+            if other != phrase and other.startswith(phrase + " "):
+                raise ValueError(f"Phrase {phrase!r} is a prefix of {other!r}")
+    alternation = "|".join(re.escape(p) for p in unique)
+    return re.compile(r"\b(?=(" + alternation + r")\b)")
+
+
+# Built once at import: one pattern covering every phrase in every list
+_PHRASE_PATTERN = _build_phrase_pattern(
+    [p for phrases in PHRASE_LISTS.values() for p in phrases]
+)
+
+
+@lru_cache(maxsize=32)
+def _pattern_for(phrases: tuple[str, ...]) -> re.Pattern:
+    return _build_phrase_pattern(phrases)
+
+
+def count_phrases(text: str) -> Counter:
+    """Count every known phrase in a single scan of the text."""
+    return Counter(m.group(1) for m in _PHRASE_PATTERN.finditer(text.lower()))
+
+
+def count_phrase_lists(text: str, phrase_counts: Counter | None = None) -> dict:
+    """Per-list totals and per-phrase breakdowns from a single scan.
+
+    `phrase_counts` reuses counts already accumulated turn by turn.
+    """
+    if phrase_counts is None:
+        phrase_counts = count_phrases(text)
+    result = {}
+    for list_name, phrases in PHRASE_LISTS.items():
+        breakdown = {p: phrase_counts[p] for p in phrases if phrase_counts[p]}
+        result[list_name] = {"count": sum(breakdown.values()), "phrases": breakdown}
+    return result
+
+
 def count_occurrences(text: str, phrases: list[str]) -> int:
-    text_lower = text.lower()
-    count = 0
-    for phrase in phrases:
-        count += len(re.findall(r'\b' + re.escape(phrase) + r'\b', text_lower))
-    return count
+    if not phrases:
+        return 0
+    return sum(1 for _ in _pattern_for(tuple(phrases)).finditer(text.lower()))
 
 
 def check_recommendation_first(transcript: str) -> bool:
@@ -64,16 +117,21 @@ def calculate_conciseness(transcript: str, duration_seconds: int | None) -> int:
     return min(10, max(1, score))
 
 
-def analyze_transcript(transcript: str, duration_seconds: int | None = None) -> dict:
+def analyze_transcript(
+    transcript: str,
+    duration_seconds: int | None = None,
+    phrase_counts: Counter | None = None,
+) -> dict:
     """Full analysis of a transcript."""
-    hedging_count = count_occurrences(transcript, HEDGING_WORDS)
-    filler_count = count_occurrences(transcript, FILLER_WORDS)
+    phrase_lists = count_phrase_lists(transcript, phrase_counts)
     recommendation_first = check_recommendation_first(transcript)
     conciseness_score = calculate_conciseness(transcript, duration_seconds)
 
     return {
-        "hedging_count": hedging_count,
-        "filler_count": filler_count,
+        "hedging_count": phrase_lists["hedging"]["count"],
+        "filler_count": phrase_lists["filler"]["count"],
+        "hedging_phrases": phrase_lists["hedging"]["phrases"],
+        "filler_phrases": phrase_lists["filler"]["phrases"],
         "recommendation_first": recommendation_first,
         "conciseness_score": conciseness_score,
     }
@@ -0,0 +1,241 @@
+"""Voice metrics measured from the call recording.
+
+The recording is streamed to a temporary file with httpx, then decoded block
+by block with soundfile and analysed with vectorized NumPy in a process
+pool, so the CPU work never runs on the event loop. Each block is cut into
+FRAME_SECONDS frames; every frame gets an RMS level and, when it is loud and
+periodic enough, an autocorrelation pitch estimate. Only those two small
+per-frame arrays outlive a block, so memory doesn't grow with call length
+beyond ~8 bytes per 40 ms.
+
+From the frames:
+
+- pause_ratio: share of the speaking span (first to last voiced frame) spent
+  in silences of at least MIN_PAUSE_SECONDS
+- speech_rate_wpm: transcript words per minute of speaking time
+- pitch_variability_semitones: standard deviation of voiced pitch around its
+  median, in semitones (low = monotone)
+- loudness_stability: 0-1, from the spread of voiced frame levels in dB
+
+VAPI's stereo recording puts the caller and the assistant on separate
+channels; AUDIO_USER_CHANNEL picks the caller's. Mono recordings are
+analysed as they are, assistant included.
+
+numpy and soundfile are optional; without them (or with
+AUDIO_METRICS_ENABLED=false) analyze() returns None and the voice metrics
+keep the LLM's scores.
+"""
+import asyncio
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import httpx
+
+from config import (
+    AUDIO_METRICS_ENABLED,
+    AUDIO_WORKERS,
+    AUDIO_MAX_MB,
+    AUDIO_DOWNLOAD_TIMEOUT_SECONDS,
+    AUDIO_ALLOWED_HOSTS,
+    AUDIO_USER_CHANNEL,
+)
+from services import metrics
+
+try:
+    import numpy as np
+    import soundfile
+except ImportError:  # optional dependencies
+    np = None
+    soundfile = None
+
+FRAME_SECONDS = 0.04
+BLOCK_FRAMES = 250  # 10 s of audio decoded at a time
+MIN_PAUSE_SECONDS = 0.3
+PITCH_MIN_HZ = 70
+PITCH_MAX_HZ = 400
+# Normalized autocorrelation peak above which a frame counts as pitched
+PITCH_MIN_STRENGTH = 0.3
+# Voiced frames sit this far above the noise floor (10th percentile level)
+SPEECH_MARGIN_DB = 12.0
+SILENCE_FLOOR_DB = -55.0
+MAX_REDIRECTS = 3  # per recording download
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def available() -> bool:
+    return AUDIO_METRICS_ENABLED and np is not None and soundfile is not None
+
+
+def _executor() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=AUDIO_WORKERS)
+    return _pool
+
+
+def shutdown():
+    """Stop the worker processes (app shutdown)."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _check_url(url: httpx.URL):
+    """The URL comes from a webhook body, so only fetch from known hosts."""
+    if url.scheme != "https" or url.host not in AUDIO_ALLOWED_HOSTS:
+        raise ValueError(f"Recording URL not allowed: {url.scheme}://{url.host} (HTTPS and AUDIO_ALLOWED_HOSTS only)")
+
+
+async def download(audio_url: str, directory: str) -> str:
+    """Stream the recording into a file under directory; returns its path.
+
+    Redirects are followed by hand, up to MAX_REDIRECTS, so every hop is
+    checked against AUDIO_ALLOWED_HOSTS.
+    """
+    url = httpx.URL(audio_url)
+    path = os.path.join(directory, "recording" + os.path.splitext(url.path)[1])
+    limit = AUDIO_MAX_MB * 1024 * 1024
+    received = 0
+    timeout = httpx.Timeout(AUDIO_DOWNLOAD_TIMEOUT_SECONDS)
+    async with httpx.AsyncClient(timeout=timeout, follow_redirects=False) as client:
+        for _ in range(MAX_REDIRECTS + 1):
+            _check_url(url)
+            async with client.stream("GET", url) as response:
+                if response.is_redirect:
+                    url = url.join(response.headers["location"])
+                    continue
+                response.raise_for_status()
+                if int(response.headers.get("content-length") or 0) > limit:
+                    raise ValueError(f"Recording exceeds AUDIO_MAX_MB ({AUDIO_MAX_MB} MB)")
+                with open(path, "wb") as f:
+                    async for chunk in response.aiter_bytes(1 << 16):
+                        received += len(chunk)
+                        if received > limit:
+                            raise ValueError(f"Recording exceeds AUDIO_MAX_MB ({AUDIO_MAX_MB} MB)")
+                        f.write(chunk)
+                return path
+    raise ValueError(f"Recording URL redirected more than {MAX_REDIRECTS} times")
+
+
+def _frame_features(samples, samplerate: int):
+    """RMS level and pitch (NaN when unpitched) for whole frames of samples."""
+    frame = int(samplerate * FRAME_SECONDS)
+    frames = samples[:len(samples) // frame * frame].reshape(-1, frame)
+    rms = np.sqrt(np.mean(frames ** 2, axis=1))
+
+    # Autocorrelation of every frame at once via the FFT (zero-padded, so it
+    # is linear rather than circular), normalized by lag 0
+    windowed = frames * np.hanning(frame)
+    spectrum = np.fft.rfft(windowed, n=2 * frame, axis=1)
+    autocorr = np.fft.irfft(np.abs(spectrum) ** 2, axis=1)[:, :frame]
+    energy = autocorr[:, :1]
+    autocorr = np.divide(autocorr, energy, out=np.zeros_like(autocorr), where=energy > 0)
+
+    low, high = int(samplerate / PITCH_MAX_HZ), min(int(samplerate / PITCH_MIN_HZ), frame - 1)
+    lags = np.argmax(autocorr[:, low:high], axis=1) + low
+    strength = autocorr[np.arange(len(lags)), lags]
+    pitch = np.where(strength >= PITCH_MIN_STRENGTH, samplerate / lags, np.nan)
+    return rms.astype(np.float32), pitch.astype(np.float32)
+
+
+def _runs(mask):
+    """(start, length) of each run of True in a boolean array."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    return starts, np.flatnonzero(edges == -1) - starts
+
+
+def analyze_file(path: str, channel: int = 0) -> dict | None:
+    """Pause, pitch and loudness measures for a recording on disk.
+
+    Runs in a worker process; returns None when no speech is found.
+    """
+    info = soundfile.info(path)
+    samplerate = info.samplerate
+    frame = int(samplerate * FRAME_SECONDS)
+    channel = channel if channel < info.channels else 0
+
+    levels, pitches = [], []
+    carry = np.zeros(0, dtype=np.float32)
+    for block in soundfile.blocks(path, blocksize=frame * BLOCK_FRAMES, dtype="float32", always_2d=True):
+        samples = np.concatenate((carry, block[:, channel]))
+        usable = len(samples) // frame * frame
+        carry = samples[usable:]
+        if usable:
+            rms, pitch = _frame_features(samples[:usable], samplerate)
+            levels.append(rms)
+            pitches.append(pitch)
+    if not levels:
+        return None
+
+    db = 20 * np.log10(np.concatenate(levels) + 1e-10)
+    pitch = np.concatenate(pitches)
+    threshold = max(np.percentile(db, 10) + SPEECH_MARGIN_DB, SILENCE_FLOOR_DB)
+    voiced = db > threshold
+    if not voiced.any():
+        return None
+
+    # Speaking span: first to last voiced frame; silences inside it shorter
+    # than MIN_PAUSE_SECONDS are part of speech (stops, breaths between words)
+    first, last = np.flatnonzero(voiced)[[0, -1]]
+    span = voiced[first:last + 1]
+    starts, lengths = _runs(~span)
+    min_frames = int(round(MIN_PAUSE_SECONDS / FRAME_SECONDS))
+    pause_frames = int(lengths[lengths >= min_frames].sum())
+    span_seconds = len(span) * FRAME_SECONDS
+    speaking_seconds = (len(span) - pause_frames) * FRAME_SECONDS
+
+    voiced_pitch = pitch[voiced & ~np.isnan(pitch)]
+    pitch_variability = None
+    if len(voiced_pitch) >= 10:
+        semitones = 12 * np.log2(voiced_pitch / np.median(voiced_pitch))
+        pitch_variability = round(float(np.std(semitones)), 2)
+
+    loudness_spread = float(np.std(db[voiced]))
+    return {
+        "duration_seconds": round(len(db) * FRAME_SECONDS, 1),
+        "speaking_seconds": round(speaking_seconds, 1),
+        "pause_ratio": round(pause_frames * FRAME_SECONDS / span_seconds, 3),
+        "pauses": int((lengths >= min_frames).sum()),
+        "pitch_variability_semitones": pitch_variability,
+        "loudness_stability": round(max(0.0, 1 - loudness_spread / 15), 3),
+    }
+
+
+async def analyze(audio_url: str | None, word_count: int) -> dict | None:
+    """Measure the caller's delivery from the recording at audio_url.
+
+    Returns None when audio analysis is unavailable or there is no
+    recording; download and decode errors propagate.
+    """
+    if not audio_url or not available():
+        return None
+    with tempfile.TemporaryDirectory(prefix="echoeval-audio-") as directory:
+        with metrics.span("audio.download"):
+            path = await download(audio_url, directory)
+        with metrics.span("audio.analyze"):
+            loop = asyncio.get_running_loop()
+            measures = await loop.run_in_executor(_executor(), analyze_file, path, AUDIO_USER_CHANNEL)
+    if measures is None:
+        return None
+    minutes = measures["speaking_seconds"] / 60
+    measures["speech_rate_wpm"] = round(word_count / minutes) if minutes and word_count else None
+    return measures
+
+
+def fluency_score(measures: dict) -> int:
+    """0-100 fluency from pause ratio and speech rate.
+
+    Pauses up to 15% of the speaking span are natural; the score falls to 0
+    at 60%. 120-170 wpm is a comfortable pace; every wpm outside it costs
+    1.25 points.
+    """
+    pause = 100 * min(1.0, max(0.0, (0.6 - measures["pause_ratio"]) / 0.45))
+    wpm = measures.get("speech_rate_wpm")
+    if wpm is None:
+        return round(pause)
+    rate = max(0.0, 100 - 1.25 * max(120 - wpm, wpm - 170, 0))
+    return round(0.6 * pause + 0.4 * rate)
@@ -1,8 +1,7 @@
-import json
-from openai import OpenAI
-from config import OPENAI_API_KEY
-
-client = OpenAI(api_key=OPENAI_API_KEY)
+from config import FEEDBACK_TRANSCRIPT_MAX_TOKENS
+from services import llm
+from services.json_stream import IncrementalObjectParser
+from services.transcript_budget import elide
 
 FEEDBACK_PROMPT = """You are Alexa, an expert communication coach evaluating a practice session transcript.
 
@@ -51,30 +50,33 @@ GUIDELINES:
 Return ONLY valid JSON, no markdown or extra text."""
 
 
-async def generate_feedback(
-    transcript: str,
-    analysis: dict,
-) -> dict:
-    """Generate coaching feedback using OpenAI."""
-    prompt = FEEDBACK_PROMPT.format(
-        transcript=transcript,
+def build_feedback_prompt(transcript: str, analysis: dict) -> str:
+    return FEEDBACK_PROMPT.format(
+        transcript=elide(transcript, FEEDBACK_TRANSCRIPT_MAX_TOKENS),
         hedging_count=analysis["hedging_count"],
         filler_count=analysis["filler_count"],
         recommendation_first=analysis["recommendation_first"],
         conciseness_score=analysis["conciseness_score"],
     )
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.7,
-        max_tokens=500,
-    )
 
-    content = response.choices[0].message.content.strip()
-    # Strip markdown code fences if present
-    if content.startswith("```"):
-        content = content.split("\n", 1)[1]
-        content = content.rsplit("```", 1)[0]
-
-    return json.loads(content)
+async def generate_feedback(
+    transcript: str,
+    analysis: dict,
+) -> dict:
+    """Generate coaching feedback using OpenAI."""
+    prompt = build_feedback_prompt(transcript, analysis)
+    return await llm.complete_json(prompt, temperature=0.7, max_tokens=500, label="feedback", expect=dict)
+
+
+async def generate_feedback_stream(transcript: str, analysis: dict):
+    """Streaming variant of generate_feedback: yields (field, value) as soon as
+    each top-level field of the feedback JSON is complete."""
+    prompt = build_feedback_prompt(transcript, analysis)
+    parser = IncrementalObjectParser()
+    async for delta in llm.stream(prompt, temperature=0.7, max_tokens=500, label="feedback"):
+        for field, value in parser.feed(delta):
+            yield field, value
+    if not parser.done:
+        # Not a complete JSON object; don't replay it from the cache
+        llm.forget(prompt, temperature=0.7, max_tokens=500)
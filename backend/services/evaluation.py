@@ -1,70 +1,51 @@
-import re
 import json
 import asyncio
 import traceback
-from openai import OpenAI
-from config import OPENAI_API_KEY
+from config import (
+    EVALUATION_PARTIAL_WRITES,
+    EVALUATION_MODE,
+    VOICE_METRICS_SCORING,
+    VOICE_METRICS_MAX_TOKENS,
+    TOPIC_SESSION_MAX_TOKENS,
+    TOPIC_SEGMENT_MAX_TOKENS,
+    TOPIC_PREVIEW_MAX_TOKENS,
+    TOPIC_PREVIEW_SEGMENT_TOKENS,
+    TOPIC_OUTPUT_TOKENS_PER_TOPIC,
+)
+from models.schemas import SessionEvaluation, SessionEvaluationNotes
+from services import audio_metrics, events, llm, metrics, scoring, tiers
 from services.supabase_client import supabase_admin
+from services.tiers import TIERS, Tier
+from services.tokens import count_tokens
+from services.topic_segments import find_segments
+from services.topic_batcher import batcher
+from services.transcript_budget import allocate, elide, fit_turns, format_turns
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+# Reply size for topic label cleanup: one {"name", "valid"} object per segment
+LABEL_TOKENS_BASE = 16
+LABEL_TOKENS_PER_SEGMENT = 32
 
-# Patterns that indicate the assistant is asking for a topic
-TOPIC_ASK_PATTERNS = [
-    r"what.*(?:topic|situation|scenario).*(?:practice|work on|try)",
-    r"what do you want to practice",
-    r"what.*want.*(?:practice|work on)",
-    r"go ahead",
-    r"give it.*(?:shot|try)",
-    r"same topic",
-    r"what.*next",
-    r"try something new",
-]
+# Pre-pass names are the caller's first words on the topic; kept without
+# label cleanup, they're cut to a label's length
+RAW_LABEL_MAX_WORDS = 8
 
 
-def extract_topics(full_transcript: list[dict]) -> list[dict]:
-    """Step 1: Extract topics from the full transcript using regex + GPT-4o-mini."""
+async def extract_topics(
+    full_transcript: list[dict],
+    segments: list[dict] | None = None,
+    clean_labels: bool = True,
+) -> list[dict]:
+    """Step 1: Extract topics from the full transcript using regex + GPT-4o-mini.
+
+    `segments` skips the regex pre-pass when it already ran during the call.
+    `clean_labels=False` keeps the pre-pass names and skips the LLM call.
+    """
     if not full_transcript:
         return []
 
     # Phase 1: Regex pre-pass to identify topic boundaries
-    segments = []
-    current_segment_start = None
-    current_topic_name = None
-    pending_topic_ask = False
-
-    for i, turn in enumerate(full_transcript):
-        role = turn.get("role", "")
-        content = turn.get("content", "")
-
-        if role == "assistant":
-            # Check if assistant is asking for a topic
-            content_lower = content.lower()
-            for pattern in TOPIC_ASK_PATTERNS:
-                if re.search(pattern, content_lower):
-                    pending_topic_ask = True
-                    break
-
-        elif role == "user" and pending_topic_ask:
-            # User's response after a topic ask = topic name
-            # Close previous segment if exists
-            if current_segment_start is not None:
-                segments.append({
-                    "raw_name": current_topic_name,
-                    "start_idx": current_segment_start,
-                    "end_idx": i - 1,
-                })
-
-            current_topic_name = content.strip()[:100]
-            current_segment_start = i
-            pending_topic_ask = False
-
-    # Close final segment
-    if current_segment_start is not None:
-        segments.append({
-            "raw_name": current_topic_name,
-            "start_idx": current_segment_start,
-            "end_idx": len(full_transcript) - 1,
-        })
+    if segments is None:
+        segments = find_segments(full_transcript)
 
     if not segments:
         # Fallback: treat entire user speech as one topic
@@ -80,18 +61,20 @@ def extract_topics(full_transcript: list[dict]) -> list[dict]:
         else:
             return []
 
-    # Phase 2: GPT-4o-mini call to clean up topic labels
-    segment_previews = []
-    for seg in segments:
-        preview_turns = full_transcript[seg["start_idx"]:seg["end_idx"] + 1][:4]
-        preview = " | ".join(
-            f'{t.get("role", "?")}: {t.get("content", "")[:80]}'
-            for t in preview_turns
-        )
-        segment_previews.append({
-            "raw_name": seg["raw_name"],
-            "preview": preview,
-        })
+    if not clean_labels:
+        return _topics_from_segments(full_transcript, segments, [])
+
+    # Phase 2: GPT-4o-mini call to clean up topic labels. Each segment gets a
+    # proportional share of the preview budget, taken from its opening turns.
+    opening_turns = [full_transcript[seg["start_idx"]:seg["end_idx"] + 1][:4] for seg in segments]
+    budgets = allocate(
+        [min(count_tokens(" | ".join(format_turns(turns))), TOPIC_PREVIEW_SEGMENT_TOKENS) for turns in opening_turns],
+        TOPIC_PREVIEW_MAX_TOKENS,
+    )
+    segment_previews = [
+        {"raw_name": seg["raw_name"], "preview": fit_turns(turns, budget).replace("\n", " | ")}
+        for seg, turns, budget in zip(segments, opening_turns, budgets)
+    ]
 
     prompt = f"""You are cleaning up topic labels from a communication coaching session.
 
@@ -105,28 +88,34 @@ Segments:
 Return ONLY valid JSON array, no markdown."""
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
+        cleaned = await llm.complete_json(
+            prompt,
             temperature=0.3,
-            max_tokens=300,
+            max_tokens=LABEL_TOKENS_BASE + LABEL_TOKENS_PER_SEGMENT * len(segments),
+            label="topic_labels",
+            expect=list,
         )
-        content = response.choices[0].message.content.strip()
-        if content.startswith("```"):
-            content = content.split("\n", 1)[1]
-            content = content.rsplit("```", 1)[0]
-        cleaned = json.loads(content)
     except Exception:
         # Fallback: use raw names
+        metrics.fallback("topic_labels")
         cleaned = [{"name": seg["raw_name"], "valid": True} for seg in segments]
 
-    # Build final topics with transcript segments
+    return _topics_from_segments(full_transcript, segments, cleaned)
+
+
+def _short_label(raw_name: str) -> str:
+    words = raw_name.split()
+    return " ".join(words[:RAW_LABEL_MAX_WORDS]) + ("…" if len(words) > RAW_LABEL_MAX_WORDS else "")
+
+
+def _topics_from_segments(full_transcript: list[dict], segments: list[dict], cleaned: list[dict]) -> list[dict]:
+    """Final topics with transcript segments; `cleaned` are the LLM's labels."""
     topics = []
     for i, seg in enumerate(segments):
         if i < len(cleaned) and not cleaned[i].get("valid", True):
             continue
 
-        name = cleaned[i]["name"] if i < len(cleaned) else seg["raw_name"]
+        name = cleaned[i]["name"] if i < len(cleaned) else _short_label(seg["raw_name"])
         segment_turns = full_transcript[seg["start_idx"]:seg["end_idx"] + 1]
 
         topics.append({
@@ -139,8 +128,28 @@ Return ONLY valid JSON array, no markdown."""
     return topics
 
 
-def evaluate_voice_metrics(user_text: str, audio_url: str | None) -> dict:
-    """Step 2: Evaluate voice/communication metrics from text (audio support stubbed)."""
+async def evaluate_voice_metrics(
+    user_text: str,
+    audio_url: str | None,
+    strict: bool = False,
+    speaking_seconds: float | None = None,
+    write_text: bool = True,
+    transcript_tokens: int = VOICE_METRICS_MAX_TOKENS,
+) -> dict:
+    """Step 2: Evaluate voice/communication metrics from text and the recording.
+
+    With VOICE_METRICS_SCORING=local the scores are computed from transcript
+    features (services/scoring.py) and the LLM only writes positives and
+    to_improve; `write_text=False` skips the LLM and uses notes derived from
+    the features. `transcript_tokens` caps the transcript sent to the LLM.
+    When the recording can be analysed
+    (services/audio_metrics.py), measured pauses and pace go into fluency
+    and the measurements are stored under "audio".
+
+    If the LLM fails, local scores and feature notes are used when numpy
+    is available; otherwise (and always with `strict`) the failure raises,
+    so no placeholder scores are stored.
+    """
     if not user_text or not user_text.strip():
         return {
             "grammar": {"score": 0, "positives": [], "to_improve": ["No speech detected"]},
@@ -149,11 +158,122 @@ def evaluate_voice_metrics(user_text: str, audio_url: str | None) -> dict:
             "clarity": {"score": 0, "positives": [], "to_improve": ["No speech detected"]},
         }
 
+    local = VOICE_METRICS_SCORING == "local" and scoring.available()
+    found = scoring.features(user_text, speaking_seconds) if local else None
+
+    async def text_part() -> dict:
+        nonlocal found
+        if not local:
+            try:
+                return await _voice_metrics_from_text(user_text, transcript_tokens)
+            except Exception:
+                # Without local scoring there's nothing real to store, and
+                # the job is retried
+                if strict or not scoring.available():
+                    raise
+                metrics.fallback("voice_metrics")
+                found = scoring.features(user_text, speaking_seconds)
+                return scoring.notes(found)
+        if not write_text:
+            return scoring.notes(found)
+        return await _voice_metrics_notes(user_text, found, strict, transcript_tokens)
+
+    voice_metrics, measures = await asyncio.gather(
+        text_part(),
+        _measure_audio(audio_url, len(user_text.split())),
+    )
+    return _with_scores(voice_metrics, found, measures)
+
+
+def _with_scores(voice_metrics: dict, found: dict | None, measures: dict | None) -> dict:
+    """Local scores (when `found` features are given) and the recording's
+    fluency merged into voice metrics. Raises ValueError if voice_metrics
+    isn't a dict (a malformed reply)."""
+    if not isinstance(voice_metrics, dict):
+        raise ValueError(f"voice_metrics: expected a dict, got {type(voice_metrics).__name__}")
+    if found is not None:
+        scores = scoring.score(found)
+        if measures:
+            # The recording's pauses and pace replace the duration estimate
+            scores["fluency"] = round(
+                (scoring.score({**found, "wpm": None})["fluency"] + audio_metrics.fluency_score(measures)) / 2
+            )
+        for metric, value in scores.items():
+            voice_metrics.setdefault(metric, {"positives": [], "to_improve": []})["score"] = value
+        voice_metrics["features"] = found
+    elif measures:
+        voice_metrics.setdefault("fluency", {"positives": [], "to_improve": []})["score"] = (
+            audio_metrics.fluency_score(measures)
+        )
+    if measures:
+        voice_metrics["audio"] = measures
+    return voice_metrics
+
+
+async def _measure_audio(audio_url: str | None, word_count: int) -> dict | None:
+    try:
+        return await audio_metrics.analyze(audio_url, word_count)
+    except Exception as e:
+        print(f"[EVAL] Audio analysis failed, keeping text scores: {type(e).__name__}: {e}")
+        metrics.fallback("audio_metrics")
+        return None
+
+
+async def _voice_metrics_notes(user_text: str, found: dict, strict: bool, transcript_tokens: int) -> dict:
+    """LLM-written positives/to_improve for locally scored metrics."""
+    measured = {k: v for k, v in found.items() if k != "top_fillers" and v is not None}
+    prompt = f"""You are an expert communication evaluator. Analyze this speech transcript for communication quality.
+
+Transcript:
+---
+{elide(user_text, transcript_tokens)}
+---
+
+Evaluate these metrics. Scores are computed separately from these measurements: {json.dumps(measured)}
+
+1. **grammar**: Correctness of sentence structure, subject-verb agreement, tense consistency
+2. **fluency**: Smooth delivery, logical flow, natural transitions, no awkward pauses or restarts
+3. **filler_words**: Absence of fillers (um, uh, like, you know, so, basically)
+4. **clarity**: Clear expression of ideas, easy to follow, well-organized thoughts
+
+For each metric provide:
+- positives: 1-2 specific things done well (reference actual speech)
+- to_improve: 1-2 concrete suggestions
+
+Return ONLY valid JSON:
+{{
+  "grammar": {{"positives": [...], "to_improve": [...]}},
+  "fluency": {{"positives": [...], "to_improve": [...]}},
+  "filler_words": {{"positives": [...], "to_improve": [...]}},
+  "clarity": {{"positives": [...], "to_improve": [...]}}
+}}"""
+
+    try:
+        written = await llm.complete_json(prompt, temperature=0.5, max_tokens=700, label="voice_metrics", expect=dict)
+    except Exception:
+        if strict:
+            raise
+        metrics.fallback("voice_metrics")
+        written = {}
+
+    return _fill_notes(written, found)
+
+
+def _fill_notes(written: dict, found: dict) -> dict:
+    """Feature-derived notes fill anything the reply left out."""
+    notes = scoring.notes(found)
+    for metric in scoring.METRICS:
+        for field in ("positives", "to_improve"):
+            notes[metric][field] = (written.get(metric) or {}).get(field) or notes[metric][field]
+    return notes
+
+
+async def _voice_metrics_from_text(user_text: str, transcript_tokens: int) -> dict:
     prompt = f"""You are an expert communication evaluator. Analyze this speech transcript for communication quality.
 
 Transcript:
 ---
-{user_text[:3000]}
+{elide(user_text, transcript_tokens)}
 ---
 
 Evaluate these metrics (each 0-100, where 100 is excellent):
@@ -176,97 +296,287 @@ Return ONLY valid JSON:
   "clarity": {{"score": N, "positives": [...], "to_improve": [...]}}
 }}"""
 
+    return await llm.complete_json(
+        prompt, temperature=0.5, max_tokens=800, label="voice_metrics", expect=dict, required=scoring.METRICS,
+    )
+
+
+async def analyze_topics(
+    topics: list[dict],
+    strict: bool = False,
+    session_tokens: int = TOPIC_SESSION_MAX_TOKENS,
+) -> list[dict]:
+    """Step 3: Deep per-topic analysis with GPT-4o-mini.
+
+    Topics go through the cross-session batcher, so topics from concurrent
+    evaluations share LLM requests. `strict` raises LLM failures instead of
+    returning topics without analysis.
+    """
+    if not topics:
+        return []
+
+    # Split the session's transcript budget across topics by length
+    segments = [t.get("segment", []) for t in topics]
+    budgets = allocate(
+        [min(count_tokens("\n".join(format_turns(seg))), TOPIC_SEGMENT_MAX_TOKENS) for seg in segments],
+        session_tokens,
+    )
+    topic_data = [
+        {"name": t["name"], "transcript": fit_turns(seg, budget)}
+        for t, seg, budget in zip(topics, segments, budgets)
+    ]
+
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.5,
-            max_tokens=800,
-        )
-        content = response.choices[0].message.content.strip()
-        if content.startswith("```"):
-            content = content.split("\n", 1)[1]
-            content = content.rsplit("```", 1)[0]
-        return json.loads(content)
+        analyzed = await batcher.analyze(topic_data)
     except Exception:
-        return {
-            "grammar": {"score": 50, "positives": ["Could not fully analyze"], "to_improve": ["Try again for detailed feedback"]},
-            "fluency": {"score": 50, "positives": ["Could not fully analyze"], "to_improve": ["Try again for detailed feedback"]},
-            "filler_words": {"score": 50, "positives": ["Could not fully analyze"], "to_improve": ["Try again for detailed feedback"]},
-            "clarity": {"score": 50, "positives": ["Could not fully analyze"], "to_improve": ["Try again for detailed feedback"]},
+        if strict:
+            raise
+        # Return topics without deep analysis on failure
+        metrics.fallback("topic_analysis")
+        analyzed = [None] * len(topics)
+
+    # Merge analysis back into topics
+    for topic, analysis in zip(topics, analyzed):
+        analysis = analysis or {}
+        topic["scores"] = analysis.get("scores", {})
+        topic["went_well"] = analysis.get("went_well", [])
+        topic["to_improve"] = analysis.get("to_improve", [])
+        topic["missed_points"] = analysis.get("missed_points", [])
+        topic["rewrite"] = analysis.get("rewrite", "")
+    return topics
+
+
+async def evaluate_session(
+    full_transcript: list[dict],
+    user_text: str,
+    audio_url: str | None,
+    segments: list[dict] | None = None,
+    strict: bool = False,
+    on_stage=None,
+    duration_seconds: float | None = None,
+    tier: Tier = TIERS["deep"],
+) -> dict:
+    """The 3-step pipeline without any database writes.
+
+    Returns the evaluation's {"topics", "voice_metrics"} columns. Shared by
+    the deep_evaluation job and the bulk re-evaluation CLI. `on_stage` is
+    awaited with a step's column as soon as it finishes while the other step
+    is still running, e.g. to store topics before voice metrics are done.
+    `duration_seconds` (the call's) gives voice metrics a speaking pace.
+    `tier` (services/tiers.py) decides which steps call the LLM.
+
+    With EVALUATION_MODE=single, tiers with topic analysis run all three
+    steps as one structured-output call (_evaluate_in_one_call); if that
+    call fails the steps run separately.
+    """
+    if EVALUATION_MODE == "single" and tier.analyze_topics:
+        try:
+            with metrics.span("evaluation.single_call", turns=len(full_transcript)):
+                evaluation = await _evaluate_in_one_call(
+                    full_transcript, user_text, audio_url, segments,
+                    scoring.speaking_seconds(full_transcript, duration_seconds), tier,
+                )
+            if evaluation is not None:
+                return evaluation
+        except Exception as e:
+            if strict:
+                raise
+            print(f"[EVAL] Single-call evaluation failed, running each step: {type(e).__name__}: {e}")
+            metrics.fallback("session_evaluation")
+
+    # Step 1: Topic extraction (must complete first)
+    with metrics.span("evaluation.topic_extraction", turns=len(full_transcript)):
+        topics = await extract_topics(full_transcript, segments, clean_labels=tier.label_topics)
+
+    evaluation = {}
+    columns = ("voice_metrics", "topics")
+
+    async def stage(column: str, awaitable):
+        evaluation[column] = await awaitable
+        # The last step's column goes out with the caller's final write
+        if on_stage is not None and len(evaluation) < len(columns):
+            await on_stage({column: evaluation[column]})
+
+    # Steps 2+3 in parallel
+    await asyncio.gather(
+        stage("voice_metrics", metrics.timed(
+            "evaluation.voice_metrics", evaluate_voice_metrics(
+                user_text, audio_url, strict, scoring.speaking_seconds(full_transcript, duration_seconds),
+                write_text=tier.voice_notes, transcript_tokens=tier.voice_tokens,
+            ),
+        )),
+        stage("topics", metrics.timed(
+            "evaluation.topic_analysis", _analyze_topics_for_db(topics, strict, tier), topics=len(topics),
+        )),
+    )
+    return {column: evaluation[column] for column in ("topics", "voice_metrics")}
+
+
+async def _analyze_topics_for_db(topics: list[dict], strict: bool, tier: Tier) -> list[dict]:
+    """Step 3, with segment data stripped from topics (too large for DB).
+    Tiers without topic analysis store the topics with empty analysis."""
+    if tier.analyze_topics:
+        topics = await analyze_topics(topics, strict, tier.topic_tokens)
+    return _topics_for_db(topics)
+
+
+def _topics_for_db(topics: list[dict]) -> list[dict]:
+    return [
+        {
+            "name": t.get("name"),
+            "scores": t.get("scores", {}),
+            "went_well": t.get("went_well", []),
+            "to_improve": t.get("to_improve", []),
+            "missed_points": t.get("missed_points", []),
+            "rewrite": t.get("rewrite", ""),
+            "start_idx": t.get("start_idx"),
+            "end_idx": t.get("end_idx"),
         }
+        for t in topics
+    ]
 
 
-def analyze_topics(topics: list[dict]) -> list[dict]:
-    """Step 3: Deep per-topic analysis with GPT-4o-mini (all topics batched)."""
-    if not topics:
-        return []
+SESSION_EVALUATION_PROMPT = """You are an expert communication coach evaluating a whole practice session in one pass.
 
-    # Build topic summaries for the prompt, trimmed to ~1500 chars each
-    topic_data = []
-    for t in topics:
-        segment_text = "\n".join(
-            f'{turn.get("role", "?")}: {turn.get("content", "")}'
-            for turn in t.get("segment", [])
-        )[:1500]
-        topic_data.append({
-            "name": t["name"],
-            "transcript": segment_text,
-        })
+The session's transcript is split into numbered segments, each a possible practice topic:
+{segments}
 
-    prompt = f"""You are an expert communication coach doing deep analysis of practice session topics.
+For EACH segment, return a topic with:
+- "segment": the segment number, unchanged
+- "name": a clean, concise topic label (e.g., "Giving feedback to a report", "Pitching a product idea")
+- "valid": true if this is an actual practice attempt, false if it is just small talk or a greeting
+- "scores": structure, opening_impact, key_message_clarity, persuasiveness, confidence, audience_awareness (each 0-100)
+- "went_well": 2-3 items describing what the user did well, with brief transcript quotes
+- "to_improve": 2-3 items with concrete improvement suggestions
+- "missed_points": 2-4 key elements a strong communicator would have covered
+- "rewrite": 3-4 sentence model version of how a confident leader would deliver this
 
-For each topic below, evaluate the user's communication performance. Adapt your rubric based on the topic type:
+Adapt the rubric to the topic type:
 - Giving feedback → evaluate specificity, actionability, empathy, structure
 - Pitching/presenting → evaluate hook, value proposition, CTA, storytelling
 - Saying no/difficult conversations → evaluate firmness, alternatives offered, maintaining relationship
 - General communication → evaluate structure, clarity, persuasiveness, confidence
 
-Topics to analyze:
-{json.dumps(topic_data)}
+Then "voice_metrics", judging the User's lines across all segments:
+1. grammar: Correctness of sentence structure, subject-verb agreement, tense consistency
+2. fluency: Smooth delivery, logical flow, natural transitions, no awkward pauses or restarts
+3. filler_words: Absence of fillers (um, uh, like, you know, so, basically)
+4. clarity: Clear expression of ideas, easy to follow, well-organized thoughts
 
-For EACH topic, return:
-- "name": the topic name
-- "scores": object with keys: structure, opening_impact, key_message_clarity, persuasiveness, confidence, audience_awareness (each 0-100)
-- "went_well": 2-3 items describing what the user did well, with brief transcript quotes
-- "to_improve": 2-3 items with concrete improvement suggestions
-- "missed_points": 2-4 key elements a strong communicator would have covered
-- "rewrite": 3-4 sentence model version of how a confident leader would deliver this
+{voice_metric_fields}"""
 
-Return ONLY valid JSON array of topic analyses. No markdown."""
+VOICE_SCORE_FIELDS = """For each metric provide:
+- score (0-100, where 100 is excellent; for filler_words 100 = no fillers)
+- positives: 1-2 specific things done well (reference actual speech)
+- to_improve: 1-2 concrete suggestions"""
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.6,
-            max_tokens=2000,
-        )
-        content = response.choices[0].message.content.strip()
-        if content.startswith("```"):
-            content = content.split("\n", 1)[1]
-            content = content.rsplit("```", 1)[0]
-        analyzed = json.loads(content)
-
-        # Merge analysis back into topics
-        for i, topic in enumerate(topics):
-            if i < len(analyzed):
-                topic["scores"] = analyzed[i].get("scores", {})
-                topic["went_well"] = analyzed[i].get("went_well", [])
-                topic["to_improve"] = analyzed[i].get("to_improve", [])
-                topic["missed_points"] = analyzed[i].get("missed_points", [])
-                topic["rewrite"] = analyzed[i].get("rewrite", "")
-
-        return topics
-    except Exception:
-        # Return topics without deep analysis on failure
-        for topic in topics:
-            topic["scores"] = {}
-            topic["went_well"] = []
-            topic["to_improve"] = []
-            topic["missed_points"] = []
-            topic["rewrite"] = ""
-        return topics
+VOICE_NOTE_FIELDS = """Scores are computed separately from these measurements: {measured}
+
+For each metric provide:
+- positives: 1-2 specific things done well (reference actual speech)
+- to_improve: 1-2 concrete suggestions"""
+
+# Reply size for the voice metrics part of the single-call evaluation
+VOICE_REPLY_TOKENS = 800
+
+
+async def _evaluate_in_one_call(
+    full_transcript: list[dict],
+    user_text: str,
+    audio_url: str | None,
+    segments: list[dict] | None,
+    speaking_seconds: float | None,
+    tier: Tier,
+) -> dict | None:
+    """Steps 1-3 as one LLM call with a JSON-schema structured output
+    (models/schemas.py SessionEvaluation).
+
+    The pre-pass segments go out once, numbered, within the tier's topic
+    budget; the reply labels and validates each segment, analyzes it, and
+    writes the voice metrics from the same text, so nothing is sent twice.
+    Local scoring and the recording are merged in as in the multi-call
+    pipeline. Returns None when there is nothing to evaluate this way.
+    """
+    topics = await extract_topics(full_transcript, segments, clean_labels=False)
+    if not topics or not user_text.strip():
+        return None
+
+    budgets = allocate(
+        [min(count_tokens("\n".join(format_turns(t["segment"]))), TOPIC_SEGMENT_MAX_TOKENS) for t in topics],
+        tier.topic_tokens,
+    )
+    numbered = [
+        {"segment": i, "transcript": fit_turns(t["segment"], budget)}
+        for i, (t, budget) in enumerate(zip(topics, budgets))
+    ]
+
+    local = VOICE_METRICS_SCORING == "local" and scoring.available()
+    found = scoring.features(user_text, speaking_seconds) if local else None
+    if local:
+        measured = {k: v for k, v in found.items() if k != "top_fillers" and v is not None}
+        voice_metric_fields = VOICE_NOTE_FIELDS.format(measured=json.dumps(measured))
+    else:
+        voice_metric_fields = VOICE_SCORE_FIELDS
+    prompt = SESSION_EVALUATION_PROMPT.format(
+        segments=json.dumps(numbered, ensure_ascii=False),
+        voice_metric_fields=voice_metric_fields,
+    )
+
+    reply, measures = await asyncio.gather(
+        llm.complete_structured(
+            prompt,
+            SessionEvaluationNotes if local else SessionEvaluation,
+            temperature=0.4,
+            max_tokens=TOPIC_OUTPUT_TOKENS_PER_TOPIC * len(topics) + VOICE_REPLY_TOKENS,
+            label="session_evaluation",
+        ),
+        _measure_audio(audio_url, len(user_text.split())),
+    )
+
+    analyses = {t.segment: t for t in reply.topics}
+    analyzed = []
+    for i, topic in enumerate(topics):
+        analysis = analyses.get(i)
+        if analysis is not None:
+            if not analysis.valid:
+                continue
+            topic = {
+                **topic,
+                **analysis.model_dump(exclude={"segment", "valid", "scores"}),
+                "scores": {k: _clamp(v) for k, v in analysis.scores.model_dump().items()},
+            }
+        analyzed.append(topic)
+
+    voice_metrics = reply.voice_metrics.model_dump()
+    if local:
+        voice_metrics = _fill_notes(voice_metrics, found)
+    else:
+        for metric in voice_metrics.values():
+            metric["score"] = _clamp(metric["score"])
+    return {
+        "topics": _topics_for_db(analyzed),
+        "voice_metrics": _with_scores(voice_metrics, found, measures),
+    }
+
+
+def _clamp(score: int) -> int:
+    return max(0, min(100, score))
+
+
+def _save_evaluation(session_id: str, user_id: str, columns: dict) -> dict | None:
+    """Write evaluation columns in one upsert keyed on session_id.
+
+    Every state change goes through here, so a retried webhook or job
+    updates the session's one row instead of adding another.
+    """
+    with metrics.span("supabase.evaluations.upsert"):
+        result = supabase_admin.table("evaluations").upsert({
+            "session_id": session_id,
+            "user_id": user_id,
+            **columns,
+            "updated_at": "now()",
+        }, on_conflict="session_id").execute()
+    return result.data[0] if result.data else None
 
 
 async def run_deep_evaluation(
@@ -275,67 +585,76 @@ async def run_deep_evaluation(
     full_transcript: list[dict],
     user_text: str,
     audio_url: str | None,
+    segments: list[dict] | None = None,
+    duration_seconds: float | None = None,
+    requested_tier: str | None = None,
+    queued_at: float | None = None,
+    final_attempt: bool = True,
 ):
-    """Orchestrator: runs the 3-step deep evaluation pipeline."""
+    """Orchestrator: runs the 3-step deep evaluation pipeline.
+
+    `segments` are topic boundaries already found during the call, if any.
+    The tier comes from tiers.select(): the user's `requested_tier`, the
+    call's size and current load; `queued_at` (epoch seconds) is when the
+    job was queued, right after quick feedback, for the SLA.
+
+    The row goes straight to `processing`, gets each step's columns as it
+    finishes (EVALUATION_PARTIAL_WRITES), and ends `completed` or `failed`.
+
+    Runs as a `deep_evaluation` job; failures are re-raised so the queue
+    retries with backoff. Only the `final_attempt` marks the row `failed`
+    and publishes EVALUATION_FAILED; before that the row stays `processing`
+    so clients keep waiting for the retry.
+    """
     eval_record = None
     try:
-        # Create evaluation record
-        result = supabase_admin.table("evaluations").insert({
-            "session_id": session_id,
-            "user_id": user_id,
-            "status": "pending",
-            "audio_url": audio_url,
-        }).execute()
-        eval_record = result.data[0] if result.data else None
-        eval_id = eval_record["id"] if eval_record else None
-
-        if not eval_id:
-            return
+        if segments is None:
+            segments = find_segments(full_transcript)
+        tier, reason = tiers.select(len(user_text.split()), len(segments), requested_tier, queued_at)
+        print(f"[EVAL] Session {session_id}: {tier.name} tier ({reason})")
 
-        # Update to processing
-        supabase_admin.table("evaluations").update({
+        eval_record = _save_evaluation(session_id, user_id, {
             "status": "processing",
-            "updated_at": "now()",
-        }).eq("id", eval_id).execute()
-
-        # Step 1: Topic extraction (must complete first)
-        topics = await asyncio.to_thread(extract_topics, full_transcript)
-
-        # Steps 2+3 in parallel
-        voice_future = asyncio.to_thread(evaluate_voice_metrics, user_text, audio_url)
-        topics_future = asyncio.to_thread(analyze_topics, topics)
-
-        voice_metrics, analyzed_topics = await asyncio.gather(voice_future, topics_future)
-
-        # Strip segment data from topics before storing (too large for DB)
-        topics_for_db = []
-        for t in analyzed_topics:
-            topics_for_db.append({
-                "name": t.get("name"),
-                "scores": t.get("scores", {}),
-                "went_well": t.get("went_well", []),
-                "to_improve": t.get("to_improve", []),
-                "missed_points": t.get("missed_points", []),
-                "rewrite": t.get("rewrite", ""),
-                "start_idx": t.get("start_idx"),
-                "end_idx": t.get("end_idx"),
-            })
+            "tier": tier.name,
+            "audio_url": audio_url,
+            "error_message": None,
+        })
+        if not eval_record:
+            return
+        events.publish(session_id, events.EVALUATION_PROCESSING, eval_record)
+
+        async def save_stage(columns: dict):
+            # Best effort: the final write stores every column again
+            try:
+                partial = _save_evaluation(session_id, user_id, columns)
+            except Exception as e:
+                print(f"[EVAL] Partial write failed for session {session_id}: {e}")
+                return
+            if partial:
+                events.publish(session_id, events.EVALUATION_PARTIAL, partial)
+
+        evaluation = await evaluate_session(
+            full_transcript, user_text, audio_url, segments,
+            on_stage=save_stage if EVALUATION_PARTIAL_WRITES else None,
+            duration_seconds=duration_seconds,
+            tier=tier,
+        )
 
-        # Update evaluation to completed
-        supabase_admin.table("evaluations").update({
-            "status": "completed",
-            "topics": topics_for_db,
-            "voice_metrics": voice_metrics,
-            "updated_at": "now()",
-        }).eq("id", eval_id).execute()
+        completed = _save_evaluation(session_id, user_id, {"status": "completed", **evaluation})
+        tiers.record(tier, queued_at)
+        if completed:
+            events.publish(session_id, events.EVALUATION_COMPLETED, completed)
 
     except Exception as e:
         error_msg = f"{type(e).__name__}: {str(e)}\n{traceback.format_exc()}"
         print(f"[EVAL] Deep evaluation failed for session {session_id}: {error_msg}")
 
-        if eval_record:
-            supabase_admin.table("evaluations").update({
+        if eval_record and final_attempt:
+            _save_evaluation(session_id, user_id, {
                 "status": "failed",
                 "error_message": str(e)[:500],
-                "updated_at": "now()",
-            }).eq("id", eval_record["id"]).execute()
+            })
+            events.publish(session_id, events.EVALUATION_FAILED, {"status": "failed"})
+
+        # Let the job queue retry
+        raise
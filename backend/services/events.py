@@ -0,0 +1,42 @@
+"""In-process pub/sub for per-session progress events.
+
+The end-of-call and deep-evaluation jobs publish here as they progress, and
+GET /api/sessions/{id}/events relays the events to the browser over SSE.
+Subscribers in another process miss these events, so the stream also
+re-reads the session state from the database every SSE_RECHECK_SECONDS.
+"""
+import asyncio
+from collections import defaultdict
+from contextlib import contextmanager
+
+FEEDBACK_PARTIAL = "feedback_partial"
+FEEDBACK_READY = "feedback_ready"
+EVALUATION_PROCESSING = "evaluation_processing"
+EVALUATION_PARTIAL = "evaluation_partial"
+EVALUATION_COMPLETED = "evaluation_completed"
+EVALUATION_FAILED = "evaluation_failed"
+
+# No further events follow these
+TERMINAL_EVENTS = {EVALUATION_COMPLETED, EVALUATION_FAILED}
+
+_subscribers: dict[str, set[asyncio.Queue]] = defaultdict(set)
+
+
+def publish(session_id: str, event: str, data: dict | None = None):
+    for queue in list(_subscribers.get(session_id, ())):
+        try:
+            queue.put_nowait({"event": event, "data": data or {}})
+        except asyncio.QueueFull:
+            pass
+
+
+@contextmanager
+def subscribe(session_id: str):
+    queue: asyncio.Queue = asyncio.Queue(maxsize=100)
+    _subscribers[session_id].add(queue)
+    try:
+        yield queue
+    finally:
+        _subscribers[session_id].discard(queue)
+        if not _subscribers[session_id]:
+            del _subscribers[session_id]
@@ -0,0 +1,342 @@
+"""Offline stand-in for the OpenAI client (LLM_BACKEND=fake).
+
+Implements the slice of AsyncOpenAI the gateway in services/llm.py uses
+(chat.completions.create and its with_raw_response variant, streaming
+included) and answers each of the app's prompts with well-formed JSON of the
+right shape, so the whole pipeline runs
+without spending tokens or hitting rate limits. For load tests it can also
+behave like a real provider under stress:
+
+- FAKE_LLM_LATENCY: time to first token, as a distribution —
+  "fixed:MS", "uniform:LO,HI", "normal:MEAN,STD" or "lognormal:MEDIAN,SIGMA"
+- FAKE_LLM_MS_PER_TOKEN: generation time per completion token
+- FAKE_LLM_ERROR_RATE / FAKE_LLM_RATE_LIMIT_RATE / FAKE_LLM_TIMEOUT_RATE /
+  FAKE_LLM_MALFORMED_RATE: share of calls failing with a 500, a 429, a
+  timeout, or a reply that isn't valid JSON
+- FAKE_LLM_RPM / FAKE_LLM_TPM: per-minute request and token limits, enforced
+  with 429s and reported in x-ratelimit-* headers like OpenAI's
+- FAKE_LLM_RESPONSES: JSON file of canned replies per prompt kind
+  (topic_labels, topic_analysis, voice_metrics, feedback,
+  session_evaluation); for the per-item kinds the canned object is used for
+  every item (every topic, for session_evaluation)
+
+Apart from those clock-driven limits, everything is deterministic for a given
+FAKE_LLM_SEED: the random draws for a call depend only on the prompt and how
+many times it has been seen.
+"""
+import asyncio
+import hashlib
+import json
+import math
+import random
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+import httpx
+import openai
+
+from config import (
+    FAKE_LLM_LATENCY,
+    FAKE_LLM_MS_PER_TOKEN,
+    FAKE_LLM_ERROR_RATE,
+    FAKE_LLM_RATE_LIMIT_RATE,
+    FAKE_LLM_TIMEOUT_RATE,
+    FAKE_LLM_MALFORMED_RATE,
+    FAKE_LLM_RESPONSES,
+    FAKE_LLM_SEED,
+    FAKE_LLM_RPM,
+    FAKE_LLM_TPM,
+)
+from services.tokens import count_tokens
+
+STREAM_CHUNK_CHARS = 24
+
+TOPIC_SCORE_KEYS = (
+    "structure", "opening_impact", "key_message_clarity",
+    "persuasiveness", "confidence", "audience_awareness",
+)
+VOICE_METRIC_KEYS = ("grammar", "fluency", "filler_words", "clarity")
+
+_REQUEST = httpx.Request("POST", "https://fake-llm.local/v1/chat/completions")
+
+
+class LatencyDistribution:
+    """Samples milliseconds from a "kind:params" spec."""
+
+    KINDS = {
+        "fixed": lambda rng, ms: ms,
+        "uniform": lambda rng, lo, hi: rng.uniform(lo, hi),
+        "normal": lambda rng, mean, std: rng.gauss(mean, std),
+        "lognormal": lambda rng, median, sigma: rng.lognormvariate(math.log(median), sigma),
+    }
+
+    def __init__(self, spec: str):
+        kind, _, params = spec.partition(":")
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown latency distribution: {spec!r}")
+        self.spec = spec
+        self.sample_fn = self.KINDS[kind]
+        self.params = [float(p) for p in params.split(",") if p]
+
+    def sample(self, rng: random.Random) -> float:
+        return max(0.0, self.sample_fn(rng, *self.params))
+
+
+def prompt_kind(prompt: str) -> str:
+    if "evaluating a whole practice session" in prompt:
+        return "session_evaluation"
+    if "cleaning up topic labels" in prompt:
+        return "topic_labels"
+    if "Topics to analyze:" in prompt:
+        return "topic_analysis"
+    if "Evaluate these metrics" in prompt:
+        return "voice_metrics"
+    if "Provide feedback as JSON" in prompt:
+        return "feedback"
+    return "unknown"
+
+
+def _scores(prompt: str, salt: str, keys) -> dict:
+    digest = hashlib.sha256(f"{salt}:{prompt}".encode()).digest()
+    return {key: 40 + digest[i] % 56 for i, key in enumerate(keys)}
+
+
+def _embedded_json(prompt: str, start_marker: str, end_marker: str):
+    start = prompt.index(start_marker) + len(start_marker)
+    return json.loads(prompt[start:prompt.index(end_marker, start)])
+
+
+def _load_canned(path: str) -> dict:
+    if not path:
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+_canned = _load_canned(FAKE_LLM_RESPONSES)
+
+
+def fake_reply(prompt: str):
+    """The JSON a well-behaved model would return for one of the app's prompts."""
+    kind = prompt_kind(prompt)
+    canned = _canned.get(kind)
+
+    if kind == "topic_labels":
+        segments = _embedded_json(prompt, "Segments:\n", "\n\nReturn")
+        return [
+            canned or {"name": (seg.get("raw_name") or "Practice")[:60], "valid": True}
+            for seg in segments
+        ]
+
+    if kind == "topic_analysis":
+        topics = _embedded_json(prompt, "Topics to analyze:\n", "\n\nFor EACH")
+        return [
+            {
+                "scores": _scores(topic["transcript"], topic["name"], TOPIC_SCORE_KEYS),
+                "went_well": ["Stated a clear position early"],
+                "to_improve": ["Cut the hedging before the main point"],
+                "missed_points": ["A concrete next step"],
+                "rewrite": "Here's my recommendation. Here's why. Here's what I need from you.",
+                **(canned or {}),
+                "id": topic.get("id"),
+                "name": topic["name"],
+            }
+            for topic in topics
+        ]
+
+    if kind == "session_evaluation":
+        segments = _embedded_json(prompt, "possible practice topic:\n", "\n\nFor EACH")
+        return {
+            "topics": [
+                {
+                    "segment": seg["segment"],
+                    "name": "Practice topic",
+                    "valid": True,
+                    "scores": _scores(seg["transcript"], "topic", TOPIC_SCORE_KEYS),
+                    "went_well": ["Stated a clear position early"],
+                    "to_improve": ["Cut the hedging before the main point"],
+                    "missed_points": ["A concrete next step"],
+                    "rewrite": "Here's my recommendation. Here's why. Here's what I need from you.",
+                    **(canned or {}),
+                }
+                for seg in segments
+            ],
+            "voice_metrics": _voice_metrics(prompt),
+        }
+
+    if canned is not None:
+        return canned
+
+    if kind == "voice_metrics":
+        return _voice_metrics(prompt)
+
+    if kind == "feedback":
+        return {
+            "strengths": ["You led with a concrete example", "Your ask was specific"],
+            "micro_skill": "State your recommendation in the first sentence.",
+            "model_answer": "I recommend we ship Friday. Testing is done and customers are waiting.",
+        }
+
+    return {}
+
+
+def _voice_metrics(prompt: str) -> dict:
+    # Locally scored metrics only get notes (services/scoring.py)
+    scored = "Scores are computed separately" not in prompt
+    scores = _scores(prompt, "voice", VOICE_METRIC_KEYS)
+    return {
+        key: {
+            **({"score": score} if scored else {}),
+            "positives": ["Clear sentences"],
+            "to_improve": ["Fewer fillers"],
+        }
+        for key, score in scores.items()
+    }
+
+
+def _usage(prompt: str, content: str):
+    return SimpleNamespace(prompt_tokens=count_tokens(prompt), completion_tokens=count_tokens(content))
+
+
+class RateLimits:
+    """Per-minute request and token budgets that refill continuously; a
+    limit of 0 is unlimited and reports no headers."""
+
+    def __init__(self, requests: int, tokens: int):
+        self.limits = {"requests": requests, "tokens": tokens}
+        self.levels = {kind: float(limit) for kind, limit in self.limits.items()}
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        for kind, limit in self.limits.items():
+            if limit:
+                self.levels[kind] = min(limit, self.levels[kind] + (now - self.updated) * limit / 60)
+        self.updated = now
+
+    def take(self, tokens: int) -> bool:
+        """Spend one request and `tokens`; False (nothing spent) if either
+        budget is short."""
+        self._refill()
+        cost = {"requests": 1, "tokens": tokens}
+        if any(limit and self.levels[kind] < min(cost[kind], limit) for kind, limit in self.limits.items()):
+            return False
+        for kind, limit in self.limits.items():
+            if limit:
+                self.levels[kind] -= cost[kind]
+        return True
+
+    def headers(self) -> dict:
+        headers = {}
+        for kind, limit in self.limits.items():
+            if limit:
+                level = max(0.0, self.levels[kind])
+                headers[f"x-ratelimit-limit-{kind}"] = str(limit)
+                headers[f"x-ratelimit-remaining-{kind}"] = str(int(level))
+                headers[f"x-ratelimit-reset-{kind}"] = f"{(limit - level) * 60 / limit:.3f}s"
+        return headers
+
+
+class _RawResponses:
+    """chat.completions.with_raw_response: the reply plus its headers."""
+
+    def __init__(self, completions: "_Completions"):
+        self.completions = completions
+
+    async def create(self, **params):
+        result, headers = await self.completions.respond(**params)
+        return SimpleNamespace(headers=httpx.Headers(headers), parse=lambda: result)
+
+
+class _Completions:
+    def __init__(self):
+        self.latency = LatencyDistribution(FAKE_LLM_LATENCY)
+        self.rate_limits = RateLimits(FAKE_LLM_RPM, FAKE_LLM_TPM)
+        self.seen = Counter()
+        self.calls = Counter()
+        self.with_raw_response = _RawResponses(self)
+
+    def _rng(self, prompt: str) -> random.Random:
+        digest = hashlib.sha256(prompt.encode()).hexdigest()
+        self.seen[digest] += 1
+        return random.Random(f"{FAKE_LLM_SEED}:{digest}:{self.seen[digest]}")
+
+    async def create(self, **params):
+        result, _ = await self.respond(**params)
+        return result
+
+    async def respond(
+        self, *, model, messages, temperature, max_tokens, stream=False, stream_options=None, response_format=None,
+    ):
+        """The reply to a create() call and its response headers."""
+        prompt = messages[-1]["content"]
+        rng = self._rng(prompt)
+        first_token_seconds = self.latency.sample(rng) / 1000
+
+        outcome = rng.random()
+        for name, rate in (
+            ("rate_limited", FAKE_LLM_RATE_LIMIT_RATE),
+            ("server_error", FAKE_LLM_ERROR_RATE),
+            ("timeout", FAKE_LLM_TIMEOUT_RATE),
+            ("malformed", FAKE_LLM_MALFORMED_RATE),
+        ):
+            if outcome < rate:
+                break
+            outcome -= rate
+        else:
+            name = "ok"
+        if name != "rate_limited" and not self.rate_limits.take(count_tokens(prompt) + max_tokens):
+            name = "rate_limited"
+        self.calls[name] += 1
+
+        headers = self.rate_limits.headers()
+        if name == "rate_limited":
+            raise openai.RateLimitError(
+                "Rate limit reached (fake backend)",
+                response=httpx.Response(429, request=_REQUEST, headers={"retry-after": "1", **headers}),
+                body=None,
+            )
+        await asyncio.sleep(first_token_seconds)
+        if name == "server_error":
+            raise openai.InternalServerError(
+                "Internal server error (fake backend)",
+                response=httpx.Response(500, request=_REQUEST),
+                body=None,
+            )
+        if name == "timeout":
+            raise openai.APITimeoutError(request=_REQUEST)
+
+        content = json.dumps(fake_reply(prompt))
+        if name == "malformed":
+            content = content[:len(content) // 2]
+        content = content[:max_tokens * 4]  # a reply never exceeds max_tokens (roughly)
+        generation_seconds = count_tokens(content) * FAKE_LLM_MS_PER_TOKEN / 1000
+
+        if stream:
+            return self._stream(prompt, content, generation_seconds, stream_options), headers
+        await asyncio.sleep(generation_seconds)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=_usage(prompt, content),
+        ), headers
+
+    async def _stream(self, prompt: str, content: str, generation_seconds: float, stream_options: dict | None):
+        chunks = [content[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(content), STREAM_CHUNK_CHARS)]
+        for chunk in chunks:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=chunk))], usage=None)
+            await asyncio.sleep(generation_seconds / len(chunks))
+        if stream_options and stream_options.get("include_usage"):
+            yield SimpleNamespace(choices=[], usage=_usage(prompt, content))
+
+
+class FakeAsyncOpenAI:
+    def __init__(self):
+        self.chat = SimpleNamespace(completions=_Completions())
+
+    def stats(self) -> dict:
+        """Calls per outcome (ok, rate_limited, server_error, timeout, malformed)."""
+        return dict(self.chat.completions.calls)
+
+    async def close(self):
+        pass
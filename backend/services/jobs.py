@@ -0,0 +1,345 @@
+"""Durable job queue for work that must outlive the request that triggered it.
+
+Jobs are rows in a table (Postgres `jobs` via Supabase, or a local SQLite file),
+so nothing is lost when the process restarts or a serverless invocation is
+frozen. Delivery is at-least-once: a claimed job holds a lease, and a worker
+that dies mid-job simply lets the lease expire so another worker picks it up.
+Handlers must therefore be idempotent. Each job carries an idempotency key
+(e.g. the VAPI call id) so duplicate deliveries enqueue nothing.
+"""
+import asyncio
+import json
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable
+
+from config import (
+    JOB_QUEUE_BACKEND,
+    JOB_QUEUE_SQLITE_PATH,
+    JOB_WORKER_CONCURRENCY,
+    JOB_POLL_INTERVAL_SECONDS,
+    JOB_LEASE_SECONDS,
+    JOB_MAX_ATTEMPTS,
+    JOB_RETRY_BASE_SECONDS,
+    JOB_RETRY_MAX_SECONDS,
+    JOB_SHUTDOWN_GRACE_SECONDS,
+)
+from services import metrics
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    payload: dict
+    attempts: int
+    max_attempts: int
+    idempotency_key: str
+
+
+class PostgresJobStore:
+    """Jobs in the Supabase `jobs` table; claiming goes through the
+    `claim_jobs` function (FOR UPDATE SKIP LOCKED) in migration_jobs.sql."""
+
+    def __init__(self):
+        from services.supabase_client import supabase_admin
+        self.db = supabase_admin
+
+    def enqueue(self, kind: str, payload: dict, idempotency_key: str, max_attempts: int) -> bool:
+        result = self.db.table("jobs").upsert({
+            "kind": kind,
+            "payload": payload,
+            "idempotency_key": idempotency_key,
+            "max_attempts": max_attempts,
+        }, on_conflict="idempotency_key", ignore_duplicates=True).execute()
+        return bool(result.data)
+
+    def claim(self, worker_id: str, limit: int, lease_seconds: int) -> list[Job]:
+        result = self.db.rpc("claim_jobs", {
+            "p_worker": worker_id,
+            "p_limit": limit,
+            "p_lease_seconds": lease_seconds,
+        }).execute()
+        return [
+            Job(
+                id=row["id"],
+                kind=row["kind"],
+                payload=row["payload"],
+                attempts=row["attempts"],
+                max_attempts=row["max_attempts"],
+                idempotency_key=row["idempotency_key"],
+            )
+            for row in result.data or []
+        ]
+
+    def complete(self, job_id: str):
+        self.db.table("jobs").update({
+            "status": "succeeded",
+            "locked_by": None,
+            "locked_until": None,
+            "updated_at": "now()",
+        }).eq("id", job_id).execute()
+
+    def fail(self, job_id: str, error: str, retry_in: float | None):
+        update = {
+            "last_error": error[:2000],
+            "locked_by": None,
+            "locked_until": None,
+            "updated_at": "now()",
+        }
+        if retry_in is None:
+            update["status"] = "dead"
+        else:
+            run_at = datetime.now(timezone.utc) + timedelta(seconds=retry_in)
+            update["status"] = "queued"
+            update["run_at"] = run_at.isoformat()
+        self.db.table("jobs").update(update).eq("id", job_id).execute()
+
+
+class SQLiteJobStore:
+    """Jobs in a local SQLite file — no broker or migration needed for local dev."""
+
+    def __init__(self, path: str):
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+              id TEXT PRIMARY KEY,
+              kind TEXT NOT NULL,
+              idempotency_key TEXT NOT NULL UNIQUE,
+              payload TEXT NOT NULL,
+              status TEXT NOT NULL DEFAULT 'queued',
+              attempts INTEGER NOT NULL DEFAULT 0,
+              max_attempts INTEGER NOT NULL,
+              run_at REAL NOT NULL,
+              locked_by TEXT,
+              locked_until REAL,
+              last_error TEXT,
+              created_at REAL NOT NULL,
+              updated_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_run_at ON jobs(status, run_at)")
+
+    def enqueue(self, kind: str, payload: dict, idempotency_key: str, max_attempts: int) -> bool:
+        now = time.time()
+        with self.lock:
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO jobs (id, kind, idempotency_key, payload, max_attempts, run_at, created_at, updated_at) "
+                "VALUES (lower(hex(randomblob(16))), ?, ?, ?, ?, ?, ?, ?)",
+                (kind, idempotency_key, json.dumps(payload), max_attempts, now, now, now),
+            )
+            return cursor.rowcount == 1
+
+    def claim(self, worker_id: str, limit: int, lease_seconds: int) -> list[Job]:
+        now = time.time()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self.conn.execute(
+                    "SELECT * FROM jobs WHERE (status = 'queued' AND run_at <= ?) "
+                    "OR (status = 'running' AND locked_until < ?) ORDER BY run_at LIMIT ?",
+                    (now, now, limit),
+                ).fetchall()
+                for row in rows:
+                    self.conn.execute(
+                        "UPDATE jobs SET status = 'running', attempts = attempts + 1, locked_by = ?, "
+                        "locked_until = ?, updated_at = ? WHERE id = ?",
+                        (worker_id, now + lease_seconds, now, row["id"]),
+                    )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return [
+            Job(
+                id=row["id"],
+                kind=row["kind"],
+                payload=json.loads(row["payload"]),
+                attempts=row["attempts"] + 1,
+                max_attempts=row["max_attempts"],
+                idempotency_key=row["idempotency_key"],
+            )
+            for row in rows
+        ]
+
+    def complete(self, job_id: str):
+        with self.lock:
+            self.conn.execute(
+                "UPDATE jobs SET status = 'succeeded', locked_by = NULL, locked_until = NULL, "
+                "updated_at = ? WHERE id = ?",
+                (time.time(), job_id),
+            )
+
+    def fail(self, job_id: str, error: str, retry_in: float | None):
+        now = time.time()
+        with self.lock:
+            if retry_in is None:
+                self.conn.execute(
+                    "UPDATE jobs SET status = 'dead', last_error = ?, locked_by = NULL, "
+                    "locked_until = NULL, updated_at = ? WHERE id = ?",
+                    (error[:2000], now, job_id),
+                )
+            else:
+                self.conn.execute(
+                    "UPDATE jobs SET status = 'queued', last_error = ?, run_at = ?, locked_by = NULL, "
+                    "locked_until = NULL, updated_at = ? WHERE id = ?",
+                    (error[:2000], now + retry_in, now, job_id),
+                )
+
+
+def _create_store():
+    if JOB_QUEUE_BACKEND == "sqlite":
+        return SQLiteJobStore(JOB_QUEUE_SQLITE_PATH)
+    if JOB_QUEUE_BACKEND == "postgres":
+        return PostgresJobStore()
+    raise ValueError(f"Unknown JOB_QUEUE_BACKEND: {JOB_QUEUE_BACKEND!r}")
+
+
+store = _create_store()
+
+_handlers: dict[str, Callable[..., Awaitable[None]]] = {}
+_wakeup = asyncio.Event()
+_worker_task: asyncio.Task | None = None
+# run_job tasks started by the worker, so stop_worker can wait for them
+_running: set[asyncio.Task] = set()
+
+
+def handler(kind: str):
+    """Register the coroutine that processes jobs of the given kind.
+
+    It is called as fn(payload, final_attempt=...); `final_attempt` is True
+    when a failure will not be retried, so a handler can hold back
+    user-visible failure state until then.
+    """
+    def register(fn):
+        _handlers[kind] = fn
+        return fn
+    return register
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with full jitter, capped at JOB_RETRY_MAX_SECONDS."""
+    ceiling = min(JOB_RETRY_MAX_SECONDS, JOB_RETRY_BASE_SECONDS * (2 ** (attempts - 1)))
+    return random.uniform(0, ceiling)
+
+
+async def enqueue(
+    kind: str,
+    payload: dict,
+    idempotency_key: str,
+    max_attempts: int = JOB_MAX_ATTEMPTS,
+) -> bool:
+    """Persist a job. Returns False if one with this idempotency key already exists."""
+    with metrics.span("jobs.enqueue", kind=kind):
+        queued = await asyncio.to_thread(store.enqueue, kind, payload, idempotency_key, max_attempts)
+    if queued:
+        _wakeup.set()
+    return queued
+
+
+async def run_job(job: Job):
+    fn = _handlers.get(job.kind)
+    if fn is None:
+        await asyncio.to_thread(store.fail, job.id, f"No handler for job kind {job.kind!r}", None)
+        return
+    if job.attempts > job.max_attempts:
+        # Lease expired on the final attempt (worker crashed mid-job)
+        await asyncio.to_thread(store.fail, job.id, "Lease expired after final attempt", None)
+        return
+
+    try:
+        with metrics.span(f"job.{job.kind}", attempt=job.attempts):
+            await fn(job.payload, final_attempt=job.attempts >= job.max_attempts)
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}\n{traceback.format_exc()}"
+        retry_in = retry_delay(job.attempts) if job.attempts < job.max_attempts else None
+        print(f"[JOBS] {job.kind} {job.idempotency_key} failed (attempt {job.attempts}/{job.max_attempts}): {e}")
+        await asyncio.to_thread(store.fail, job.id, error, retry_in)
+        if retry_in is not None:
+            asyncio.get_running_loop().call_later(retry_in, _wakeup.set)
+        return
+
+    await asyncio.to_thread(store.complete, job.id)
+
+
+async def drain(max_jobs: int | None = None) -> int:
+    """Claim and run ready jobs until none are left. Returns how many ran."""
+    ran = 0
+    while max_jobs is None or ran < max_jobs:
+        limit = JOB_WORKER_CONCURRENCY if max_jobs is None else min(JOB_WORKER_CONCURRENCY, max_jobs - ran)
+        jobs = await asyncio.to_thread(store.claim, WORKER_ID, limit, JOB_LEASE_SECONDS)
+        if not jobs:
+            break
+        await asyncio.gather(*(run_job(job) for job in jobs))
+        ran += len(jobs)
+    return ran
+
+
+async def _worker_loop():
+    print(f"[JOBS] Worker {WORKER_ID} started ({JOB_QUEUE_BACKEND} backend)")
+    while True:
+        _wakeup.clear()
+        free = JOB_WORKER_CONCURRENCY - len(_running)
+        if free > 0:
+            try:
+                jobs = await asyncio.to_thread(store.claim, WORKER_ID, free, JOB_LEASE_SECONDS)
+            except Exception as e:
+                print(f"[JOBS] Worker poll failed: {e}")
+                jobs = []
+            for job in jobs:
+                task = asyncio.create_task(run_job(job))
+                _running.add(task)
+                task.add_done_callback(_running.discard)
+            if jobs and len(jobs) == free:
+                continue
+
+        # Sleep until a job is enqueued, a running job frees a slot, or the poll interval passes
+        wakeup = asyncio.create_task(_wakeup.wait())
+        await asyncio.wait(_running | {wakeup}, timeout=JOB_POLL_INTERVAL_SECONDS, return_when=asyncio.FIRST_COMPLETED)
+        wakeup.cancel()
+
+
+def worker_running() -> bool:
+    return _worker_task is not None and not _worker_task.done()
+
+
+def start_worker():
+    global _worker_task
+    if not worker_running():
+        _worker_task = asyncio.create_task(_worker_loop())
+
+
+async def stop_worker():
+    """Stop claiming jobs, then give the ones in flight up to
+    JOB_SHUTDOWN_GRACE_SECONDS to finish before cancelling them. A cancelled
+    job keeps its lease and is picked up again once it expires."""
+    global _worker_task
+    if _worker_task is None:
+        return
+    _worker_task.cancel()
+    try:
+        await _worker_task
+    except asyncio.CancelledError:
+        pass
+    _worker_task = None
+
+    if _running:
+        print(f"[JOBS] Waiting up to {JOB_SHUTDOWN_GRACE_SECONDS:.0f}s for {len(_running)} running job(s)")
+        _, pending = await asyncio.wait(set(_running), timeout=JOB_SHUTDOWN_GRACE_SECONDS)
+        for task in pending:
+            task.cancel()
+        if pending:
+            print(f"[JOBS] Cancelled {len(pending)} job(s) still running at shutdown")
+            await asyncio.gather(*pending, return_exceptions=True)
@@ -0,0 +1,58 @@
+"""Incremental parsing of a streamed JSON object.
+
+LLM replies arrive token by token. IncrementalObjectParser tracks string,
+escape and nesting state across chunks and hands back each top-level member of
+the object as soon as its value is complete, so callers can act on
+`"strengths": [...]` before the rest of the object has been generated.
+Text before the opening brace (e.g. a ```json fence) is ignored.
+"""
+import json
+
+
+class IncrementalObjectParser:
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.member_start = None
+        self.done = False
+
+    def feed(self, chunk: str) -> list[tuple[str, object]]:
+        """Consume a chunk; return the (key, value) members it completed."""
+        self.buffer += chunk
+        members = []
+        while self.pos < len(self.buffer) and not self.done:
+            ch = self.buffer[self.pos]
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == "\\":
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif self.depth == 0:
+                if ch == "{":
+                    self.depth = 1
+                    self.member_start = self.pos + 1
+            elif ch == '"':
+                self.in_string = True
+            elif ch in "{[":
+                self.depth += 1
+            elif ch in "}]":
+                self.depth -= 1
+                if self.depth == 0:
+                    members.extend(self._close_member(self.pos))
+                    self.done = True
+            elif ch == "," and self.depth == 1:
+                members.extend(self._close_member(self.pos))
+                self.member_start = self.pos + 1
+            self.pos += 1
+        return members
+
+    def _close_member(self, end: int) -> list[tuple[str, object]]:
+        text = self.buffer[self.member_start:end].strip()
+        if not text:
+            return []
+        return list(json.loads("{" + text + "}").items())
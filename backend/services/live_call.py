@@ -0,0 +1,140 @@
+"""Incremental transcript analysis while a VAPI call is in progress.
+
+VAPI's `conversation-update` and final `transcript` webhooks are folded into a
+per-call state as they arrive: phrase counts for each user turn and the topic
+segmenter from the deep evaluation run turn by turn. When the end-of-call
+report comes in, `finalize` checks the state against the final transcript and
+only processes turns it hasn't seen, so post-call work is mostly lookups.
+
+State lives in this process only. A call whose webhooks landed elsewhere (or
+whose state expired) is simply analyzed from scratch at the end.
+"""
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from config import LIVE_CALL_TTL_SECONDS, LIVE_CALL_MAX_CALLS
+from services.analysis import count_phrases
+from services.topic_segments import TopicSegmenter
+
+
+def normalize_messages(messages: list[dict]) -> list[dict]:
+    """VAPI messages ({role, content} or {role, message}) as user/assistant
+    turns, without system or tool messages."""
+    turns = []
+    for msg in messages:
+        role = msg.get("role", "")
+        content = msg.get("content", "") or msg.get("message", "")
+        if role in ("assistant", "user", "bot"):
+            turns.append({
+                "role": "assistant" if role in ("assistant", "bot") else "user",
+                "content": content,
+            })
+    return turns
+
+
+def _common_prefix(a: list[dict], b: list[dict]) -> int:
+    length = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        length += 1
+    return length
+
+
+class LiveCall:
+    def __init__(self):
+        self.turns: list[dict] = []
+        self.phrase_counts = Counter()
+        self.segmenter = TopicSegmenter()
+        # Per turn: its phrase counts and the segmenter state before it, so
+        # a revised last turn can be rolled back without replaying the call
+        self.history: list[tuple[Counter | None, tuple]] = []
+        self.has_conversation_updates = False
+        self.updated_at = time.monotonic()
+
+    def append(self, turn: dict):
+        counts = count_phrases(turn["content"]) if turn["role"] == "user" else None
+        self.history.append((counts, self.segmenter.state()))
+        if counts:
+            self.phrase_counts.update(counts)
+        self.segmenter.feed(turn)
+        self.turns.append(turn)
+
+    def rewind(self, length: int):
+        """Drop turns from `length` on, undoing their effect on the state."""
+        if length >= len(self.turns):
+            return
+        for counts, _ in self.history[length:]:
+            if counts:
+                self.phrase_counts.subtract(counts)
+        self.segmenter.restore(self.history[length][1])
+        del self.history[length:]
+        del self.turns[length:]
+        self.phrase_counts = +self.phrase_counts
+
+    def sync(self, turns: list[dict]):
+        """Bring the state in line with the conversation so far. Usually only
+        new turns are processed; a changed turn rewinds to it first."""
+        common = _common_prefix(self.turns, turns)
+        self.rewind(common)
+        for turn in turns[common:]:
+            self.append(turn)
+        self.updated_at = time.monotonic()
+
+
+_calls: OrderedDict[str, LiveCall] = OrderedDict()
+_lock = threading.Lock()
+
+
+def _get(call_id: str, create: bool) -> LiveCall | None:
+    now = time.monotonic()
+    with _lock:
+        while _calls:
+            oldest_id, oldest = next(iter(_calls.items()))
+            if now - oldest.updated_at < LIVE_CALL_TTL_SECONDS and len(_calls) <= LIVE_CALL_MAX_CALLS:
+                break
+            del _calls[oldest_id]
+        call = _calls.get(call_id)
+        if call is None and create:
+            call = _calls[call_id] = LiveCall()
+        if call is not None:
+            _calls.move_to_end(call_id)
+        return call
+
+
+def ingest(call_id: str, message: dict):
+    """Fold a `conversation-update` or `transcript` webhook message into the call's state."""
+    message_type = message.get("type")
+    call = _get(call_id, create=True)
+    with _lock:
+        if message_type == "conversation-update":
+            messages = message.get("messagesOpenAIFormatted") or message.get("messages") or []
+            call.has_conversation_updates = True
+            call.sync(normalize_messages(messages))
+        elif message_type == "transcript":
+            # Only used when the assistant doesn't send conversation updates
+            if call.has_conversation_updates or message.get("transcriptType") != "final":
+                return
+            role = "assistant" if message.get("role") in ("assistant", "bot") else "user"
+            call.sync(call.turns + [{"role": role, "content": message.get("transcript", "")}])
+
+
+def finalize(call_id: str, full_transcript: list[dict]) -> dict | None:
+    """Reconcile and remove the call's state against the final transcript.
+
+    Returns {"phrase_counts", "segments"} for `full_transcript`, or None when
+    nothing was collected for this call in this process.
+    """
+    call = _get(call_id, create=False)
+    if call is None:
+        return None
+    with _lock:
+        reused = _common_prefix(call.turns, full_transcript)
+        call.sync(full_transcript)
+        _calls.pop(call_id, None)
+    print(f"[LIVE] Finalized call {call_id}: {reused}/{len(full_transcript)} turns analyzed during the call")
+    return {
+        "phrase_counts": call.phrase_counts,
+        "segments": call.segmenter.segments(),
+    }
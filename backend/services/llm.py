@@ -0,0 +1,306 @@
+"""Shared async gateway for every OpenAI call made by the backend.
+
+One AsyncOpenAI client backed by a pooled httpx client is reused for the life
+of the process. Completions go through the content-addressed cache in
+services/llm_cache.py first; every request that reaches the API is queued,
+rate-limited and retried by the governor in services/llm_governor.py, so a
+burst of end-of-call webhooks can't outrun the concurrency cap or the
+account's rate limits.
+LLM_BACKEND=fake swaps the client for the offline one in services/fake_llm.py.
+complete_json() parses a free-form JSON reply; complete_structured() has the
+API constrain the reply to a Pydantic model's JSON schema instead.
+
+Every call takes a `label` naming the pipeline step, and prompt/completion
+token counts reported by the API are accumulated per label (see usage()) and
+exported as metrics, with each API call timed as an "llm.<label>" span.
+"""
+import itertools
+import json
+from collections import defaultdict
+
+import httpx
+from openai import AsyncOpenAI
+from pydantic import BaseModel, ValidationError
+
+from config import (
+    OPENAI_API_KEY,
+    LLM_TIMEOUT_SECONDS,
+    LLM_CONNECT_TIMEOUT_SECONDS,
+    LLM_MAX_CONNECTIONS,
+    LLM_MAX_KEEPALIVE_CONNECTIONS,
+    LLM_BACKEND,
+)
+from services import metrics
+from services.llm_cache import cache, cache_key
+from services.llm_governor import RETRYABLE, governor
+from services.tokens import count_tokens
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+
+class EmptyCompletionError(Exception):
+    """The API answered without any text (a refusal or a content filter)."""
+
+_timeout = httpx.Timeout(LLM_TIMEOUT_SECONDS, connect=LLM_CONNECT_TIMEOUT_SECONDS)
+
+_http_client = httpx.AsyncClient(
+    limits=httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=30,
+    ),
+    timeout=_timeout,
+)
+
+
+def _create_client():
+    if LLM_BACKEND == "openai":
+        return AsyncOpenAI(
+            api_key=OPENAI_API_KEY,
+            http_client=_http_client,
+            timeout=_timeout,
+            max_retries=0,  # retried by the governor instead
+        )
+    if LLM_BACKEND == "fake":
+        from services.fake_llm import FakeAsyncOpenAI
+        return FakeAsyncOpenAI()
+    raise ValueError(f"Unknown LLM_BACKEND: {LLM_BACKEND!r}")
+
+
+client = _create_client()
+
+_usage: dict[str, dict[str, int]] = defaultdict(
+    lambda: {"calls": 0, "cached": 0, "prompt_tokens": 0, "completion_tokens": 0}
+)
+
+
+def _record(label: str, usage=None, cached: bool = False):
+    entry = _usage[label]
+    metrics.LLM_CALLS.inc(label=label, cached=str(cached).lower())
+    if cached:
+        entry["cached"] += 1
+        return
+    entry["calls"] += 1
+    if usage is not None:
+        entry["prompt_tokens"] += usage.prompt_tokens
+        entry["completion_tokens"] += usage.completion_tokens
+        metrics.LLM_TOKENS.inc(usage.prompt_tokens, label=label, type="prompt")
+        metrics.LLM_TOKENS.inc(usage.completion_tokens, label=label, type="completion")
+
+
+def load(window_seconds: float = 60.0) -> dict:
+    """Gateway pressure: requests in flight, requests waiting for a slot,
+    and 429 replies in the last window_seconds (services/llm_governor.py)."""
+    return governor.load(window_seconds)
+
+
+def usage() -> dict[str, dict]:
+    """Token usage per label since startup, with the average prompt size."""
+    return {
+        label: {
+            **entry,
+            "avg_prompt_tokens": round(entry["prompt_tokens"] / entry["calls"]) if entry["calls"] else 0,
+        }
+        for label, entry in _usage.items()
+    }
+
+
+async def complete(
+    prompt: str,
+    *,
+    temperature: float,
+    max_tokens: int,
+    model: str = DEFAULT_MODEL,
+    use_cache: bool = True,
+    label: str = "default",
+    response_format: dict | None = None,
+) -> str:
+    """Run a single-message chat completion and return the stripped text.
+
+    `response_format` is passed through (e.g. a JSON schema for structured
+    outputs) and is part of the cache key.
+    """
+    key = _key(model, prompt, temperature, max_tokens, response_format)
+    if use_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            _record(label, cached=True)
+            return cached
+
+    response = await _create(
+        label,
+        count_tokens(prompt) + max_tokens,
+        model=model,
+        messages=[{"role": "user", "content": prompt}],
+        temperature=temperature,
+        max_tokens=max_tokens,
+        **({"response_format": response_format} if response_format else {}),
+    )
+    _record(label, response.usage)
+    choice = response.choices[0]
+    if not choice.message.content:
+        # Refusals and content-filter stops come back without text
+        reason = getattr(choice.message, "refusal", None) or getattr(choice, "finish_reason", None)
+        raise EmptyCompletionError(f"{label}: no content in reply ({reason})")
+    content = choice.message.content.strip()
+    if use_cache:
+        cache.set(key, content)
+    return content
+
+
+async def _create(label: str, tokens: int, **params):
+    """One completion request through the governor, retried with jittered
+    backoff on 429s, 5xx, timeouts and connection errors."""
+    for attempt in itertools.count():
+        try:
+            async with governor.slot(tokens):
+                with metrics.span(f"llm.{label}", model=params["model"]):
+                    raw = await client.chat.completions.with_raw_response.create(**params)
+            break
+        except RETRYABLE as e:
+            if attempt >= governor.max_retries:
+                raise
+            await governor.back_off(attempt, e, label)
+    governor.observe(raw.headers)
+    return raw.parse()
+
+
+def _key(model: str, prompt: str, temperature: float, max_tokens: int, response_format: dict | None) -> str:
+    if response_format:
+        prompt += "\n" + json.dumps(response_format, sort_keys=True)
+    return cache_key(model, prompt, temperature, max_tokens)
+
+
+async def stream(
+    prompt: str,
+    *,
+    temperature: float,
+    max_tokens: int,
+    model: str = DEFAULT_MODEL,
+    use_cache: bool = True,
+    label: str = "default",
+):
+    """Stream a completion as text deltas. A cached reply is yielded whole."""
+    key = cache_key(model, prompt, temperature, max_tokens)
+    if use_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            _record(label, cached=True)
+            yield cached
+            return
+
+    parts = []
+    tokens = count_tokens(prompt) + max_tokens
+    for attempt in itertools.count():
+        try:
+            # The slot is held until the stream ends
+            async with governor.slot(tokens):
+                with metrics.span(f"llm.{label}", model=model, stream=True):
+                    raw = await client.chat.completions.with_raw_response.create(
+                        model=model,
+                        messages=[{"role": "user", "content": prompt}],
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        stream=True,
+                        stream_options={"include_usage": True},
+                    )
+                    governor.observe(raw.headers)
+                    async for chunk in raw.parse():
+                        if chunk.usage is not None:
+                            # Final chunk of the stream, no choices
+                            _record(label, chunk.usage)
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            delta = chunk.choices[0].delta.content
+                            parts.append(delta)
+                            yield delta
+            break
+        except RETRYABLE as e:
+            # Text already yielded can't be taken back
+            if parts or attempt >= governor.max_retries:
+                raise
+            await governor.back_off(attempt, e, label)
+    if use_cache:
+        cache.set(key, "".join(parts).strip())
+
+
+def parse_json(content: str):
+    """Parse a JSON reply, tolerating markdown code fences around it."""
+    content = content.strip()
+    if content.startswith("```"):
+        content = content.split("\n", 1)[1]
+        content = content.rsplit("```", 1)[0]
+    return json.loads(content)
+
+
+def forget(prompt: str, *, temperature: float, max_tokens: int, model: str = DEFAULT_MODEL):
+    """Drop a cached reply that turned out to be unusable, so the next call
+    (a job retry, say) asks the model again instead of replaying it."""
+    cache.delete(cache_key(model, prompt, temperature, max_tokens))
+
+
+async def complete_json(
+    prompt: str,
+    *,
+    temperature: float,
+    max_tokens: int,
+    model: str = DEFAULT_MODEL,
+    use_cache: bool = True,
+    label: str = "default",
+    expect: type | None = None,
+    required: tuple[str, ...] = (),
+):
+    """Parsed JSON reply. With `expect`, a reply of another type raises
+    ValueError, as does a dict missing one of the `required` keys; like
+    unparseable replies, those are dropped from the cache."""
+    content = await complete(
+        prompt, temperature=temperature, max_tokens=max_tokens, model=model, use_cache=use_cache, label=label,
+    )
+    try:
+        parsed = parse_json(content)
+        if expect is not None and not isinstance(parsed, expect):
+            raise ValueError(f"{label}: expected a JSON {expect.__name__}, got {type(parsed).__name__}")
+        missing = [key for key in required if key not in parsed]
+        if missing:
+            raise ValueError(f"{label}: reply is missing {', '.join(missing)}")
+        return parsed
+    except Exception:
+        # Don't keep serving a reply we can't use
+        forget(prompt, temperature=temperature, max_tokens=max_tokens, model=model)
+        raise
+
+
+async def complete_structured(
+    prompt: str,
+    model_cls: type[BaseModel],
+    *,
+    temperature: float,
+    max_tokens: int,
+    model: str = DEFAULT_MODEL,
+    use_cache: bool = True,
+    label: str = "default",
+) -> BaseModel:
+    """Completion constrained to model_cls's JSON schema (structured outputs,
+    strict mode), validated into a model_cls instance.
+
+    The API guarantees the shape, so there are no code fences to strip; a
+    reply that still fails validation (cut off at max_tokens) raises
+    pydantic.ValidationError and isn't cached.
+    """
+    response_format = {
+        "type": "json_schema",
+        "json_schema": {"name": model_cls.__name__, "strict": True, "schema": model_cls.model_json_schema()},
+    }
+    content = await complete(
+        prompt, temperature=temperature, max_tokens=max_tokens, model=model, use_cache=use_cache, label=label,
+        response_format=response_format,
+    )
+    try:
+        return model_cls.model_validate_json(content)
+    except ValidationError:
+        cache.delete(_key(model, prompt, temperature, max_tokens, response_format))
+        raise
+
+
+async def aclose():
+    """Release pooled connections on shutdown."""
+    await client.close()
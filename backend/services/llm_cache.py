@@ -0,0 +1,166 @@
+"""Content-addressed cache for LLM completions.
+
+Responses are keyed by a hash of (model, prompt, temperature, max_tokens), so a
+re-run evaluation, a retried job or a duplicate VAPI delivery returns the
+stored completion instead of spending tokens on the same prompt again.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from config import (
+    LLM_CACHE_BACKEND,
+    LLM_CACHE_TTL_SECONDS,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_PATH,
+)
+
+
+def cache_key(model: str, prompt: str, temperature: float, max_tokens: int) -> str:
+    payload = json.dumps([model, prompt, temperature, max_tokens], ensure_ascii=False)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def as_dict(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class NullCache:
+    """Caching disabled."""
+
+    def __init__(self):
+        self.stats = CacheStats()
+
+    def get(self, key: str) -> str | None:
+        self.stats.misses += 1
+        return None
+
+    def set(self, key: str, value: str):
+        pass
+
+    def delete(self, key: str):
+        pass
+
+
+class MemoryCache:
+    """In-process LRU with per-entry TTL."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = CacheStats()
+
+    def get(self, key: str) -> str | None:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self.entries[key]
+                    self.stats.evictions += 1
+                self.stats.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.stats.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: str):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def delete(self, key: str):
+        with self.lock:
+            self.entries.pop(key, None)
+
+
+class SQLiteCache:
+    """On-disk cache shared by processes on the same host; evicts expired
+    entries first, then least recently used ones past max_entries."""
+
+    def __init__(self, path: str, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.lock = threading.Lock()
+        self.stats = CacheStats()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+              key TEXT PRIMARY KEY,
+              value TEXT NOT NULL,
+              expires_at REAL NOT NULL,
+              accessed_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache(accessed_at)")
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] < now:
+                if row is not None:
+                    self.conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self.stats.evictions += 1
+                self.stats.misses += 1
+                return None
+            self.conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self.stats.hits += 1
+            return row[0]
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now + self.ttl_seconds, now),
+            )
+            expired = self.conn.execute("DELETE FROM llm_cache WHERE expires_at < ?", (now,)).rowcount
+            (count,) = self.conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+            overflow = max(0, count - self.max_entries)
+            if overflow:
+                self.conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN "
+                    "(SELECT key FROM llm_cache ORDER BY accessed_at LIMIT ?)",
+                    (overflow,),
+                )
+            self.stats.evictions += expired + overflow
+
+    def delete(self, key: str):
+        with self.lock:
+            self.conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+
+
+def _create_cache():
+    if LLM_CACHE_BACKEND == "memory":
+        return MemoryCache(LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_SECONDS)
+    if LLM_CACHE_BACKEND == "sqlite":
+        return SQLiteCache(LLM_CACHE_PATH, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_SECONDS)
+    if LLM_CACHE_BACKEND == "none":
+        return NullCache()
+    raise ValueError(f"Unknown LLM_CACHE_BACKEND: {LLM_CACHE_BACKEND!r}")
+
+
+cache = _create_cache()
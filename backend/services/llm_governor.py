@@ -0,0 +1,252 @@
+"""Process-wide governor for outbound OpenAI requests.
+
+Every request the gateway (services/llm.py) sends waits here first, for:
+
+- a concurrency slot (LLM_MAX_CONCURRENCY)
+- one request and its tokens from two token buckets, one each for OpenAI's
+  per-minute request and token limits. The buckets are synced from the
+  x-ratelimit-* headers on every reply, 429s included, and refill at the
+  limit's per-minute rate between replies. Until the first reply they don't
+  limit anything.
+- the end of a pause after a 429
+
+A request's token cost is its prompt plus max_tokens, the way OpenAI counts
+it against the limit.
+
+Waiters are served by priority class, FIFO within a class: quick feedback
+(the caller is looking at the screen), then deep evaluation, then backfill
+(scripts/reevaluate.py). The class comes from a context variable, so
+everything inside `with priority("feedback"):` inherits it, tasks spawned
+there included. A waiter the budget can't serve yet holds back everything
+behind it. That way a large evaluation isn't starved by a stream of small
+ones, and no backfill request jumps ahead of feedback.
+
+Rate limits (429), 5xx replies, timeouts and connection errors are retried
+up to LLM_MAX_RETRIES times, with exponential backoff and full jitter.
+A 429's delay comes from its retry-after or x-ratelimit-reset headers, and
+pauses every waiter, not just the one that hit it. The OpenAI client's own
+retries are off, so this is the only retry layer.
+
+Queue depth, queue wait, in-flight requests, retries and the remaining
+budget are exported as metrics (services/metrics.py).
+"""
+import asyncio
+import heapq
+import itertools
+import random
+import re
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+
+import openai
+
+from config import LLM_MAX_CONCURRENCY, LLM_MAX_RETRIES, LLM_RETRY_BASE_SECONDS, LLM_RETRY_MAX_SECONDS
+from services import metrics
+
+# Highest first
+PRIORITIES = ("feedback", "evaluation", "backfill")
+
+RETRYABLE = (openai.RateLimitError, openai.InternalServerError, openai.APITimeoutError, openai.APIConnectionError)
+
+_priority: ContextVar[str] = ContextVar("llm_priority", default="evaluation")
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNIT_SECONDS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+@contextmanager
+def priority(name: str):
+    """Send the LLM requests made inside the block at priority `name`."""
+    if name not in PRIORITIES:
+        raise ValueError(f"Unknown LLM priority: {name!r}")
+    token = _priority.set(name)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+def parse_duration(value: str | None) -> float | None:
+    """Seconds from an x-ratelimit-reset value ("1s", "6m0s", "20ms") or a
+    plain number of seconds (retry-after)."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    return sum(float(n) * _UNIT_SECONDS[unit] for n, unit in parts) if parts else None
+
+
+class TokenBucket:
+    """One of OpenAI's per-minute budgets, as last reported by the API."""
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self.limit: float | None = None  # unknown until the first reply
+        self.level = 0.0
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        if self.limit is not None:
+            self.level = min(self.limit, self.level + (now - self.updated) * self.limit / 60)
+        self.updated = now
+
+    def sync(self, limit: str | None, remaining: str | None, now: float):
+        try:
+            limit, remaining = float(limit), float(remaining)
+        except (TypeError, ValueError):
+            return
+        self.limit, self.level, self.updated = limit, remaining, now
+        metrics.LLM_RATE_BUDGET.set(remaining, kind=self.kind)
+
+    def wait_for(self, amount: float, now: float) -> float:
+        """Seconds until `amount` is available; 0 when it is (or unknown)."""
+        if self.limit is None:
+            return 0.0
+        self._refill(now)
+        # A request larger than the whole budget goes when the bucket is full
+        missing = min(amount, self.limit) - self.level
+        return missing * 60 / self.limit if missing > 0 else 0.0
+
+    def take(self, amount: float):
+        if self.limit is not None:
+            self.level -= amount
+
+
+class Governor:
+    def __init__(self, max_concurrency: int, max_retries: int):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.requests = TokenBucket("requests")
+        self.tokens = TokenBucket("tokens")
+        self.in_flight = 0
+        self.paused_until = 0.0
+        # Monotonic times of recent 429 replies, for load()
+        self.rate_limited: deque = deque(maxlen=1000)
+        # Heap of [priority rank, arrival, tokens, future]
+        self._queue: list = []
+        self._arrivals = itertools.count()
+        self._depth = dict.fromkeys(PRIORITIES, 0)
+        self._timer: asyncio.TimerHandle | None = None
+
+    def waiting(self, lowest: str = PRIORITIES[-1]) -> int:
+        """Requests queued at priority `lowest` or above."""
+        return sum(self._depth[name] for name in PRIORITIES[:PRIORITIES.index(lowest) + 1])
+
+    @asynccontextmanager
+    async def slot(self, tokens: int):
+        """Hold a request slot, after queueing for it by priority and budget.
+        A 429 raised inside the block pauses every waiter."""
+        await self._acquire(tokens)
+        try:
+            yield
+        except openai.APIStatusError as e:
+            self.observe(e.response.headers)
+            if isinstance(e, openai.RateLimitError):
+                self._pause(e)
+            raise
+        finally:
+            self._release()
+
+    def observe(self, headers):
+        """Sync the budgets from a reply's x-ratelimit-* headers."""
+        now = time.monotonic()
+        self.requests.sync(headers.get("x-ratelimit-limit-requests"), headers.get("x-ratelimit-remaining-requests"), now)
+        self.tokens.sync(headers.get("x-ratelimit-limit-tokens"), headers.get("x-ratelimit-remaining-tokens"), now)
+        self._dispatch()
+
+    async def back_off(self, attempt: int, error: Exception, label: str):
+        """Wait before retry number attempt + 1 of a failed request."""
+        delay = random.uniform(0, min(LLM_RETRY_MAX_SECONDS, LLM_RETRY_BASE_SECONDS * 2 ** attempt))
+        if isinstance(error, openai.RateLimitError):
+            delay = max(delay, self.paused_until - time.monotonic())
+        metrics.LLM_RETRIES.inc(label=label, reason=type(error).__name__)
+        print(f"[LLM] {label}: {type(error).__name__}, retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+        await asyncio.sleep(delay)
+
+    def _pause(self, error: openai.RateLimitError):
+        now = time.monotonic()
+        self.rate_limited.append(now)
+        headers = error.response.headers
+        delay = (
+            parse_duration(headers.get("retry-after"))
+            or parse_duration(headers.get("x-ratelimit-reset-requests"))
+            or parse_duration(headers.get("x-ratelimit-reset-tokens"))
+            or LLM_RETRY_BASE_SECONDS
+        )
+        # Jitter so the paused waiters don't all resume on the same tick
+        self.paused_until = max(self.paused_until, now + min(delay, LLM_RETRY_MAX_SECONDS) * random.uniform(1.0, 1.25))
+
+    async def _acquire(self, tokens: int):
+        name = _priority.get()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, [PRIORITIES.index(name), next(self._arrivals), tokens, future])
+        self._set_depth(name, 1)
+        queued_at = time.monotonic()
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just before the cancellation landed
+                self._release()
+            raise
+        finally:
+            if not future.done() or future.cancelled():
+                future.cancel()
+                self._set_depth(name, -1)
+            metrics.LLM_QUEUE_WAIT_SECONDS.observe(time.monotonic() - queued_at, priority=name)
+
+    def _release(self):
+        self.in_flight -= 1
+        metrics.LLM_IN_FLIGHT.set(self.in_flight)
+        self._dispatch()
+
+    def _dispatch(self):
+        """Grant slots to the head of the queue while the budget allows."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        now = time.monotonic()
+        while self._queue and self.in_flight < self.max_concurrency:
+            rank, _, tokens, future = self._queue[0]
+            if future.done():  # cancelled while waiting
+                heapq.heappop(self._queue)
+                continue
+            wait = max(self.paused_until - now, self.requests.wait_for(1, now), self.tokens.wait_for(tokens, now))
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+            heapq.heappop(self._queue)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            self.in_flight += 1
+            metrics.LLM_IN_FLIGHT.set(self.in_flight)
+            self._set_depth(PRIORITIES[rank], -1)
+            future.set_result(None)
+
+    def _set_depth(self, name: str, change: int):
+        self._depth[name] += change
+        metrics.LLM_QUEUE_DEPTH.set(self._depth[name], priority=name)
+
+    def load(self, window_seconds: float = 60.0) -> dict:
+        """Requests in flight, requests waiting (backfill not counted: it
+        never holds up live work), and 429 replies in the last
+        window_seconds."""
+        since = time.monotonic() - window_seconds
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting("evaluation"),
+            "rate_limited": sum(1 for at in self.rate_limited if at >= since),
+        }
+
+
+governor = Governor(LLM_MAX_CONCURRENCY, LLM_MAX_RETRIES)
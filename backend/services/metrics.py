@@ -0,0 +1,204 @@
+"""Process-local metrics and tracing, exposed at GET /metrics.
+
+A small registry of Prometheus-style counters, gauges and histograms rendered
+in the text exposition format, so no client library is needed. The main
+entry point is span(): it times a block (a pipeline stage, an LLM call, a
+database write) into one histogram keyed by span name and outcome, and, when
+OTEL_ENABLED is set and opentelemetry-api is installed, opens an
+OpenTelemetry span too. Exporting those spans is configured the usual
+OpenTelemetry way (SDK + exporter, e.g. via `opentelemetry-instrument`).
+
+Span names are dotted, stage first: "end_of_call.feedback",
+"evaluation.topic_analysis", "llm.voice_metrics", "supabase.feedback.upsert".
+Figures are per process; each worker serves its own.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+from config import METRICS_ENABLED, OTEL_ENABLED
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_trace = None
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_lock = threading.Lock()
+_registry: dict[str, "_Metric"] = {}
+
+_tracer = otel_trace.get_tracer("echoeval") if OTEL_ENABLED and otel_trace is not None else None
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: tuple, extra: tuple = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self.samples()
+
+    def samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        super().__init__(name, help)
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = _label_key(labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self) -> list[str]:
+        return [f"{self.name}{_format_labels(key)} {value:g}" for key, value in sorted(self.values.items())]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str):
+        super().__init__(name, help)
+        self.values: dict[tuple, float] = {}
+
+    def set(self, value: float, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = _label_key(labels)
+        with _lock:
+            self.values[key] = value
+
+    def samples(self) -> list[str]:
+        return [f"{self.name}{_format_labels(key)} {value:g}" for key, value in sorted(self.values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket..., count, sum]
+        self.values: dict[tuple, list[float]] = {}
+
+    def observe(self, value: float, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = _label_key(labels)
+        with _lock:
+            entry = self.values.setdefault(key, [0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[i] += 1
+            entry[-2] += 1
+            entry[-1] += value
+
+    def samples(self) -> list[str]:
+        lines = []
+        for key, entry in sorted(self.values.items()):
+            for bound, count in zip(self.buckets, entry):
+                lines.append(f"{self.name}_bucket{_format_labels(key, (('le', f'{bound:g}'),))} {count:g}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, (('le', '+Inf'),))} {entry[-2]:g}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {entry[-1]:g}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {entry[-2]:g}")
+        return lines
+
+
+def _register(metric_class, name: str, help: str, **kwargs):
+    with _lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = metric_class(name, help, **kwargs)
+    return metric
+
+
+def counter(name: str, help: str) -> Counter:
+    return _register(Counter, name, help)
+
+
+def gauge(name: str, help: str) -> Gauge:
+    return _register(Gauge, name, help)
+
+
+def histogram(name: str, help: str, buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+    return _register(Histogram, name, help, buckets=buckets)
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    with _lock:
+        lines = [line for metric in _registry.values() for line in metric.render()]
+    return "\n".join(lines) + "\n"
+
+
+SPAN_SECONDS = histogram("echoeval_span_duration_seconds", "Duration of pipeline stages and external calls")
+HTTP_REQUEST_SECONDS = histogram("echoeval_http_request_duration_seconds", "HTTP request latency by endpoint")
+LLM_CALLS = counter("echoeval_llm_calls_total", "LLM completions by label, including cache hits")
+LLM_TOKENS = counter("echoeval_llm_tokens_total", "LLM tokens reported by the API, by label and type")
+LLM_QUEUE_DEPTH = gauge("echoeval_llm_queue_depth", "LLM requests waiting in the governor, by priority")
+LLM_QUEUE_WAIT_SECONDS = histogram("echoeval_llm_queue_wait_seconds", "Time LLM requests waited in the governor, by priority")
+LLM_IN_FLIGHT = gauge("echoeval_llm_in_flight", "LLM requests being sent or streamed")
+LLM_RETRIES = counter("echoeval_llm_retries_total", "LLM requests retried by the governor, by label and reason")
+LLM_RATE_BUDGET = gauge("echoeval_llm_rate_budget_remaining", "Requests/tokens left in the OpenAI rate-limit window, by kind")
+FALLBACKS = counter("echoeval_fallbacks_total", "Default values used after a failed step, by step")
+TIER_SELECTIONS = counter("echoeval_evaluation_tiers_total", "Evaluation tiers chosen, by tier and reason")
+EVALUATION_SECONDS = histogram("echoeval_evaluation_seconds", "Deep evaluation job queued to completed, by tier")
+EVALUATION_SLA_MISSES = counter("echoeval_evaluation_sla_misses_total", "Evaluations completed past their tier's SLA")
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time the block as `name`; the outcome ("ok" or "error") is a label.
+
+    `attributes` only go to the OpenTelemetry span; keep Prometheus label
+    cardinality down by putting variable data there, not in the name.
+    """
+    started = time.perf_counter()
+    status = "ok"
+    otel_span = _tracer.start_as_current_span(name, attributes=attributes) if _tracer else None
+    try:
+        if otel_span is not None:
+            with otel_span:
+                yield
+        else:
+            yield
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        SPAN_SECONDS.observe(time.perf_counter() - started, span=name, status=status)
+
+
+async def timed(name: str, awaitable, **attributes):
+    """Await inside span(name), e.g. for one branch of an asyncio.gather."""
+    with span(name, **attributes):
+        return await awaitable
+
+
+def fallback(step: str):
+    """Count a step that failed and fell back to default values."""
+    FALLBACKS.inc(step=step)
@@ -0,0 +1,45 @@
+"""Keyset (cursor) pagination over `created_at DESC, id DESC`.
+
+A cursor encodes the (created_at, id) of the last row of a page; the next page
+starts strictly after it, so pages stay cheap however deep the history is and
+don't shift when new rows are inserted.
+"""
+import base64
+import uuid
+from datetime import datetime
+
+
+def encode_cursor(row: dict) -> str:
+    raw = f"{row['created_at']}|{row['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    """(created_at, id) of a cursor, re-serialised from their parsed values
+    so nothing but a timestamp and a UUID reaches the filter. Raises
+    ValueError for a malformed cursor."""
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        created_at, row_id = base64.urlsafe_b64decode(padded).decode().split("|", 1)
+        return datetime.fromisoformat(created_at).isoformat(), str(uuid.UUID(row_id))
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def after_cursor(query, cursor: str | None):
+    """Restrict a PostgREST query to rows after the cursor and apply the
+    matching order. Timestamps are quoted because they contain `.` and `:`."""
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.or_(
+            f'created_at.lt."{created_at}",'
+            f'and(created_at.eq."{created_at}",id.lt."{row_id}")'
+        )
+    return query.order("created_at", desc=True).order("id", desc=True)
+
+
+def page(rows: list[dict], limit: int) -> tuple[list[dict], str | None]:
+    """Split a `limit + 1` fetch into the page and the cursor for the next one."""
+    if len(rows) > limit:
+        return rows[:limit], encode_cursor(rows[limit - 1])
+    return rows, None
@@ -0,0 +1,201 @@
+"""Deterministic 0-100 voice metric scores from transcript features.
+
+Replaces the LLM's guessed numbers for grammar, fluency, filler_words and
+clarity. Features come from the caller's text (phrase counts from
+services/analysis.py, sentence lengths, restarts and repeated words) and the
+call duration; each feature maps to 0-100 through a piecewise-linear curve
+(np.interp), and all four metrics come out of one weights-by-sub-scores
+matrix product. The same text always gets the same scores, and a score can
+be traced back to the features that produced it, which notes() turns into
+short positives/to_improve lines for when no LLM writes them.
+
+numpy is optional; without it available() is False and the voice metrics
+keep the LLM's scores.
+"""
+import re
+
+from services.analysis import count_phrase_lists
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+METRICS = ("grammar", "fluency", "filler_words", "clarity")
+
+# Feature -> (x breakpoints, score at each breakpoint); np.interp clamps
+# outside the range. Rates are per 100 words.
+CURVES = {
+    "filler_rate": ((0, 1, 3, 6, 10), (100, 92, 75, 50, 20)),
+    "hedge_rate": ((0, 1, 3, 6, 10), (100, 95, 80, 55, 30)),
+    "restart_rate": ((0, 0.5, 2, 4, 8), (100, 95, 75, 50, 20)),
+    "repetition_rate": ((0, 0.5, 2, 4), (100, 95, 70, 40)),
+    # Words per minute of the caller's speaking time
+    "wpm": ((60, 100, 120, 170, 200, 240), (30, 70, 100, 100, 70, 30)),
+    # Mean words per sentence: fragments and run-ons both cost
+    "sentence_length": ((2, 6, 10, 22, 35, 60), (30, 70, 100, 100, 65, 30)),
+    # Coefficient of variation of sentence length: wild swings (fragments
+    # between run-ons) are hard to follow
+    "sentence_variation": ((0, 0.8, 1.5), (100, 100, 50)),
+    # Share of sentences over 40 words
+    "run_on_share": ((0, 0.1, 0.3, 0.6), (100, 90, 60, 30)),
+}
+
+# Metric -> feature weights
+WEIGHTS = {
+    "grammar": {"run_on_share": 0.4, "restart_rate": 0.3, "sentence_length": 0.3},
+    "fluency": {"restart_rate": 0.4, "repetition_rate": 0.3, "wpm": 0.3},
+    "filler_words": {"filler_rate": 1.0},
+    "clarity": {"hedge_rate": 0.4, "sentence_length": 0.3, "sentence_variation": 0.3},
+}
+
+RESTART_PHRASES = (
+    "i mean", "sorry", "let me rephrase", "let me start over", "let me try again",
+    "what i meant", "or rather", "scratch that",
+)
+
+_SENTENCE_END = re.compile(r"[.!?]+")
+_WORD = re.compile(r"[a-z']+")
+# Restart phrases, or a word cut off with a dash ("we sh- we should")
+_RESTART = re.compile(r"\b(?:" + "|".join(re.escape(p) for p in RESTART_PHRASES) + r")\b|(?<=\w)(?:--|—|-)\s")
+# Longest phrase checked for being said twice in a row ("i think i think")
+MAX_REPEAT_WORDS = 3
+
+
+def available() -> bool:
+    return np is not None
+
+
+def speaking_seconds(full_transcript: list[dict], duration_seconds: float | None) -> float | None:
+    """The caller's share of the call duration, by share of words spoken."""
+    if not duration_seconds or not full_transcript:
+        return None
+    words = {"user": 0, "total": 0}
+    for turn in full_transcript:
+        count = len((turn.get("content") or "").split())
+        words["total"] += count
+        if turn.get("role") == "user":
+            words["user"] += count
+    return duration_seconds * words["user"] / words["total"] if words["total"] else None
+
+
+def _repetitions(words) -> int:
+    """Words or phrases of up to MAX_REPEAT_WORDS said twice in a row.
+
+    Compares the word array with itself shifted by the phrase length, for
+    every phrase length at once per offset; a run of matches is one
+    repetition, and a repeated phrase isn't also counted as repeated words.
+    """
+    repeated = np.zeros(len(words), dtype=bool)
+    count = 0
+    for size in range(MAX_REPEAT_WORDS, 0, -1):
+        if len(words) < 2 * size:
+            continue
+        starts = len(words) - 2 * size + 1
+        match = np.ones(starts, dtype=bool)
+        for offset in range(size):
+            match &= words[offset:offset + starts] == words[size + offset:size + offset + starts]
+        match &= ~repeated[:starts]
+        run_starts = match & ~np.concatenate(([False], match[:-1]))
+        count += int(run_starts.sum())
+        for offset in range(2 * size):
+            repeated[offset:offset + starts] |= match
+    return count
+
+
+def features(user_text: str, speaking_seconds: float | None = None) -> dict:
+    """Scoring features of the caller's text. `speaking_seconds` adds wpm."""
+    text = user_text.lower()
+    words = np.array(_WORD.findall(text))
+    word_count = len(words)
+    per_100 = 100 / max(word_count, 1)
+    phrase_lists = count_phrase_lists(text)
+
+    lengths = np.array(
+        [len(_WORD.findall(s)) for s in _SENTENCE_END.split(text)], dtype=float,
+    )
+    lengths = lengths[lengths > 0]
+    if not len(lengths):
+        lengths = np.array([float(word_count)])
+    mean_length = float(lengths.mean())
+
+    found = {
+        "words": word_count,
+        "filler_rate": phrase_lists["filler"]["count"] * per_100,
+        "hedge_rate": phrase_lists["hedging"]["count"] * per_100,
+        "restart_rate": len(_RESTART.findall(text)) * per_100,
+        "repetition_rate": _repetitions(words) * per_100,
+        "sentence_length": mean_length,
+        "sentence_variation": float(lengths.std() / mean_length) if mean_length else 0.0,
+        "run_on_share": float((lengths > 40).mean()),
+        "wpm": word_count / (speaking_seconds / 60) if speaking_seconds else None,
+        "top_fillers": sorted(phrase_lists["filler"]["phrases"].items(), key=lambda kv: -kv[1])[:3],
+    }
+    return {k: round(v, 2) if isinstance(v, float) else v for k, v in found.items()}
+
+
+def _sub_scores(found: dict) -> dict:
+    """0-100 per feature that has a value."""
+    names = [name for name in CURVES if found.get(name) is not None]
+    return {name: float(np.interp(found[name], *CURVES[name])) for name in names}
+
+
+def score(found: dict) -> dict:
+    """{metric: 0-100} from features(). Features without a value (wpm with
+    no duration) drop out and the metric's other weights are rescaled."""
+    sub = _sub_scores(found)
+    names = list(sub)
+    values = np.array([sub[n] for n in names])
+    weights = np.array([[WEIGHTS[m].get(n, 0.0) for n in names] for m in METRICS])
+    totals = weights.sum(axis=1)
+    scores = weights @ values / np.where(totals > 0, totals, 1)
+    return {m: int(round(s)) for m, s in zip(METRICS, scores)}
+
+
+def notes(found: dict) -> dict:
+    """{metric: {"positives", "to_improve"}} lines derived from the features."""
+    sub = _sub_scores(found)
+    good = {name: value >= 90 for name, value in sub.items()}
+    fillers = ", ".join(f'"{p}" ({n})' for p, n in found["top_fillers"])
+    lines = {
+        "filler_rate": (
+            "Very few filler words",
+            f"{found['filler_rate']:.1f} fillers per 100 words, mostly {fillers}; pause silently instead",
+        ),
+        "hedge_rate": (
+            "Direct, confident phrasing",
+            f"{found['hedge_rate']:.1f} hedges per 100 words; state your point without softeners",
+        ),
+        "restart_rate": (
+            "Sentences finished without restarting",
+            "Frequent restarts; decide the sentence before you start it",
+        ),
+        "repetition_rate": (
+            "No stumbling over repeated words",
+            "Repeated words in a row; slow down slightly at the start of sentences",
+        ),
+        "wpm": (
+            "Comfortable speaking pace",
+            f"About {found['wpm'] or 0:.0f} words per minute; aim for 120-170",
+        ),
+        "sentence_length": (
+            "Sentences of a comfortable length",
+            f"Sentences average {found['sentence_length']:.0f} words; aim for 10-20",
+        ),
+        "sentence_variation": (
+            "Good variety in sentence length",
+            "Sentence length swings widely; keep most sentences mid-length",
+        ),
+        "run_on_share": (
+            "No run-on sentences",
+            "Some sentences run past 40 words; split them",
+        ),
+    }
+    result = {}
+    for metric in METRICS:
+        used = [n for n in WEIGHTS[metric] if n in sub]
+        result[metric] = {
+            "positives": [lines[n][0] for n in used if good[n]][:2],
+            "to_improve": [lines[n][1] for n in sorted(used, key=sub.get) if not good[n]][:2],
+        }
+    return result
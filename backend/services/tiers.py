@@ -0,0 +1,136 @@
+"""Evaluation tiers: how much LLM work a session's evaluation gets.
+
+- fast: no LLM calls. Topics keep their keyword pre-pass names and get no
+  per-topic analysis; voice metrics are scored locally with notes derived
+  from the features (services/scoring.py).
+- standard: 2 calls. Topic label cleanup is skipped; voice metric notes and
+  per-topic analysis run on halved transcript budgets.
+- deep: the full 3-call pipeline with the full budgets.
+
+select() picks the tier for a deep_evaluation job. It starts from the
+user's preference (StartCallRequest.evaluation_tier, carried in the VAPI
+call metadata), then EVALUATION_TIER_DEFAULT, and otherwise the call's
+size: short warmups get fast, multi-topic or long calls get deep. Then it
+sheds load. While LLM requests are queueing for a gateway slot or OpenAI
+has recently answered 429, the tier is capped at standard, or at fast
+under overload. A job that already waited in the queue longer than its
+tier's SLA drops one tier. That way a burst degrades the evaluations
+instead of queueing them behind the rate limits.
+
+Each tier has an SLA: the target seconds from the job being queued (right
+after quick feedback) to the evaluation completing. Evaluations are timed
+per tier and every miss is counted (metrics.EVALUATION_SECONDS,
+metrics.EVALUATION_SLA_MISSES).
+"""
+import time
+from dataclasses import dataclass
+
+from config import (
+    EVALUATION_TIER_DEFAULT,
+    TIER_FAST_MAX_WORDS,
+    TIER_DEEP_MIN_WORDS,
+    TIER_DEEP_MIN_TOPICS,
+    TIER_SLA_FAST_SECONDS,
+    TIER_SLA_STANDARD_SECONDS,
+    TIER_SLA_DEEP_SECONDS,
+    TIER_LOAD_HIGH_WAITING,
+    TIER_LOAD_OVERLOAD_WAITING,
+    TIER_RATE_LIMIT_WINDOW_SECONDS,
+    TOPIC_SESSION_MAX_TOKENS,
+    VOICE_METRICS_MAX_TOKENS,
+)
+from services import llm, metrics, scoring
+
+
+@dataclass(frozen=True)
+class Tier:
+    name: str
+    sla_seconds: float
+    label_topics: bool  # LLM topic label cleanup
+    analyze_topics: bool  # per-topic deep analysis
+    voice_notes: bool  # LLM-written positives/to_improve
+    topic_tokens: int  # transcript tokens for topic analysis, per session
+    voice_tokens: int  # transcript tokens for voice metric notes
+
+
+TIERS = {
+    "fast": Tier("fast", TIER_SLA_FAST_SECONDS, False, False, False, 0, 0),
+    "standard": Tier(
+        "standard", TIER_SLA_STANDARD_SECONDS, False, True, True,
+        TOPIC_SESSION_MAX_TOKENS // 2, VOICE_METRICS_MAX_TOKENS // 2,
+    ),
+    "deep": Tier("deep", TIER_SLA_DEEP_SECONDS, True, True, True, TOPIC_SESSION_MAX_TOKENS, VOICE_METRICS_MAX_TOKENS),
+}
+
+# Cheapest first
+ORDER = ("fast", "standard", "deep")
+
+
+def load_level() -> str:
+    """"normal", "high" or "overload", from the LLM gateway's queue and
+    recent rate limiting."""
+    load = llm.load(TIER_RATE_LIMIT_WINDOW_SECONDS)
+    if load["waiting"] >= TIER_LOAD_OVERLOAD_WAITING:
+        return "overload"
+    if load["waiting"] >= TIER_LOAD_HIGH_WAITING or load["rate_limited"]:
+        return "high"
+    return "normal"
+
+
+def _by_size(user_words: int, topic_count: int) -> str:
+    if user_words < TIER_FAST_MAX_WORDS:
+        return "fast"
+    if topic_count >= TIER_DEEP_MIN_TOPICS or user_words >= TIER_DEEP_MIN_WORDS:
+        return "deep"
+    return "standard"
+
+
+def _cap(name: str, ceiling: str) -> str:
+    return ORDER[min(ORDER.index(name), ORDER.index(ceiling))]
+
+
+def select(
+    user_words: int,
+    topic_count: int,
+    requested: str | None = None,
+    queued_at: float | None = None,
+) -> tuple[Tier, str]:
+    """The tier for an evaluation and why: "requested", "default"
+    (EVALUATION_TIER_DEFAULT), "size", "load" or "queue" (waited past the
+    SLA).
+
+    `queued_at` is the epoch time the job was queued.
+    """
+    if requested in TIERS:
+        name, reason = requested, "requested"
+    elif EVALUATION_TIER_DEFAULT in TIERS:
+        name, reason = EVALUATION_TIER_DEFAULT, "default"
+    else:
+        name, reason = _by_size(user_words, topic_count), "size"
+
+    level = load_level()
+    if level != "normal":
+        capped = _cap(name, "standard" if level == "high" else "fast")
+        if capped != name:
+            name, reason = capped, "load"
+
+    if queued_at is not None and name != "fast" and time.time() - queued_at > TIERS[name].sla_seconds:
+        name, reason = ORDER[ORDER.index(name) - 1], "queue"
+
+    # Fast scores voice metrics locally; without numpy that needs the LLM
+    if name == "fast" and not scoring.available():
+        name = "standard"
+
+    metrics.TIER_SELECTIONS.inc(tier=name, reason=reason)
+    return TIERS[name], reason
+
+
+def record(tier: Tier, queued_at: float | None):
+    """Time a completed evaluation against its tier's SLA."""
+    if queued_at is None:
+        return
+    elapsed = time.time() - queued_at
+    metrics.EVALUATION_SECONDS.observe(elapsed, tier=tier.name)
+    if elapsed > tier.sla_seconds:
+        metrics.EVALUATION_SLA_MISSES.inc(tier=tier.name)
+        print(f"[EVAL] {tier.name} evaluation took {elapsed:.1f}s, over its {tier.sla_seconds:.0f}s SLA")
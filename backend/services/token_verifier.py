@@ -0,0 +1,136 @@
+"""Local verification of Supabase access tokens.
+
+Tokens are checked against the project's signing keys instead of calling
+supabase.auth.get_user on every request: HS256 tokens with
+SUPABASE_JWT_SECRET, asymmetric ones with the project's JWKS (cached, and
+refetched when an unknown key id shows up after a rotation). Verified users are
+kept in a bounded LRU until the token expires. Only tokens we can't verify
+locally (no secret configured, or a key id missing even after a refetch) go to
+Supabase Auth.
+
+Trade-off: a token revoked before its expiry stays valid here until `exp`.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import jwt
+
+from config import (
+    SUPABASE_URL,
+    SUPABASE_JWT_SECRET,
+    AUTH_JWT_AUDIENCE,
+    AUTH_TOKEN_CACHE_SIZE,
+    AUTH_JWKS_CACHE_SECONDS,
+)
+from services.supabase_client import supabase
+
+ASYMMETRIC_ALGORITHMS = ["RS256", "ES256"]
+
+
+@dataclass(frozen=True)
+class AuthUser:
+    id: str
+    email: str | None
+    user_metadata: dict = field(default_factory=dict)
+
+
+class UnverifiableToken(Exception):
+    """The token can't be checked locally; ask Supabase Auth instead."""
+
+
+_jwks_client = jwt.PyJWKClient(
+    f"{SUPABASE_URL}/auth/v1/.well-known/jwks.json",
+    cache_keys=True,
+    lifespan=AUTH_JWKS_CACHE_SECONDS,
+)
+
+_cache: OrderedDict[str, tuple[float, AuthUser]] = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _cache_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def lookup(token: str) -> AuthUser | None:
+    """Return the cached user for a still-valid token, if any."""
+    key = _cache_key(token)
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            del _cache[key]
+            return None
+        _cache.move_to_end(key)
+        return entry[1]
+
+
+def _remember(token: str, expires_at: float, user: AuthUser):
+    with _cache_lock:
+        _cache[_cache_key(token)] = (expires_at, user)
+        while len(_cache) > AUTH_TOKEN_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def _decode_locally(token: str) -> dict:
+    header = jwt.get_unverified_header(token)
+    algorithm = header.get("alg")
+
+    if algorithm == "HS256":
+        if not SUPABASE_JWT_SECRET:
+            raise UnverifiableToken("SUPABASE_JWT_SECRET not configured")
+        key = SUPABASE_JWT_SECRET
+    elif algorithm in ASYMMETRIC_ALGORITHMS:
+        try:
+            # Refetches the JWKS when the key id is unknown (key rotation)
+            key = _jwks_client.get_signing_key_from_jwt(token).key
+        except jwt.PyJWKClientError as e:
+            raise UnverifiableToken(str(e))
+    else:
+        raise jwt.InvalidAlgorithmError(f"Unsupported token algorithm: {algorithm}")
+
+    return jwt.decode(
+        token,
+        key,
+        algorithms=[algorithm],
+        audience=AUTH_JWT_AUDIENCE,
+        options={"require": ["exp", "sub"]},
+    )
+
+
+def _verify_remotely(token: str) -> tuple[float, AuthUser]:
+    user = supabase.auth.get_user(token).user
+    if not user:
+        raise jwt.InvalidTokenError("Supabase Auth rejected the token")
+    claims = jwt.decode(token, options={"verify_signature": False})
+    return claims.get("exp", time.time()), AuthUser(
+        id=user.id,
+        email=user.email,
+        user_metadata=user.user_metadata or {},
+    )
+
+
+def verify(token: str) -> AuthUser:
+    """Verify a bearer token. Raises jwt.InvalidTokenError (or a Supabase
+    error from the remote fallback) when the token is not valid."""
+    cached = lookup(token)
+    if cached:
+        return cached
+
+    try:
+        claims = _decode_locally(token)
+        expires_at = claims["exp"]
+        user = AuthUser(
+            id=claims["sub"],
+            email=claims.get("email"),
+            user_metadata=claims.get("user_metadata") or {},
+        )
+    except UnverifiableToken:
+        expires_at, user = _verify_remotely(token)
+
+    _remember(token, expires_at, user)
+    return user
@@ -0,0 +1,70 @@
+"""Local token counting for sizing LLM prompts.
+
+Uses tiktoken's encoding for the model when it is installed and its BPE file
+can be loaded (tiktoken downloads it on first use); otherwise falls back to a
+~4-characters-per-token estimate, which is close enough for budgeting English
+transcripts.
+"""
+from functools import lru_cache
+
+try:
+    import tiktoken
+except ImportError:  # optional dependency
+    tiktoken = None
+
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        print(f"[TOKENS] tiktoken encoding unavailable, estimating from length: {e}")
+        return None
+
+
+def warm_up(model: str = "gpt-4o-mini") -> None:
+    """Load the encoding now rather than on the first count, which may have
+    to download it. Blocking; run it off the event loop."""
+    _encoding(model)
+
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int, model: str = "gpt-4o-mini") -> str:
+    """Cut text to at most max_tokens tokens."""
+    if max_tokens <= 0:
+        return ""
+    encoding = _encoding(model)
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+
+def tail_tokens(text: str, max_tokens: int, model: str = "gpt-4o-mini") -> str:
+    """Keep only the last max_tokens tokens of text."""
+    if max_tokens <= 0:
+        return ""
+    encoding = _encoding(model)
+    if encoding is None:
+        return text[-max_tokens * CHARS_PER_TOKEN:]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[-max_tokens:])
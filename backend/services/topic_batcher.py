@@ -0,0 +1,222 @@
+"""Cross-session micro-batching for per-topic deep analysis.
+
+Topics submitted by concurrent evaluations are collected for a short window
+(TOPIC_BATCH_WINDOW_MS), packed into requests that fit a token budget for both
+the prompt and the expected reply, sent as one LLM call per pack, and the
+results are routed back to each caller by id. Under load this turns hundreds
+of small calls per minute into a few large ones; a lone session only pays the
+window as extra latency.
+
+Each topic's analysis is also cached on its own, so re-evaluating a session
+doesn't depend on which other sessions shared its batch.
+"""
+import asyncio
+import json
+import statistics
+import time
+from collections import deque
+from functools import lru_cache
+
+from config import (
+    TOPIC_BATCH_WINDOW_MS,
+    TOPIC_BATCH_MAX_INPUT_TOKENS,
+    TOPIC_BATCH_MAX_TOPICS,
+    TOPIC_OUTPUT_TOKENS_PER_TOPIC,
+)
+from services import llm, llm_governor
+from services.llm_cache import cache, cache_key
+from services.tokens import count_tokens
+
+TEMPERATURE = 0.6
+
+TOPIC_ANALYSIS_PROMPT = """You are an expert communication coach doing deep analysis of practice session topics.
+
+For each topic below, evaluate the user's communication performance. Adapt your rubric based on the topic type:
+- Giving feedback → evaluate specificity, actionability, empathy, structure
+- Pitching/presenting → evaluate hook, value proposition, CTA, storytelling
+- Saying no/difficult conversations → evaluate firmness, alternatives offered, maintaining relationship
+- General communication → evaluate structure, clarity, persuasiveness, confidence
+
+Topics to analyze:
+{topics}
+
+For EACH topic, return:
+- "id": the topic id, unchanged
+- "name": the topic name
+- "scores": object with keys: structure, opening_impact, key_message_clarity, persuasiveness, confidence, audience_awareness (each 0-100)
+- "went_well": 2-3 items describing what the user did well, with brief transcript quotes
+- "to_improve": 2-3 items with concrete improvement suggestions
+- "missed_points": 2-4 key elements a strong communicator would have covered
+- "rewrite": 3-4 sentence model version of how a confident leader would deliver this
+
+Return ONLY valid JSON array of topic analyses, one per topic id. No markdown."""
+
+
+@lru_cache(maxsize=1)
+def prompt_overhead_tokens() -> int:
+    # Counted on first use, not at import: the encoding may have to be downloaded
+    return count_tokens(TOPIC_ANALYSIS_PROMPT)
+
+
+def _topic_cache_key(topic: dict) -> str:
+    return cache_key(
+        f"{llm.DEFAULT_MODEL}/topic-analysis",
+        json.dumps({"name": topic["name"], "transcript": topic["transcript"]}, ensure_ascii=False),
+        TEMPERATURE,
+        TOPIC_OUTPUT_TOKENS_PER_TOPIC,
+    )
+
+
+class _Pending:
+    def __init__(self, topic: dict, future: asyncio.Future):
+        self.topic = topic
+        self.future = future
+        self.priority = llm_governor.current_priority()
+        self.tokens = count_tokens(json.dumps(topic, ensure_ascii=False))
+        self.submitted_at = time.monotonic()
+
+
+class TopicAnalysisBatcher:
+    def __init__(self, window_seconds: float, max_input_tokens: int, max_topics: int):
+        self.window_seconds = window_seconds
+        self.max_input_tokens = max_input_tokens
+        self.max_topics = max_topics
+        self.pending: list[_Pending] = []
+        self.flush_task: asyncio.Task | None = None
+        self.running: set[asyncio.Task] = set()
+        self.next_id = 0
+
+        self.batches = 0
+        self.topics = 0
+        self.failed_batches = 0
+        self.queue_waits = deque(maxlen=1000)
+        self.batch_latencies = deque(maxlen=1000)
+        self.batch_sizes = deque(maxlen=1000)
+        self.batch_prompt_tokens = deque(maxlen=1000)
+
+    async def analyze(self, topics: list[dict]) -> list[dict | None]:
+        """Analyze topics ({"name", "transcript"} each). Returns one analysis
+        per topic, or None for a topic the model skipped. Raises if the
+        batch request itself failed."""
+        loop = asyncio.get_running_loop()
+        results: list = [None] * len(topics)
+        waiting = []
+        for i, topic in enumerate(topics):
+            cached = cache.get(_topic_cache_key(topic))
+            if cached is not None:
+                results[i] = json.loads(cached)
+                continue
+            future = loop.create_future()
+            self.pending.append(_Pending(topic, future))
+            waiting.append((i, future))
+
+        if waiting and (self.flush_task is None or self.flush_task.done()):
+            self.flush_task = asyncio.create_task(self._flush_after_window())
+
+        for i, future in waiting:
+            results[i] = await future
+        return results
+
+    async def _flush_after_window(self):
+        await asyncio.sleep(self.window_seconds)
+        pending, self.pending = self.pending, []
+        # Don't wait for the batches here: topics submitted while they run
+        # need this task finished so they schedule the next flush
+        for batch in self._pack(pending):
+            task = asyncio.create_task(self._run_batch(batch))
+            self.running.add(task)
+            task.add_done_callback(self.running.discard)
+
+    def _pack(self, pending: list[_Pending]) -> list[list[_Pending]]:
+        """First-fit packing under the prompt-token budget and topic cap."""
+        batches: list[list[_Pending]] = []
+        batch_tokens: list[int] = []
+        budget = self.max_input_tokens - prompt_overhead_tokens()
+        for item in pending:
+            for i, batch in enumerate(batches):
+                if len(batch) < self.max_topics and batch_tokens[i] + item.tokens <= budget:
+                    batch.append(item)
+                    batch_tokens[i] += item.tokens
+                    break
+            else:
+                # A topic over budget on its own still gets a batch to itself
+                batches.append([item])
+                batch_tokens.append(item.tokens)
+        return batches
+
+    async def _run_batch(self, batch: list[_Pending]):
+        started = time.monotonic()
+        ids = []
+        payload = []
+        for item in batch:
+            self.next_id += 1
+            ids.append(f"t{self.next_id}")
+            payload.append({"id": ids[-1], **item.topic})
+            self.queue_waits.append(started - item.submitted_at)
+
+        prompt = TOPIC_ANALYSIS_PROMPT.format(topics=json.dumps(payload))
+        # A batch goes at the priority of its most urgent topic
+        priority = min((item.priority for item in batch), key=llm_governor.PRIORITIES.index)
+        try:
+            with llm_governor.priority(priority):
+                analyzed = await llm.complete_json(
+                    prompt,
+                    temperature=TEMPERATURE,
+                    max_tokens=TOPIC_OUTPUT_TOKENS_PER_TOPIC * len(batch),
+                    use_cache=False,  # cached per topic instead
+                    label="topic_analysis",
+                    expect=list,
+                )
+        except Exception as e:
+            self.failed_batches += 1
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.topics += len(batch)
+        self.batch_sizes.append(len(batch))
+        self.batch_prompt_tokens.append(prompt_overhead_tokens() + sum(item.tokens for item in batch))
+        self.batch_latencies.append(time.monotonic() - started)
+
+        if not isinstance(analyzed, list):
+            analyzed = []
+        by_id = {a["id"]: a for a in analyzed if isinstance(a, dict) and a.get("id")}
+        for position, (topic_id, item) in enumerate(zip(ids, batch)):
+            # Fall back to position if the model dropped the ids
+            result = by_id.get(topic_id)
+            if result is None and not by_id and position < len(analyzed):
+                result = analyzed[position]
+            if result is not None:
+                cache.set(_topic_cache_key(item.topic), json.dumps(result))
+            if not item.future.done():
+                item.future.set_result(result)
+
+    def stats(self) -> dict:
+        def percentiles(samples) -> dict:
+            if not samples:
+                return {"p50": 0.0, "p95": 0.0}
+            ordered = sorted(samples)
+            return {
+                "p50": round(statistics.median(ordered), 4),
+                "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4),
+            }
+
+        return {
+            "batches": self.batches,
+            "topics": self.topics,
+            "failed_batches": self.failed_batches,
+            "pending": len(self.pending),
+            "avg_batch_size": round(statistics.fmean(self.batch_sizes), 2) if self.batch_sizes else 0.0,
+            "avg_prompt_tokens": round(statistics.fmean(self.batch_prompt_tokens)) if self.batch_prompt_tokens else 0,
+            "queue_wait_seconds": percentiles(self.queue_waits),
+            "batch_latency_seconds": percentiles(self.batch_latencies),
+        }
+
+
+batcher = TopicAnalysisBatcher(
+    window_seconds=TOPIC_BATCH_WINDOW_MS / 1000,
+    max_input_tokens=TOPIC_BATCH_MAX_INPUT_TOKENS,
+    max_topics=TOPIC_BATCH_MAX_TOPICS,
+)
@@ -0,0 +1,113 @@
+"""Topic boundary detection: the regex pre-pass of the deep evaluation.
+
+A topic starts at the user turn that answers an assistant turn asking what to
+practice. Each ask pattern is a named chain of keywords that must appear in
+order on one line — the original regexes were keywords joined by ".*", which
+backtracks quadratically on long turns. A chain is matched by looking each
+keyword up with str.find from the earliest point the previous one can end, so
+a turn costs a bounded number of linear substring searches however long it
+is. The segmenter is a single pass over the turns and can be fed one turn at
+a time, so it also runs while a call is in progress (services/live_call.py).
+"""
+
+# Ask patterns as keyword chains: alternatives per step, steps in order.
+# Equivalent to the original regexes, e.g. "topic_question" is
+# r"what.*(?:topic|situation|scenario).*(?:practice|work on|try)", and
+# r"what do you want to practice" is covered by "want_to_practice".
+TOPIC_ASK_CHAINS = {
+    "topic_question": (("what",), ("topic", "situation", "scenario"), ("practice", "work on", "try")),
+    "want_to_practice": (("what",), ("want",), ("practice", "work on")),
+    "go_ahead": (("go ahead",),),
+    "give_it_a_try": (("give it",), ("shot", "try")),
+    "same_topic": (("same topic",),),
+    "what_next": (("what",), ("next",)),
+    "something_new": (("try something new",),),
+}
+
+
+def _chain_end(line: str, steps: tuple) -> int:
+    """Offset where the chain completes in line at the earliest, or -1.
+
+    Taking the earliest end at every step leaves the most room for the next
+    keyword, so one search per keyword is enough.
+    """
+    position = 0
+    for alternatives in steps:
+        end = -1
+        for keyword in alternatives:
+            start = line.find(keyword, position)
+            if start != -1 and (end == -1 or start + len(keyword) < end):
+                end = start + len(keyword)
+        if end == -1:
+            return -1
+        position = end
+    return position
+
+
+def topic_ask(text: str) -> str | None:
+    """Name of the ask pattern found in an assistant turn, if any."""
+    # "." in the original patterns didn't cross newlines
+    for line in text.lower().split("\n"):
+        for name, steps in TOPIC_ASK_CHAINS.items():
+            if _chain_end(line, steps) != -1:
+                return name
+    return None
+
+
+class TopicSegmenter:
+    """Splits a conversation into topic segments, one turn at a time."""
+
+    def __init__(self):
+        self.closed: list[dict] = []
+        self.current_start = None
+        self.current_name = None
+        self.pending_topic_ask = False
+        self.turn_count = 0
+
+    def state(self) -> tuple:
+        return (len(self.closed), self.current_start, self.current_name, self.pending_topic_ask, self.turn_count)
+
+    def restore(self, state: tuple):
+        closed, self.current_start, self.current_name, self.pending_topic_ask, self.turn_count = state
+        del self.closed[closed:]
+
+    def feed(self, turn: dict):
+        i = self.turn_count
+        self.turn_count += 1
+        role = turn.get("role", "")
+
+        if role == "assistant":
+            # Once an ask is pending, further assistant turns can't change anything
+            if not self.pending_topic_ask and topic_ask(turn.get("content", "")):
+                self.pending_topic_ask = True
+
+        elif role == "user" and self.pending_topic_ask:
+            # User's response after a topic ask = topic name
+            # Close previous segment if exists
+            if self.current_start is not None:
+                self.closed.append({
+                    "raw_name": self.current_name,
+                    "start_idx": self.current_start,
+                    "end_idx": i - 1,
+                })
+
+            self.current_name = turn.get("content", "").strip()[:100]
+            self.current_start = i
+            self.pending_topic_ask = False
+
+    def segments(self) -> list[dict]:
+        """Segments so far, with the open one closed at the last turn."""
+        if self.current_start is None:
+            return list(self.closed)
+        return self.closed + [{
+            "raw_name": self.current_name,
+            "start_idx": self.current_start,
+            "end_idx": self.turn_count - 1,
+        }]
+
+
+def find_segments(full_transcript: list[dict]) -> list[dict]:
+    segmenter = TopicSegmenter()
+    for turn in full_transcript:
+        segmenter.feed(turn)
+    return segmenter.segments()
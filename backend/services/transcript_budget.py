@@ -0,0 +1,78 @@
+"""Token budgeting for transcript text sent to the LLM.
+
+Replaces fixed character slices: text that fits its budget is sent whole, a
+budget shared by several items (turns, topics, segments) is split in
+proportion to their size without giving anyone more than they need, and
+anything still too long keeps its beginning and end with the middle elided.
+"""
+from services.tokens import count_tokens, truncate_tokens, tail_tokens
+
+# Share of an elided text kept from the start; openings and closings both matter
+HEAD_SHARE = 0.6
+# Below this many tokens per turn, whole turns are dropped from the middle instead
+MIN_TURN_TOKENS = 16
+
+
+def allocate(sizes: list[int], budget: int) -> list[int]:
+    """Split a token budget across items of the given sizes.
+
+    Items smaller than their fair share get exactly what they need and the
+    remainder is shared among the rest, so the budget is never spent on
+    padding while long items are being cut.
+    """
+    allocation = [0] * len(sizes)
+    remaining = sorted(range(len(sizes)), key=lambda i: sizes[i])
+    while remaining:
+        share = max(budget, 0) // len(remaining)
+        i = remaining[0]
+        if sizes[i] > share:
+            break
+        allocation[i] = sizes[i]
+        budget -= sizes[i]
+        remaining.pop(0)
+    if remaining:
+        total = sum(sizes[i] for i in remaining)
+        for i in remaining:
+            allocation[i] = max(budget, 0) * sizes[i] // total
+    return allocation
+
+
+def elide(text: str, max_tokens: int) -> str:
+    """Fit text into max_tokens, keeping its start and end."""
+    size = count_tokens(text)
+    if size <= max_tokens:
+        return text
+    marker = f" [… {size - max_tokens} tokens omitted …] "
+    room = max_tokens - count_tokens(marker)
+    if room <= 0:
+        return truncate_tokens(text, max_tokens)
+    head = round(room * HEAD_SHARE)
+    return truncate_tokens(text, head) + marker + tail_tokens(text, room - head)
+
+
+def format_turns(turns: list[dict]) -> list[str]:
+    return [f'{t.get("role", "?")}: {t.get("content", "")}' for t in turns]
+
+
+def fit_turns(turns: list[dict], max_tokens: int) -> str:
+    """Render turns as "role: content" lines within max_tokens.
+
+    Long turns are elided in the middle; when there are too many turns for
+    each to keep a readable share, turns from the middle of the conversation
+    are dropped and replaced by a marker line.
+    """
+    lines = format_turns(turns)
+    sizes = [count_tokens(line) + 1 for line in lines]
+    if sum(sizes) <= max_tokens:
+        return "\n".join(lines)
+
+    keep = max(2, max_tokens // MIN_TURN_TOKENS)
+    if len(lines) > keep:
+        head = keep // 2
+        tail = keep - head
+        marker = f"[… {len(lines) - keep} turns omitted …]"
+        lines = lines[:head] + [marker] + lines[-tail:]
+        sizes = sizes[:head] + [count_tokens(marker) + 1] + sizes[-tail:]
+
+    budgets = allocate(sizes, max_tokens)
+    return "\n".join(elide(line, budget - 1) for line, budget in zip(lines, budgets))
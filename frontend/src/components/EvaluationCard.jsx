@@ -291,8 +291,10 @@ export default function EvaluationCard({ evaluation }) {
   // Failed — silently hide
   if (evaluation.status === 'failed') return null;
 
-  // Pending / processing — show spinner
-  if (evaluation.status === 'pending' || evaluation.status === 'processing') {
+  const inProgress = evaluation.status === 'pending' || evaluation.status === 'processing';
+
+  // Pending / processing with nothing stored yet — show spinner
+  if (inProgress && !evaluation.topics?.length && !evaluation.voice_metrics) {
     return (
       <div
         className="glass rounded-2xl p-6 mt-4 animate-fade-in"
@@ -353,7 +355,7 @@ export default function EvaluationCard({ evaluation }) {
     );
   }
 
-  // Completed — render full evaluation
+  // Completed, or some steps stored while the rest runs — render what's there
   const { voice_metrics, topics } = evaluation;
 
   return (
@@ -382,6 +384,11 @@ export default function EvaluationCard({ evaluation }) {
         >
           Deep Analysis
         </h2>
+        {inProgress && (
+          <span className="text-xs" style={{ color: '#475569' }}>
+            · still analyzing...
+          </span>
+        )}
       </div>
 
       {/* Voice metrics */}
@@ -18,6 +18,43 @@ async function request(path, options = {}) {
   return res.json();
 }
 
+// Server-Sent Events over fetch (EventSource can't send the Authorization header).
+// Calls onEvent(name, data) per event; resolves when the server closes the stream.
+async function stream(path, onEvent, signal) {
+  const token = localStorage.getItem('access_token');
+  const res = await fetch(`${API_BASE}${path}`, {
+    headers: {
+      Accept: 'text/event-stream',
+      ...(token && { Authorization: `Bearer ${token}` }),
+    },
+    signal,
+  });
+
+  if (!res.ok || !res.body) {
+    throw new Error('Stream failed');
+  }
+
+  const reader = res.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buffer = '';
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) return;
+    buffer += value;
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const block = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      let name = 'message';
+      let data = '';
+      for (const line of block.split('\n')) {
+        if (line.startsWith('event: ')) name = line.slice(7);
+        else if (line.startsWith('data: ')) data += line.slice(6);
+      }
+      if (data) onEvent(name, JSON.parse(data));
+    }
+  }
+}
+
 export const api = {
   // Auth
     signup: (data) => request('/auth/signup', { method: 'POST', body: JSON.stringify(data) }),
@@ -26,8 +63,10 @@ export const api = {
   getMe: () => request('/auth/me'),
 
   // Sessions
-  listSessions: () => request('/sessions'),
-  getSession: (id) => request(`/sessions/${id}`),
+  listSessions: (cursor) => request(`/sessions${cursor ? `?cursor=${encodeURIComponent(cursor)}` : ''}`),
+  getSession: (id, fields) => request(`/sessions/${id}${fields ? `?fields=${encodeURIComponent(fields)}` : ''}`),
+  getSessionTranscript: (id) => request(`/sessions/${id}/transcript`),
+  streamSessionEvents: (id, onEvent, signal) => stream(`/sessions/${id}/events`, onEvent, signal),
   startSession: (data) => request('/sessions/start', { method: 'POST', body: JSON.stringify(data) }),
   completeOnboarding: () => request('/sessions/complete-onboarding', { method: 'POST' }),
 
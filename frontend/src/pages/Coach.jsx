@@ -28,6 +28,7 @@ export default function Coach() {
   const currentSessionRef = useRef(currentSession);
   const pollCancelledRef = useRef(false);
   const evalPollCancelledRef = useRef(false);
+  const streamAbortRef = useRef(null);
 
   // Keep ref in sync with state
   useEffect(() => {
@@ -63,7 +64,7 @@ export default function Coach() {
           if (data.evaluation) {
             setEvaluation(data.evaluation);
           }
-          if (data.feedback) {
+          if (data.feedback?.micro_skill) {
             setFeedback(data.feedback);
             setCurrentSession((prev) => ({ ...prev, session: data.session }));
             setState(STATES.FEEDBACK);
@@ -86,7 +87,34 @@ export default function Coach() {
           startEvalPolling(session.session_id);
         }
       };
-      setTimeout(pollFeedback, 3000);
+
+      // Prefer the server-push stream; fall back to polling if it fails or ends early
+      const controller = new AbortController();
+      streamAbortRef.current = controller;
+      let gotFeedback = false;
+      let evalDone = false;
+      api.streamSessionEvents(session.session_id, (name, data) => {
+        if (name === 'feedback_partial' || name === 'feedback_ready') {
+          // Partial events arrive field by field (strengths first); show them right away
+          setFeedback(data);
+          setState(STATES.FEEDBACK);
+          if (!gotFeedback) {
+            gotFeedback = true;
+            api.getSession(session.session_id, 'session')
+              .then((detail) => setCurrentSession((prev) => ({ ...prev, session: detail.session })))
+              .catch(() => { /* summary header only */ });
+          }
+        } else if (name.startsWith('evaluation_')) {
+          setEvaluation(data);
+          evalDone = name === 'evaluation_completed' || name === 'evaluation_failed';
+        }
+      }, controller.signal)
+        .catch(() => { /* fall through to polling */ })
+        .finally(() => {
+          if (controller.signal.aborted) return;
+          if (!gotFeedback) setTimeout(pollFeedback, 2000);
+          else if (!evalDone) startEvalPolling(session.session_id);
+        });
     };
     const onSpeechStart = () => setIsSpeaking(true);
     const onSpeechEnd = () => setIsSpeaking(false);
@@ -99,6 +127,7 @@ export default function Coach() {
     return () => {
       pollCancelledRef.current = true;
       evalPollCancelledRef.current = true;
+      streamAbortRef.current?.abort();
       vapi.removeAllListeners();
     };
   }, []);
@@ -110,7 +139,7 @@ export default function Coach() {
     const pollEval = async () => {
       if (evalPollCancelledRef.current) return;
       try {
-        const data = await api.getSession(sessionId);
+        const data = await api.getSession(sessionId, 'evaluation');
         if (data.evaluation) {
           setEvaluation(data.evaluation);
           if (data.evaluation.status === 'completed' || data.evaluation.status === 'failed') {
@@ -131,6 +160,7 @@ export default function Coach() {
     setFeedback(null);
     setEvaluation(null);
     evalPollCancelledRef.current = true;
+    streamAbortRef.current?.abort();
     try {
       const data = await api.startSession({ session_type: 'practice' });
       setCurrentSession(data);
@@ -319,6 +349,7 @@ export default function Coach() {
                   setState(STATES.IDLE);
                   setEvaluation(null);
                   evalPollCancelledRef.current = true;
+                  streamAbortRef.current?.abort();
                 }}
                 continueLabel="Practice again"
               />
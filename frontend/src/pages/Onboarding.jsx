@@ -81,7 +81,7 @@ export default function Onboarding() {
         if (pollCancelledRef.current) return;
         try {
           const data = await api.getSession(session.session_id);
-          if (data.feedback) {
+          if (data.feedback?.micro_skill) {
             setFeedback(data.feedback);
             setStep(STEPS.PRACTICE_DONE);
             return;